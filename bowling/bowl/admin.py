@@ -1,11 +1,19 @@
 # bowl/admin.py
 from django.contrib import admin
+from django.contrib import messages
 from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
 from .models import (
     Usuario, Cliente, Estado, TipoPista, Pista, Reserva,
-    Partida, Jugador, Frame,
-    Cafeteria, Menu, Pedido, DetallePedido, Mensaje
+    Partida, Jugador, Frame, Tiro, EstadisticaCliente, EstadisticaJugador,
+    Cafeteria, Menu, Pedido, DetallePedido, Mensaje,
+    ReservaHistorica, PartidaArchivada, PedidoArchivado
 )
+from . import estados
+from .forms import ReservaAdminForm, SerieReservasForm
+from .reservas import HorarioOcupado, fechas_serie, reservar_serie
 
 
 # ==============================================================================
@@ -63,12 +71,48 @@ class PistaAdmin(admin.ModelAdmin):
 
 @admin.register(Reserva)
 class ReservaAdmin(admin.ModelAdmin):
+    form = ReservaAdminForm
     list_display = ('id_reserva', 'cliente', 'pista', 'fecha', 'hora', 'estado')
     list_filter = ('fecha', 'estado', 'pista')
     search_fields = ('cliente__nombre', 'pista__numero')
     date_hierarchy = 'fecha'
     raw_id_fields = ('cliente', 'pista')
 
+    def get_urls(self):
+        urls = [
+            path('serie/', self.admin_site.admin_view(self.crear_serie), name='bowl_reserva_serie'),
+        ]
+        return urls + super().get_urls()
+
+    def crear_serie(self, request):
+        """Formulario de series para ligas; crea lo libre y lista los choques."""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        form = SerieReservasForm(request.POST or None)
+        choques = []
+        if request.method == 'POST' and form.is_valid():
+            datos = form.cleaned_data
+            fechas = fechas_serie(datos['desde'], datos['dia_semana'], datos['semanas'])
+            try:
+                creadas, choques = reservar_serie(
+                    list(datos['pistas']), fechas, datos['hora'],
+                    cliente=datos['cliente'], estado=estados.obtener(estados.PENDIENTE),
+                )
+                self.message_user(
+                    request, f"Se crearon {len(creadas)} reservas; {len(choques)} horarios ya estaban tomados."
+                )
+            except HorarioOcupado as error:
+                self.message_user(request, str(error), level=messages.ERROR)
+
+        contexto = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'form': form,
+            'choques': choques,
+        }
+        return TemplateResponse(request, 'admin/bowl/reserva/serie.html', contexto)
+
 
 @admin.register(Partida)
 class PartidaAdmin(admin.ModelAdmin):
@@ -77,13 +121,6 @@ class PartidaAdmin(admin.ModelAdmin):
     raw_id_fields = ('reserva',)
 
 
-@admin.register(Jugador)
-class JugadorAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'partida', 'orden')
-    list_filter = ('partida__reserva__fecha',)
-    search_fields = ('nombre',)
-
-
 class FrameInline(admin.TabularInline):
     model = Frame
     extra = 0
@@ -91,6 +128,14 @@ class FrameInline(admin.TabularInline):
     readonly_fields = ('puntaje_frame', 'puntaje_acumulado')
 
 
+@admin.register(Jugador)
+class JugadorAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'partida', 'orden')
+    list_filter = ('partida__reserva__fecha',)
+    search_fields = ('nombre',)
+    inlines = [FrameInline]
+
+
 @admin.register(Frame)
 class FrameAdmin(admin.ModelAdmin):
     list_display = ('jugador', 'numero', 'tiro1', 'tiro2', 'tiro3', 'puntaje_acumulado')
@@ -98,6 +143,35 @@ class FrameAdmin(admin.ModelAdmin):
     inlines = []
 
 
+@admin.register(Tiro)
+class TiroAdmin(admin.ModelAdmin):
+    list_display = ('partida', 'secuencia', 'jugador', 'pinos', 'fecha')
+    list_filter = ('partida',)
+    readonly_fields = ('partida', 'jugador', 'secuencia', 'pinos', 'fecha')
+
+
+# ==============================================================================
+# ESTADÍSTICAS
+# ==============================================================================
+
+@admin.register(EstadisticaCliente)
+class EstadisticaClienteAdmin(admin.ModelAdmin):
+    list_display = ('cliente', 'partidas_jugadas', 'promedio', 'mejor_partida', 'porcentaje_strikes', 'spares')
+    ordering = ('-mejor_partida',)
+    search_fields = ('cliente__nombre',)
+    readonly_fields = ('cliente', 'partidas_jugadas', 'pinos_totales', 'mejor_partida',
+                       'strikes', 'spares', 'oportunidades_strike')
+
+
+@admin.register(EstadisticaJugador)
+class EstadisticaJugadorAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'partidas_jugadas', 'promedio', 'mejor_partida', 'porcentaje_strikes', 'spares')
+    ordering = ('-mejor_partida',)
+    search_fields = ('nombre',)
+    readonly_fields = ('nombre', 'partidas_jugadas', 'pinos_totales', 'mejor_partida',
+                       'strikes', 'spares', 'oportunidades_strike')
+
+
 # ==============================================================================
 # CAFETERÍA Y PEDIDOS
 # ==============================================================================
@@ -109,10 +183,10 @@ class CafeteriaAdmin(admin.ModelAdmin):
 
 @admin.register(Menu)
 class MenuAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'precio', 'disponible')
+    list_display = ('nombre', 'precio', 'minutos_preparacion', 'disponible')
     list_filter = ('disponible',)
     search_fields = ('nombre',)
-    list_editable = ('precio', 'disponible')
+    list_editable = ('precio', 'minutos_preparacion', 'disponible')
 
 
 @admin.register(Pedido)
@@ -124,7 +198,7 @@ class PedidoAdmin(admin.ModelAdmin):
 
 @admin.register(DetallePedido)
 class DetallePedidoAdmin(admin.ModelAdmin):
-    list_display = ('pedido', 'menu', 'cantidad', 'subtotal')
+    list_display = ('pedido', 'menu', 'cantidad', 'precio_unitario', 'subtotal')
     raw_id_fields = ('pedido', 'menu')
 
 
@@ -142,4 +216,43 @@ class MensajeAdmin(admin.ModelAdmin):
 
     def marcar_como_leido(self, request, queryset):
         queryset.update(leido=True)
-    marcar_como_leido.short_description = "Marcar seleccionados como leídos"
\ No newline at end of file
+    marcar_como_leido.short_description = "Marcar seleccionados como leídos"
+
+
+# ==============================================================================
+# ARCHIVO (solo lectura; lo llena `manage.py archivar`)
+# ==============================================================================
+
+class SoloLecturaAdmin(admin.ModelAdmin):
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReservaHistorica)
+class ReservaHistoricaAdmin(SoloLecturaAdmin):
+    list_display = ('id_reserva', 'fecha', 'hora', 'cliente', 'pista_numero', 'precio_total', 'estado', 'archivada')
+    list_filter = ('archivada', 'estado')
+    date_hierarchy = 'fecha'
+    search_fields = ('cliente__nombre',)
+    list_select_related = ('cliente',)
+
+
+@admin.register(PartidaArchivada)
+class PartidaArchivadaAdmin(SoloLecturaAdmin):
+    list_display = ('id_partida', 'fecha', 'pista_numero', 'cliente', 'finalizada')
+    list_filter = ('finalizada',)
+    date_hierarchy = 'fecha'
+    search_fields = ('cliente__nombre',)
+
+
+@admin.register(PedidoArchivado)
+class PedidoArchivadoAdmin(SoloLecturaAdmin):
+    list_display = ('id', 'fecha', 'cliente', 'estado', 'precio_total')
+    list_filter = ('estado',)
+    search_fields = ('cliente__nombre',)
@@ -9,4 +9,4 @@ class BowlConfig(AppConfig):
 
     # Se ejecuta cuando la app se carga; activa las señales
     def ready(self):
-        pass  # 👈 Esto conecta las señales al iniciar Django
+        from . import signals  # noqa: F401  👈 Esto conecta las señales al iniciar Django
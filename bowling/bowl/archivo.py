@@ -0,0 +1,185 @@
+# bowl/archivo.py
+"""
+Archivo de reservas, partidas y pedidos viejos.
+
+Lo que ya no cambia (reservas cerradas de antes del corte, con sus
+partidas y pedidos) se pasa a las tablas *Archivada/*Archivado y se borra
+de las calientes, en lotes chicos con una transacción cada uno: si se
+corta a mitad de camino, cada lote quedó entero de un lado o del otro.
+
+Cada partida se guarda ya resumida: por jugador, el total, el resumen de
+estadísticas (el mismo de bowl.estadisticas) y los tiros de cada frame;
+los Jugador, Frame, Tiro y PuntajeJugador se van. Los historiales leen
+ReservaHistorica (una vista SQL con las dos tablas) y
+estadisticas.reconstruir suma también las partidas archivadas.
+
+Mientras se borra un lote, los receptores por fila de bowl.signals
+(índice de disponibilidad, feed de la cocina) no hacen nada: lo que se
+archiva está cerrado y es viejo. El índice de las fechas del lote se
+descarta una sola vez al confirmar.
+"""
+from collections import defaultdict
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import disponibilidad, estados
+from .estadisticas import resumen_frames
+from .models import (
+    DetallePedido, Frame, Jugador, Partida, PartidaArchivada, Pedido, PedidoArchivado, Reserva, ReservaArchivada,
+)
+
+TAMANIO_LOTE = 500
+
+_archivando = ContextVar('archivando', default=False)
+
+
+def archivando():
+    """True mientras se borra un lote archivado."""
+    return _archivando.get()
+
+
+def corte_por_defecto():
+    return timezone.localdate() - timedelta(days=getattr(settings, 'ARCHIVO_DIAS', 365))
+
+
+# ==============================================================================
+# RESÚMENES
+# ==============================================================================
+
+def _partidas_archivadas(partidas):
+    jugadores = defaultdict(list)
+    for jugador in Jugador.objects.filter(partida__in=partidas).order_by('orden', 'id_jugador'):
+        jugadores[jugador.partida_id].append(jugador)
+    frames = defaultdict(list)
+    for frame in Frame.objects.filter(jugador__partida__in=partidas).order_by('numero'):
+        frames[frame.jugador_id].append(frame)
+
+    archivadas = []
+    for partida in partidas:
+        resumenes = []
+        for jugador in jugadores[partida.pk]:
+            propios = frames[jugador.id_jugador]
+            jugados = [frame for frame in propios if frame.tiro1 is not None]
+            resumenes.append({
+                'nombre': jugador.nombre,
+                'cliente_id': jugador.cliente_id,
+                'total': jugados[-1].puntaje_acumulado if jugados else 0,
+                'resumen': resumen_frames(propios),
+                'frames': [[frame.tiro1, frame.tiro2, frame.tiro3] for frame in propios],
+            })
+        reserva = partida.reserva
+        archivadas.append(PartidaArchivada(
+            id_partida=partida.pk,
+            id_reserva=partida.reserva_id,
+            cliente_id=partida.cliente_id,
+            pista_numero=partida.pista.numero if partida.pista else None,
+            fecha=reserva.fecha if reserva else (partida.fecha_inicio.date() if partida.fecha_inicio else None),
+            finalizada=partida.finalizada,
+            fecha_inicio=partida.fecha_inicio,
+            fecha_fin=partida.fecha_fin,
+            jugadores=resumenes,
+        ))
+    return archivadas
+
+
+def _pedidos_archivados(pedidos):
+    detalles = defaultdict(list)
+    for detalle in DetallePedido.objects.filter(pedido__in=pedidos).select_related('menu'):
+        detalles[detalle.pedido_id].append({
+            'menu': detalle.menu.nombre if detalle.menu else None,
+            'cantidad': detalle.cantidad,
+            'subtotal': str(detalle.subtotal) if detalle.subtotal is not None else None,
+        })
+    return [
+        PedidoArchivado(
+            id=pedido.pk, id_reserva=pedido.reserva_id, cliente_id=pedido.cliente_id, fecha=pedido.fecha,
+            estado=estados.nombre_de(pedido.estado_id) or '', precio_total=pedido.precio_total,
+            detalles=detalles[pedido.pk],
+        )
+        for pedido in pedidos
+    ]
+
+
+def _reservas_archivadas(reservas):
+    return [
+        ReservaArchivada(
+            id_reserva=reserva.pk, fecha=reserva.fecha, hora=reserva.hora, cliente_id=reserva.cliente_id,
+            pista_numero=reserva.pista.numero if reserva.pista else None, precio_total=reserva.precio_total,
+            estado=estados.nombre_de(reserva.estado_id) or '', fecha_creacion=reserva.fecha_creacion,
+        )
+        for reserva in reservas
+    ]
+
+
+# ==============================================================================
+# LOTES
+# ==============================================================================
+
+def _archivar_lote(reserva_ids=(), partida_ids=(), pedido_ids=()):
+    """Copia y borra un lote en una sola transacción. Devuelve (reservas, partidas, pedidos)."""
+    with transaction.atomic():
+        partidas = list(
+            Partida.objects.filter(Q(pk__in=partida_ids) | Q(reserva_id__in=reserva_ids))
+            .select_related('pista', 'reserva')
+        )
+        pedidos = list(Pedido.objects.filter(Q(pk__in=pedido_ids) | Q(reserva_id__in=reserva_ids)))
+        reservas = list(Reserva.objects.filter(pk__in=reserva_ids).select_related('pista'))
+
+        PartidaArchivada.objects.bulk_create(_partidas_archivadas(partidas))
+        PedidoArchivado.objects.bulk_create(_pedidos_archivados(pedidos))
+        ReservaArchivada.objects.bulk_create(_reservas_archivadas(reservas))
+
+        marca = _archivando.set(True)
+        try:
+            # Los pedidos primero: su reserva es SET_NULL y no se los llevaría
+            Pedido.objects.filter(pk__in=[p.pk for p in pedidos]).delete()
+            Partida.objects.filter(pk__in=[p.pk for p in partidas]).delete()
+            Reserva.objects.filter(pk__in=reserva_ids).delete()
+        finally:
+            _archivando.reset(marca)
+
+        fechas = {reserva.fecha for reserva in reservas}
+        transaction.on_commit(lambda: disponibilidad.invalidar_fechas(fechas))
+    return len(reservas), len(partidas), len(pedidos)
+
+
+def _en_lotes(queryset, tamanio):
+    """Ids de `queryset` en lotes; como cada lote se borra, siempre se vuelve a pedir el primero."""
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:tamanio])
+        if not ids:
+            return
+        yield ids
+
+
+def archivar(corte=None, tamanio_lote=TAMANIO_LOTE):
+    """
+    Archiva lo anterior a `corte` (por defecto, hoy menos settings.ARCHIVO_DIAS).
+    Solo reservas cerradas: las pendientes de fechas pasadas las cierra antes bowl.vencimientos.
+    Devuelve cuántas reservas, partidas y pedidos se archivaron.
+    """
+    corte = corte or corte_por_defecto()
+    totales = [0, 0, 0]
+
+    def sumar(cantidades):
+        for indice, cantidad in enumerate(cantidades):
+            totales[indice] += cantidad
+
+    reservas = Reserva.objects.filter(fecha__lt=corte, activa=False)
+    for ids in _en_lotes(reservas, tamanio_lote):
+        sumar(_archivar_lote(reserva_ids=ids))
+
+    # Partidas y pedidos sueltos (sin reserva), por su propia fecha
+    sueltas = Partida.objects.filter(reserva__isnull=True, fecha_inicio__date__lt=corte)
+    for ids in _en_lotes(sueltas, tamanio_lote):
+        sumar(_archivar_lote(partida_ids=ids))
+    sueltos = Pedido.objects.filter(reserva__isnull=True, fecha__date__lt=corte)
+    for ids in _en_lotes(sueltos, tamanio_lote):
+        sumar(_archivar_lote(pedido_ids=ids))
+
+    return tuple(totales)
@@ -0,0 +1,83 @@
+# bowl/catalogo.py
+"""
+Catálogo del menú de la cafetería, cacheado por versión.
+
+El menú cambia un par de veces por día y se lee en cada pantalla de
+pedido, así que se guarda serializado en la caché bajo una clave que
+incluye la versión. Cualquier alta, cambio o baja de un Menu (también
+desde el list_editable del admin) sube la versión al confirmar (ver
+bowl.signals) y la próxima lectura arma el catálogo nuevo; el viejo vence
+solo. La misma versión es el ETag de /menu/.
+
+La versión la ven todos los procesos solo si la caché es compartida
+(REDIS_URL, ver config/settings.py). Con la caché en memoria cada proceso
+tiene su propio contador y nadie le avisa de un cambio hecho en otro:
+ahí la versión y el catálogo duran TIMEOUT_LOCAL (lo mismo que el max-age
+de /menu/), así un worker sirve el menú viejo a lo sumo un minuto.
+"""
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from . import miniaturas
+from .models import Menu
+
+CLAVE_VERSION = 'menu:version'
+TIMEOUT = 24 * 60 * 60
+TIMEOUT_LOCAL = 60
+
+
+def _clave(version):
+    return f'menu:catalogo:v{version}'
+
+
+def _timeouts():
+    """(catálogo, versión): cortos si la caché es de este proceso solo."""
+    if isinstance(caches['default'], (LocMemCache, DummyCache)):
+        return TIMEOUT_LOCAL, TIMEOUT_LOCAL
+    return TIMEOUT, None
+
+
+def version():
+    actual = cache.get(CLAVE_VERSION)
+    if actual is None:
+        # Si la caché perdió el contador no se vuelve a 1 (podría quedar un catálogo viejo con ese número)
+        cache.add(CLAVE_VERSION, time.time_ns(), _timeouts()[1])
+        actual = cache.get(CLAVE_VERSION)
+    return actual
+
+
+def invalidar(**kwargs):
+    """Sube la versión; el catálogo se vuelve a armar en la próxima lectura. Sirve como receptor de señales."""
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.add(CLAVE_VERSION, time.time_ns(), _timeouts()[1])
+
+
+def etag():
+    return f'"menu-v{version()}"'
+
+
+def menu():
+    """
+    Productos disponibles, listos para templates y JSON (el precio queda como Decimal).
+    La imagen viene con sus srcset (ver bowl.miniaturas.para_template).
+    """
+    clave = _clave(version())
+    productos = cache.get(clave)
+    if productos is None:
+        productos = [
+            {
+                'id': item.pk,
+                'nombre': item.nombre,
+                'descripcion': item.descripcion,
+                'precio': item.precio,
+                **miniaturas.para_template(item),
+            }
+            for item in Menu.objects.filter(disponible=True).order_by('nombre', 'pk')
+        ]
+        cache.set(clave, productos, _timeouts()[0])
+    return productos
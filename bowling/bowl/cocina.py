@@ -0,0 +1,155 @@
+# bowl/cocina.py
+"""
+Feed de cambios de la pantalla de cocina.
+
+La pantalla carga la lista del día una vez (o la pide en JSON a
+/cocina/estado/) y después escucha /cocina/eventos/ por SSE: cada pedido
+nuevo o cambiado llega como evento `pedido` y cada pedido que sale de la
+lista (entregado, borrado o sin detalles) como `quitado`. Mientras no
+pasa nada la conexión solo manda pings y no toca la base.
+
+Cada cambio incrementa un contador por día (en la caché) que viaja como
+id del evento. Si a la pantalla le falta un número, o se reconecta con un
+Last-Event-ID viejo, recarga la lista entera. Para varios workers, la
+caché y el backend del broker tienen que ser compartidos.
+
+La lista va en el orden de la cola de trabajo (bowl/planificador.py) y
+cada evento trae la cola entera (`cola`: posición y hora estimada de
+cada pedido), porque un cambio en un pedido corre a todos los de atrás.
+"""
+import time
+from datetime import date
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import estados, planificador
+from .eventos import broker
+from .models import Pedido, Reserva
+
+# Un día de cocina dura menos que esto; después la clave se descarta sola
+TIMEOUT_VERSION = 2 * 24 * 60 * 60
+
+
+def canal_cocina(fecha):
+    return f"cocina-{fecha.isoformat()}"
+
+
+def _clave_version(fecha):
+    return f'cocina:version:{fecha.isoformat()}'
+
+
+def _clave_epoca(fecha):
+    return f'cocina:epoca:{fecha.isoformat()}'
+
+
+def version(fecha):
+    return cache.get(_clave_version(fecha), 0)
+
+
+async def aversion(fecha):
+    return await cache.aget(_clave_version(fecha), 0)
+
+
+def epoca(fecha):
+    """Identifica el contador del día: si la caché lo pierde y vuelve a contar desde cero, cambia."""
+    clave = _clave_epoca(fecha)
+    actual = cache.get(clave)
+    if actual is None:
+        cache.add(clave, time.time_ns(), TIMEOUT_VERSION)
+        actual = cache.get(clave)
+    return actual
+
+
+def _incrementar(fecha):
+    clave = _clave_version(fecha)
+    cache.add(clave, 0, TIMEOUT_VERSION)
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # La clave venció justo entre add e incr
+        cache.set(clave, 1, TIMEOUT_VERSION)
+        return 1
+
+
+def pedidos_del_dia(fecha):
+    """Pedidos que la cocina todavía tiene que preparar o entregar ese día."""
+    return Pedido.objects.filter(
+        reserva__fecha=fecha,
+        detalles__isnull=False
+    ).exclude(estado_id=estados.id_de(estados.ENTREGADO)) \
+     .select_related('reserva__pista', 'reserva__cliente') \
+     .prefetch_related('detalles__menu') \
+     .distinct()
+
+
+def plan(fecha, pedidos=None, numero=None):
+    """
+    Turnos de la cola de trabajo del día. `pedidos` evita volver a leerlos si la cola hay
+    que armarla; `numero` es la versión con la que se leyeron (por defecto, la actual).
+    """
+    if numero is None:
+        numero = version(fecha)
+    if pedidos is None:
+        pedidos = pedidos_del_dia(fecha)
+    return planificador.plan(fecha, (epoca(fecha), numero), pedidos)
+
+
+def serializar_turno(turno):
+    if turno.grupo == planificador.LISTOS:
+        etiqueta = "✓ Listo para entregar"
+    elif turno.grupo == planificador.ENVIADOS:
+        etiqueta = f"⏱ Sale ≈ {timezone.localtime(turno.listo):%H:%M} ({turno.minutos} min)"
+    else:
+        etiqueta = "🛒 El cliente lo está armando"
+    return {'id': turno.pedido_id, 'posicion': turno.posicion, 'minutos': turno.minutos,
+            'listo': timezone.localtime(turno.listo).strftime('%H:%M') if turno.listo else None,
+            'etiqueta': etiqueta}
+
+
+def serializar(pedido):
+    return {
+        'id': pedido.pk,
+        'pista': pedido.reserva.pista.numero if pedido.reserva.pista else None,
+        'hora': pedido.reserva.hora.strftime('%H:%M'),
+        'estado': estados.nombre_de(pedido.estado_id),
+        'precio_total': str(pedido.precio_total or 0),
+        'detalles': [
+            {'menu': detalle.menu.nombre if detalle.menu else None, 'cantidad': detalle.cantidad,
+             'subtotal': str(detalle.subtotal or 0)}
+            for detalle in pedido.detalles.all()
+        ],
+    }
+
+
+def notificar(pedido_id, reserva_id=None):
+    """
+    Publica cómo quedó el pedido en la cocina del día de su reserva. Se llama al confirmar
+    el cambio; sin `reserva_id` se busca la del pedido (para cambios en sus detalles).
+    """
+    if reserva_id is None:
+        reserva_id = Pedido.objects.filter(pk=pedido_id).values_list('reserva_id', flat=True).first()
+    if reserva_id is None:
+        return
+    fecha = Reserva.objects.filter(pk=reserva_id).values_list('fecha', flat=True).first()
+    if fecha is None or fecha < date.today():
+        return  # La cocina solo muestra el día; lo pasado (por ejemplo, al archivar) no se publica
+
+    pedido = pedidos_del_dia(fecha).filter(pk=pedido_id).first()
+    numero = _incrementar(fecha)
+    planificador.aplicar(fecha, (epoca(fecha), numero), pedido_id, pedido)
+    datos = {'version': numero, 'cola': [serializar_turno(turno) for turno in plan(fecha, numero=numero)]}
+    if pedido is None:
+        broker().publicar(canal_cocina(fecha), 'quitado', {**datos, 'id': pedido_id})
+    else:
+        broker().publicar(canal_cocina(fecha), 'pedido', {**datos, 'pedido': serializar(pedido)})
+
+
+def reiniciar(fecha=None):
+    """
+    Hace que todas las pantallas y colas del día se vuelvan a armar (por ejemplo, si cambió el
+    tiempo de preparación de un producto): sube la versión y publica `reinicio`.
+    """
+    fecha = fecha or date.today()
+    numero = _incrementar(fecha)
+    broker().publicar(canal_cocina(fecha), 'reinicio', {'version': numero})
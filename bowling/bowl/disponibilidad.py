@@ -0,0 +1,249 @@
+# bowl/disponibilidad.py
+"""
+Índice de disponibilidad de pistas por fecha.
+
+Por cada fecha se guarda en la caché un bitmap de ocupación: un entero por
+horario con el bit `id_pista` encendido si la pista tiene una reserva
+activa. Se arma con una sola consulta la primera vez que se pide la
+fecha y después se corrige solo el horario que cambia (ver bowl.signals),
+así la página de reservas no recalcula la grilla en cada pedido.
+
+Cada horario es una clave aparte: corregir uno es un solo set, y dos
+procesos que corrigen horarios distintos de la misma fecha no se pisan
+(con un bitmap en una sola clave, el último en escribir borraba el cambio
+del otro). Para que los workers compartan el índice la caché tiene que ser
+compartida (REDIS_URL, ver config/settings.py); con la caché en memoria
+cada proceso tiene su propio índice y los cambios hechos en otro recién se
+ven cuando vence (TIMEOUT).
+
+El calendario de varios días guarda aparte solo la cantidad de pistas
+libres por horario de cada fecha.
+"""
+import json
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Pista, Reserva
+
+HORARIOS = [time(hora) for hora in range(14, 24)]
+SLOT_DE = {hora: indice for indice, hora in enumerate(HORARIOS)}
+
+# Tope de vida: acota el desfasaje si alguien cambia reservas con .update() (sin señales)
+TIMEOUT = 60 * 60
+CLAVE_PISTAS = 'disponibilidad:pistas'
+
+# Calendario: el pasado ya no cambia; lo que viene se cachea poco porque se sigue reservando
+TIMEOUT_PASADO = 24 * 60 * 60
+TIMEOUT_PROXIMO = 60
+MAX_DIAS_CALENDARIO = 62
+
+
+def _clave(fecha, slot):
+    return f'disponibilidad:{fecha.isoformat()}:{slot}'
+
+
+def _claves(fecha):
+    return [_clave(fecha, slot) for slot in range(len(HORARIOS))]
+
+
+def _clave_calendario(fecha):
+    return f'disponibilidad:calendario:{fecha.isoformat()}'
+
+
+def _bit(pista_id):
+    return 1 << pista_id
+
+
+def _ocupadas(fecha, hora=None):
+    """Pares (hora, pista_id) con reserva activa; la única consulta del índice."""
+    reservas = Reserva.objects.filter(fecha=fecha, activa=True, pista__isnull=False)
+    if hora is not None:
+        reservas = reservas.filter(hora=hora)
+    return reservas.values_list('hora', 'pista_id')
+
+
+# ==============================================================================
+# CATÁLOGO DE PISTAS
+# ==============================================================================
+
+def pistas():
+    """Pistas con lo necesario para mostrar, cobrar y asignar, sin volver a la base."""
+    catalogo = cache.get(CLAVE_PISTAS)
+    if catalogo is None:
+        capacidad_por_defecto = Pista._meta.get_field('capacidad_maxima').default
+        catalogo = [
+            {
+                'pk': pista.pk,
+                'numero': pista.numero,
+                'tipo_id': pista.tipo_pista_id,
+                'tipo': pista.tipo_pista.tipo if pista.tipo_pista else 'Sin tipo',
+                'precio': pista.tipo_pista.precio if pista.tipo_pista else 0,
+                'capacidad': pista.capacidad_maxima or capacidad_por_defecto,
+            }
+            for pista in Pista.objects.select_related('tipo_pista').order_by('numero', 'pk')
+        ]
+        cache.set(CLAVE_PISTAS, catalogo, TIMEOUT)
+    return catalogo
+
+
+def tipos(catalogo):
+    """Tipos de pista del catálogo, cada uno con la máscara de bits de sus pistas."""
+    por_tipo = {}
+    for pista in catalogo:
+        tipo = por_tipo.setdefault(pista['tipo_id'], {
+            'pk': pista['tipo_id'], 'tipo': pista['tipo'], 'precio': pista['precio'],
+            'capacidad': 0, 'mascara': 0,
+        })
+        tipo['capacidad'] = max(tipo['capacidad'], pista['capacidad'])
+        tipo['mascara'] |= _bit(pista['pk'])
+    return list(por_tipo.values())
+
+
+def invalidar_pistas():
+    cache.delete(CLAVE_PISTAS)
+
+
+# ==============================================================================
+# BITMAP POR FECHA
+# ==============================================================================
+
+def ocupacion(fecha):
+    """Bitmap de la fecha: un entero por horario de HORARIOS."""
+    claves = _claves(fecha)
+    en_cache = cache.get_many(claves)
+    if len(en_cache) == len(claves):
+        return [en_cache[clave] for clave in claves]
+
+    # Si falta algún horario (venció o la caché lo desalojó) se arma la fecha entera
+    bitmap = [0] * len(HORARIOS)
+    for hora, pista_id in _ocupadas(fecha):
+        if hora in SLOT_DE:
+            bitmap[SLOT_DE[hora]] |= _bit(pista_id)
+    cache.set_many(dict(zip(claves, bitmap)), TIMEOUT)
+    return bitmap
+
+
+def actualizar_horario(fecha, hora):
+    """Recalcula en el índice solo el horario (fecha, hora), si la fecha ya está indexada."""
+    cache.delete(_clave_calendario(fecha))
+    if hora not in SLOT_DE:
+        return
+    clave = _clave(fecha, SLOT_DE[hora])
+    if cache.get(clave) is None:
+        return
+    mascara = 0
+    for _, pista_id in _ocupadas(fecha, hora):
+        mascara |= _bit(pista_id)
+    cache.set(clave, mascara, TIMEOUT)
+
+
+def invalidar_fechas(fechas):
+    """Descarta el índice y el calendario de esas fechas (para cambios hechos con .update(), sin señales)."""
+    claves = [clave for fecha in fechas for clave in _claves(fecha) + [_clave_calendario(fecha)]]
+    if claves:
+        cache.delete_many(claves)
+
+
+def grilla(fecha):
+    """
+    Disponibilidad de todos los horarios de la fecha, lista para el template.
+    Por horario solo viaja cuántas pistas libres hay de cada tipo; la pista la elige mejor_pista.
+    """
+    bitmap = ocupacion(fecha)
+    por_tipo = tipos(pistas())
+    horarios = []
+    for hora, ocupadas in zip(HORARIOS, bitmap):
+        libres = [
+            {'pk': tipo['pk'], 'tipo': tipo['tipo'], 'precio': tipo['precio'], 'capacidad': tipo['capacidad'],
+             'libres': (tipo['mascara'] & ~ocupadas).bit_count()}
+            for tipo in por_tipo
+        ]
+        libres = [tipo for tipo in libres if tipo['libres']]
+        cantidad = sum(tipo['libres'] for tipo in libres)
+        horarios.append({
+            'hora': hora.strftime('%H:%M'),
+            'disponible': bool(cantidad),
+            'cantidad': cantidad,
+            'tipos': libres,
+            'tipos_json': json.dumps(libres, ensure_ascii=False, default=str),
+        })
+    return horarios
+
+
+def mejor_pista(fecha, hora, tipo_id=None, personas=1):
+    """
+    Pista libre que mejor encaja en (fecha, hora), o None.
+    Gana la de menor capacidad que alcanza para `personas` (las grandes quedan
+    para grupos grandes); a igual capacidad, la que tiene ocupados los horarios
+    vecinos, así los huecos libres de las otras pistas quedan enteros; y al
+    final la de menor número, para que la elección sea siempre la misma.
+    """
+    if hora not in SLOT_DE:
+        return None
+    bitmap = ocupacion(fecha)
+    slot = SLOT_DE[hora]
+    vecinos = [bitmap[i] for i in (slot - 1, slot + 1) if 0 <= i < len(bitmap)]
+
+    mejor = clave_mejor = None
+    for pista in pistas():
+        bit = _bit(pista['pk'])
+        if bitmap[slot] & bit or pista['capacidad'] < personas:
+            continue
+        if tipo_id is not None and pista['tipo_id'] != tipo_id:
+            continue
+        clave = (
+            pista['capacidad'] - personas,
+            -sum(1 for ocupadas in vecinos if ocupadas & bit),
+            pista['numero'] is None, pista['numero'], pista['pk'],
+        )
+        if clave_mejor is None or clave < clave_mejor:
+            mejor, clave_mejor = pista, clave
+    return mejor
+
+
+# ==============================================================================
+# CALENDARIO DE VARIOS DÍAS
+# ==============================================================================
+
+def calendario(desde, dias):
+    """
+    Pistas libres por horario para `dias` fechas desde `desde`.
+    Las fechas que no están en caché salen de una sola consulta agrupada por (fecha, hora).
+    """
+    fechas = [desde + timedelta(days=n) for n in range(dias)]
+    en_cache = cache.get_many([_clave_calendario(fecha) for fecha in fechas])
+    faltantes = [fecha for fecha in fechas if _clave_calendario(fecha) not in en_cache]
+
+    if faltantes:
+        total = len(pistas())
+        ocupadas = {fecha: [0] * len(HORARIOS) for fecha in faltantes}
+        agrupadas = (
+            Reserva.objects.filter(
+                fecha__range=(faltantes[0], faltantes[-1]),
+                hora__in=HORARIOS,
+                activa=True,
+                pista__isnull=False,
+            )
+            .values('fecha', 'hora')
+            .annotate(ocupadas=Count('pista', distinct=True))
+        )
+        for fila in agrupadas:
+            if fila['fecha'] in ocupadas:
+                ocupadas[fila['fecha']][SLOT_DE[fila['hora']]] = fila['ocupadas']
+
+        hoy = date.today()
+        pasadas, proximas = {}, {}
+        for fecha, cantidades in ocupadas.items():
+            destino = pasadas if fecha < hoy else proximas
+            destino[_clave_calendario(fecha)] = [max(total - cantidad, 0) for cantidad in cantidades]
+        cache.set_many(pasadas, TIMEOUT_PASADO)
+        cache.set_many(proximas, TIMEOUT_PROXIMO)
+        en_cache.update(pasadas)
+        en_cache.update(proximas)
+
+    return [
+        {'fecha': fecha.isoformat(), 'libres': en_cache[_clave_calendario(fecha)]}
+        for fecha in fechas
+    ]
@@ -0,0 +1,119 @@
+# bowl/estadisticas.py
+"""
+Estadísticas materializadas por cliente y por nombre de jugador.
+
+Se suman una sola vez, cuando termina la partida, para que rankings y
+perfiles lean unas pocas filas en vez de recorrer todos los frames.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import EstadisticaCliente, EstadisticaJugador, Frame, Jugador, PartidaArchivada
+
+CAMPOS = ['partidas_jugadas', 'pinos_totales', 'mejor_partida', 'strikes', 'spares', 'oportunidades_strike']
+
+
+def resumen_frames(frames):
+    """Resumen de una partida de un jugador a partir de sus frames guardados."""
+    resumen = {'partidas_jugadas': 1, 'pinos_totales': 0, 'mejor_partida': 0,
+               'strikes': 0, 'spares': 0, 'oportunidades_strike': 0}
+
+    for frame in frames:
+        t1, t2, t3 = frame.tiro1, frame.tiro2, frame.tiro3
+        if t1 is None:
+            continue
+        if frame.numero == 10:
+            resumen['pinos_totales'] = resumen['mejor_partida'] = frame.puntaje_acumulado or 0
+
+        # Cada tiro con los 10 pinos parados es una oportunidad de strike
+        racks = [t1]
+        if frame.numero == 10:
+            if t1 == 10 and t2 is not None:
+                racks.append(t2)
+            if t3 is not None and (t2 == 10 or (t1 < 10 and t1 + t2 == 10)):
+                racks.append(t3)
+            if t1 == 10 and t2 is not None and t2 < 10 and t3 is not None and t2 + t3 == 10:
+                resumen['spares'] += 1
+        resumen['oportunidades_strike'] += len(racks)
+        resumen['strikes'] += sum(1 for pinos in racks if pinos == 10)
+
+        if t1 < 10 and t2 is not None and t1 + t2 == 10:
+            resumen['spares'] += 1
+
+    return resumen
+
+
+def _sumar(modelo, filtro, resumen):
+    """Suma el resumen con UPDATE atómicos (F y Greatest), creando la fila si falta."""
+    modelo.objects.get_or_create(**filtro)
+    modelo.objects.filter(**filtro).update(
+        mejor_partida=Greatest('mejor_partida', resumen['mejor_partida']),
+        **{campo: F(campo) + resumen[campo] for campo in CAMPOS if campo != 'mejor_partida'},
+    )
+
+
+def registrar_partida(partida):
+    """Suma a las estadísticas los jugadores de una partida recién terminada."""
+    jugadores = list(Jugador.objects.filter(partida=partida))
+    frames = defaultdict(list)
+    for frame in Frame.objects.filter(jugador__partida=partida):
+        frames[frame.jugador_id].append(frame)
+
+    with transaction.atomic():
+        for jugador in jugadores:
+            resumen = resumen_frames(frames[jugador.id_jugador])
+            if jugador.nombre:
+                _sumar(EstadisticaJugador, {'nombre': jugador.nombre}, resumen)
+            if jugador.cliente_id:
+                _sumar(EstadisticaCliente, {'cliente_id': jugador.cliente_id}, resumen)
+
+
+def reconstruir(tamanio_lote=2000):
+    """Recalcula todas las estadísticas desde las partidas finalizadas, incluidas las archivadas."""
+    por_nombre = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+    por_cliente = defaultdict(lambda: dict.fromkeys(CAMPOS, 0))
+
+    def acumular(nombre, cliente_id, resumen):
+        destinos = []
+        if nombre:
+            destinos.append(por_nombre[nombre])
+        if cliente_id:
+            destinos.append(por_cliente[cliente_id])
+        for acumulado in destinos:
+            for campo in CAMPOS:
+                if campo == 'mejor_partida':
+                    acumulado[campo] = max(acumulado[campo], resumen[campo])
+                else:
+                    acumulado[campo] += resumen[campo]
+
+    jugadores = Jugador.objects.filter(partida__finalizada=True).order_by('id_jugador')
+    ids = list(jugadores.values_list('id_jugador', 'nombre', 'cliente_id'))
+    for inicio in range(0, len(ids), tamanio_lote):
+        bloque = ids[inicio:inicio + tamanio_lote]
+        frames = defaultdict(list)
+        for frame in Frame.objects.filter(jugador_id__gte=bloque[0][0], jugador_id__lte=bloque[-1][0]):
+            frames[frame.jugador_id].append(frame)
+
+        for jugador_id, nombre, cliente_id in bloque:
+            acumular(nombre, cliente_id, resumen_frames(frames[jugador_id]))
+
+    # Las partidas archivadas ya guardan el resumen de cada jugador (ver bowl.archivo)
+    archivadas = PartidaArchivada.objects.filter(finalizada=True).values_list('jugadores', flat=True)
+    for jugadores_archivados in archivadas.iterator(chunk_size=tamanio_lote):
+        for jugador in jugadores_archivados:
+            acumular(jugador['nombre'], jugador['cliente_id'], jugador['resumen'])
+
+    with transaction.atomic():
+        EstadisticaJugador.objects.all().delete()
+        EstadisticaCliente.objects.all().delete()
+        EstadisticaJugador.objects.bulk_create(
+            [EstadisticaJugador(nombre=nombre, **datos) for nombre, datos in por_nombre.items()], batch_size=500
+        )
+        EstadisticaCliente.objects.bulk_create(
+            [EstadisticaCliente(cliente_id=cliente_id, **datos) for cliente_id, datos in por_cliente.items()],
+            batch_size=500,
+        )
+    return len(por_nombre), len(por_cliente)
@@ -0,0 +1,87 @@
+# bowl/estados.py
+"""
+Registro en memoria de los Estado (nombre → fila).
+
+Los estados casi nunca cambian, así que se leen una sola vez por proceso y
+las vistas filtran por `estado_id` en vez de unir con la tabla de estados
+por nombre. Las migraciones 0007 y 0009 siembran los necesarios; si falta alguno
+(por ejemplo, en una base vacía) se crea la primera vez que se pide. Las
+señales de bowl.signals vacían el registro cuando cambia un Estado.
+
+Esas señales solo vacían el registro del proceso que hizo el cambio. Un
+estado nuevo creado en otro proceso se encuentra igual (un id que no está
+registrado vuelve a leer la tabla una vez), pero un estado renombrado o
+borrado en otro proceso se sigue viendo como estaba hasta que este
+proceso se reinicia (ver la nota de la caché en config/settings.py).
+"""
+from django.db import transaction
+
+from .models import Estado
+
+PENDIENTE = "Pendiente"
+DISPONIBLE = "Disponible"
+COMPLETADA = "Completada"
+EN_PREPARACION = "En preparación"
+LISTO = "Listo"
+ENTREGADO = "Entregado"
+VENCIDA = "Vencida"
+
+NECESARIOS = [PENDIENTE, DISPONIBLE, COMPLETADA, EN_PREPARACION, LISTO, ENTREGADO, VENCIDA]
+
+_por_nombre = None
+
+
+def _registro():
+    global _por_nombre
+    registro = _por_nombre
+    if registro is None:
+        registro = {estado.nombre: estado for estado in Estado.objects.all()}
+        _por_nombre = registro
+    return registro
+
+
+def obtener(nombre):
+    """Estado con ese nombre; se crea si todavía no existe."""
+    estado = _registro().get(nombre)
+    if estado is None:
+        estado, _ = Estado.objects.get_or_create(nombre=nombre)
+        # Se registra recién al confirmar: un rollback no puede dejar ids que no existen
+        transaction.on_commit(lambda: _registro().setdefault(nombre, estado))
+    return estado
+
+
+def id_de(nombre):
+    return obtener(nombre).pk
+
+
+def por_id(estado_id):
+    """Estado por id desde el registro (None si no tiene estado o el id no existe)."""
+    if estado_id is None:
+        return None
+    for _ in range(2):
+        for estado in _registro().values():
+            if estado.pk == estado_id:
+                return estado
+        # Puede ser un estado creado por otro proceso: se relee la tabla una vez
+        invalidar()
+    return None
+
+
+def nombre_de(estado_id):
+    estado = por_id(estado_id)
+    return estado.nombre if estado else None
+
+
+def adjuntar(objetos):
+    """Completa `objeto.estado` desde el registro, para que los templates no hagan una consulta por fila."""
+    for objeto in objetos:
+        estado = por_id(objeto.estado_id)
+        if estado is not None:
+            objeto.estado = estado
+    return objetos
+
+
+def invalidar(**kwargs):
+    """Vacía el registro; se vuelve a leer en el próximo uso. Sirve como receptor de señales."""
+    global _por_nombre
+    _por_nombre = None
@@ -0,0 +1,141 @@
+# bowl/eventos.py
+"""
+Broker en proceso para empujar cambios del tablero por Server-Sent Events.
+
+Cada tiro se serializa una sola vez y el mismo mensaje se reparte a todas
+las pantallas suscriptas a la partida. El backend decide cómo viaja el
+mensaje entre workers; BackendLocal lo resuelve en memoria y sirve como
+reemplazo local (por ejemplo, para probar varios workers en un test).
+BackendRedis lo reparte entre procesos (varios workers de uvicorn, el
+consumidor de pinsetters) con el pub/sub de REDIS_URL.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+# ==============================================================================
+# BACKENDS
+# ==============================================================================
+
+class BackendLocal:
+    """Reparte lo publicado a todos los brokers conectados dentro del proceso."""
+
+    def __init__(self):
+        self._brokers = []
+
+    def conectar(self, broker):
+        self._brokers.append(broker)
+
+    def publicar(self, canal, mensaje):
+        for broker in list(self._brokers):
+            broker.entregar(canal, mensaje)
+
+
+class BackendRedis:
+    """
+    Publica en Redis y entrega a los brokers del proceso lo que publique cualquier proceso.
+    Un hilo por proceso escucha los canales del tablero (se arranca con el primer broker).
+    """
+
+    PREFIJO = 'tablero:'
+
+    def __init__(self, url=None):
+        import redis  # Solo hace falta con este backend
+
+        self._redis = redis.Redis.from_url(url or settings.REDIS_URL, decode_responses=True)
+        self._locales = BackendLocal()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def conectar(self, broker):
+        self._locales.conectar(broker)
+        with self._lock:
+            if self._hilo is None:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(**{f'{self.PREFIJO}*': self._recibir})
+                self._hilo = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def _recibir(self, mensaje):
+        self._locales.publicar(mensaje['channel'][len(self.PREFIJO):], mensaje['data'])
+
+    def publicar(self, canal, mensaje):
+        self._redis.publish(self.PREFIJO + canal, mensaje)
+
+
+# ==============================================================================
+# BROKER
+# ==============================================================================
+
+class Broker:
+    """Suscripciones por canal (una por partida) dentro de un worker."""
+
+    TAMANIO_COLA = 100
+
+    def __init__(self, backend=None):
+        self._suscriptores = defaultdict(set)
+        self._lock = threading.Lock()
+        self.backend = backend or BackendLocal()
+        self.backend.conectar(self)
+
+    def publicar(self, canal, evento, datos):
+        """Serializa una vez y publica en el backend. Se puede llamar desde código sync."""
+        mensaje = f"id: {datos.get('version', '')}\nevent: {evento}\ndata: {json.dumps(datos)}\n\n"
+        self.backend.publicar(canal, mensaje)
+
+    def entregar(self, canal, mensaje):
+        """Encola el mensaje ya serializado en cada suscriptor local del canal."""
+        with self._lock:
+            suscriptores = list(self._suscriptores.get(canal, ()))
+        for loop, cola in suscriptores:
+            try:
+                loop.call_soon_threadsafe(self._encolar, cola, mensaje)
+            except RuntimeError:
+                pass  # El loop del suscriptor ya se cerró
+
+    @staticmethod
+    def _encolar(cola, mensaje):
+        # Una pantalla lenta pierde mensajes; con la versión detecta el salto y relee el estado
+        if not cola.full():
+            cola.put_nowait(mensaje)
+
+    def suscriptores(self, canal):
+        with self._lock:
+            return len(self._suscriptores.get(canal, ()))
+
+    async def suscribir(self, canal, keepalive=15):
+        """Generador async de mensajes del canal; cada `keepalive` segundos manda un comentario."""
+        entrada = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.TAMANIO_COLA))
+        with self._lock:
+            self._suscriptores[canal].add(entrada)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(entrada[1].get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            with self._lock:
+                self._suscriptores[canal].discard(entrada)
+                if not self._suscriptores[canal]:
+                    del self._suscriptores[canal]
+
+
+_broker = None
+
+
+def broker():
+    """Broker del proceso, con el backend configurado en TABLERO_BROKER_BACKEND."""
+    global _broker
+    if _broker is None:
+        backend = import_string(getattr(settings, 'TABLERO_BROKER_BACKEND', 'bowl.eventos.BackendLocal'))
+        _broker = Broker(backend())
+    return _broker
+
+
+def canal_partida(partida_id):
+    return f"partida-{partida_id}"
@@ -1,6 +1,6 @@
 from django import forms
 
-from .models import Pista, Cafeteria,Menu, Reserva, Mensaje, Usuario, Jugador
+from .models import Pista, Cafeteria,Menu, Reserva, Mensaje, Usuario, Jugador, Cliente, TipoPista
 from django.utils import timezone
 from datetime import time, datetime
 from django.contrib.auth.forms import UserCreationForm
@@ -36,11 +36,19 @@ class ReservaForm(forms.ModelForm):
         label="Hora",
         widget=forms.Select(attrs={'class': 'form-select'})
     )
+    # Modo "cualquier pista": sin pista elegida, el servidor asigna la mejor de este tipo
+    tipo_pista = forms.ModelChoiceField(queryset=TipoPista.objects.all(), required=False, label="Tipo de pista")
+    personas = forms.IntegerField(min_value=1, max_value=20, initial=1, required=False, label="Personas")
 
     class Meta:
         model = Reserva
         fields = ['fecha', 'hora', 'pista']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # La vista usa el tipo de pista para el precio: viene en la misma consulta
+        self.fields['pista'].queryset = Pista.objects.select_related('tipo_pista')
+
     # Validación general del formulario
     def clean(self):
         cleaned_data = super().clean()
@@ -48,7 +56,7 @@ class ReservaForm(forms.ModelForm):
         fecha = cleaned_data.get("fecha")
         hora = cleaned_data.get("hora")
 
-        if not fecha or not hora or not pista:
+        if not fecha or not hora:
             return cleaned_data
 
         # Convierte string de hora a objeto time
@@ -60,12 +68,59 @@ class ReservaForm(forms.ModelForm):
         if fecha < date.today():
             raise forms.ValidationError("No se puede reservar en fechas pasadas.")
 
-        # No puede haber reservas duplicadas
-        if Reserva.objects.filter(pista=pista, fecha=fecha, hora=hora).exists():
-            raise forms.ValidationError("Esta pista ya está reservada en esa fecha y hora.")
+        # Las reservas duplicadas las rechaza la base al guardar (restricción reserva_activa_unica)
+
+        return cleaned_data
+
+# ------------------------- FORMULARIO RESERVA (ADMIN) ----------------------
+class ReservaAdminForm(forms.ModelForm):
+    """
+    `activa` no es campo del formulario, así que el admin no valida la restricción
+    reserva_activa_unica y el INSERT terminaba en IntegrityError: el choque se chequea acá.
+    """
+    class Meta:
+        model = Reserva
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        pista, fecha, hora = cleaned_data.get('pista'), cleaned_data.get('fecha'), cleaned_data.get('hora')
+        estado = cleaned_data.get('estado')
+        if not (pista and fecha and hora) or not Reserva.activa_con(estado.pk if estado else None):
+            return cleaned_data
 
+        ocupada = Reserva.objects.filter(activa=True, pista=pista, fecha=fecha, hora=hora)
+        if self.instance.pk:
+            ocupada = ocupada.exclude(pk=self.instance.pk)
+        if ocupada.exists():
+            raise forms.ValidationError(
+                f"La pista {pista.numero} ya tiene una reserva activa el {fecha} a las {hora:%H:%M}."
+            )
         return cleaned_data
 
+# ------------------------- FORMULARIO SERIE DE RESERVAS --------------------
+class SerieReservasForm(forms.Form):
+    DIA_CHOICES = [
+        (0, "Lunes"), (1, "Martes"), (2, "Miércoles"), (3, "Jueves"),
+        (4, "Viernes"), (5, "Sábado"), (6, "Domingo"),
+    ]
+
+    pistas = forms.ModelMultipleChoiceField(queryset=Pista.objects.select_related('tipo_pista'))
+    dia_semana = forms.TypedChoiceField(choices=DIA_CHOICES, coerce=int, label="Día")
+    hora = forms.ChoiceField(choices=ReservaForm.HORA_CHOICES, label="Hora")
+    desde = forms.DateField(label="Desde")
+    semanas = forms.IntegerField(min_value=1, max_value=52)
+    cliente = forms.ModelChoiceField(queryset=Cliente.objects.all(), required=False)
+
+    def clean_hora(self):
+        return datetime.strptime(self.cleaned_data['hora'], "%H:%M").time()
+
+    def clean_desde(self):
+        desde = self.cleaned_data['desde']
+        if desde < date.today():
+            raise forms.ValidationError("No se puede reservar en fechas pasadas.")
+        return desde
+
 # ------------------------- FORMULARIOS PARA PISTAS -------------------------
 class CrearPistaForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,35 @@
+# bowl/management/commands/archivar.py
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bowl.archivo import TAMANIO_LOTE, archivar, corte_por_defecto
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa a las tablas de archivo las reservas cerradas anteriores al corte, "
+        "con sus partidas (resumidas) y pedidos."
+    )
+
+    def add_arguments(self, parser):
+        corte = parser.add_mutually_exclusive_group()
+        corte.add_argument('--antes-de', help="Fecha de corte AAAA-MM-DD (exclusive)")
+        corte.add_argument('--dias', type=int, help="Archiva lo de hace más de N días (por defecto, ARCHIVO_DIAS)")
+        parser.add_argument('--lote', type=int, default=TAMANIO_LOTE, help="Reservas por transacción")
+
+    def handle(self, *args, **options):
+        if options['antes_de']:
+            try:
+                corte = date.fromisoformat(options['antes_de'])
+            except ValueError:
+                raise CommandError("--antes-de tiene que ser AAAA-MM-DD.")
+        elif options['dias'] is not None:
+            corte = date.today() - timedelta(days=options['dias'])
+        else:
+            corte = corte_por_defecto()
+
+        reservas, partidas, pedidos = archivar(corte, tamanio_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivado hasta {corte}: {reservas} reservas, {partidas} partidas, {pedidos} pedidos."
+        ))
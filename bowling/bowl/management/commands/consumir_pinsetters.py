@@ -0,0 +1,216 @@
+# bowl/management/commands/consumir_pinsetters.py
+import asyncio
+import json
+import time
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, close_old_connections, transaction
+
+from bowl.eventos import BackendLocal, broker, canal_partida
+from bowl.models import Partida, Pista
+from bowl.puntuacion import EstadoPartida, finalizar_partida
+
+# Choques seguidos con otro escritor antes de descartar el lote
+MAX_REINTENTOS = 3
+
+
+class Command(BaseCommand):
+    help = (
+        "Consume los tiros de los pinsetters de todas las pistas a la vez. "
+        "Cada línea es un JSON {\"pista\": 3, \"pinos\": 7, \"ts\": 1700000000.5} "
+        "leído de un archivo, un FIFO o un socket TCP local."
+    )
+
+    def add_arguments(self, parser):
+        origen = parser.add_mutually_exclusive_group(required=True)
+        origen.add_argument('--archivo', help="Archivo o FIFO con un evento por línea")
+        origen.add_argument('--puerto', type=int, help="Puerto TCP local (127.0.0.1) donde escuchar")
+        parser.add_argument('--lote', type=int, default=50, help="Máximo de tiros por lote y pista")
+        parser.add_argument('--ventana', type=int, default=200, help="Milisegundos que se espera para juntar un lote")
+        parser.add_argument('--intervalo', type=int, default=10, help="Segundos entre reportes de throughput")
+
+    def handle(self, *args, **options):
+        self.lote = options['lote']
+        self.ventana = options['ventana'] / 1000
+        self.intervalo = options['intervalo']
+        self.pistas = set(Pista.objects.exclude(numero=None).values_list('numero', flat=True))
+        if not self.pistas:
+            raise CommandError("No hay pistas cargadas.")
+        if isinstance(broker().backend, BackendLocal):
+            self.stderr.write(self.style.WARNING(
+                "TABLERO_BROKER_BACKEND reparte en memoria: las pantallas servidas por otros "
+                "procesos no van a ver los tiros de este consumidor."
+            ))
+
+        self.aplicados = self.rechazados = self.descartados = 0
+        self.lags = []
+        self.inicio = time.monotonic()
+
+        try:
+            asyncio.run(self._consumir(options))
+        except KeyboardInterrupt:
+            pass
+        self._reportar(final=True)
+
+    # ------------------------------------------------------------------
+    # Orígenes
+    # ------------------------------------------------------------------
+
+    async def _consumir(self, options):
+        self.colas = {numero: asyncio.Queue() for numero in self.pistas}
+        trabajadores = [asyncio.create_task(self._trabajar(numero)) for numero in self.pistas]
+        reporte = asyncio.create_task(self._reportar_cada())
+
+        if options['archivo']:
+            await self._leer_archivo(options['archivo'])
+        else:
+            servidor = await asyncio.start_server(self._atender_conexion, '127.0.0.1', options['puerto'])
+            self.stdout.write(f"Escuchando pinsetters en 127.0.0.1:{options['puerto']}")
+            async with servidor:
+                await servidor.serve_forever()
+
+        # Fin del origen: cada pista vacía su cola y termina
+        for cola in self.colas.values():
+            cola.put_nowait(None)
+        await asyncio.gather(*trabajadores)
+        reporte.cancel()
+
+    async def _leer_archivo(self, ruta):
+        loop = asyncio.get_running_loop()
+        with open(ruta, encoding='utf-8') as archivo:
+            # De a una línea: en un FIFO cada tiro se enruta apenas llega, como por TCP
+            while linea := await loop.run_in_executor(None, archivo.readline):
+                self._enrutar(linea)
+
+    async def _atender_conexion(self, reader, writer):
+        while linea := await reader.readline():
+            self._enrutar(linea.decode('utf-8'))
+        writer.close()
+
+    def _enrutar(self, linea):
+        linea = linea.strip()
+        if not linea:
+            return
+        try:
+            evento = json.loads(linea)
+            numero, pinos = int(evento['pista']), evento['pinos']
+        except (ValueError, KeyError, TypeError):
+            self.descartados += 1
+            return
+
+        cola = self.colas.get(numero)
+        if cola is None:
+            self.descartados += 1
+            return
+        cola.put_nowait((pinos, evento.get('ts') or time.time()))
+
+    # ------------------------------------------------------------------
+    # Lotes por pista
+    # ------------------------------------------------------------------
+
+    async def _trabajar(self, numero):
+        cola = self.colas[numero]
+        terminar = False
+        while not terminar:
+            primero = await cola.get()
+            if primero is None:
+                break
+            eventos = [primero]
+            limite = time.monotonic() + self.ventana
+            while len(eventos) < self.lote:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=max(0, limite - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+                if evento is None:
+                    terminar = True
+                    break
+                eventos.append(evento)
+
+            # Las pistas juntan lotes en paralelo; la escritura pasa por un solo hilo (SQLite tiene un único escritor)
+            aplicados, rechazados, descartados = await sync_to_async(self._aplicar)(
+                numero, [pinos for pinos, _ in eventos]
+            )
+            ahora = time.time()
+            self.aplicados += aplicados
+            self.rechazados += rechazados
+            self.descartados += descartados
+            self.lags.extend(ahora - ts for _, ts in eventos)
+
+    def _aplicar(self, numero, lote):
+        """
+        Aplica un lote a la partida activa de la pista.
+        Devuelve (aplicados, rechazados, descartados por falta de partida).
+        """
+        close_old_connections()
+        partida = (
+            Partida.objects.select_related('reserva')
+            .filter(pista__numero=numero, finalizada=False, reserva__fecha=date.today())
+            .order_by('-fecha_inicio')
+            .first()
+        )
+        if partida is None:
+            return 0, 0, len(lote)
+
+        aplicados = rechazados = choques = 0
+        confirmado = None  # Último estado que quedó guardado
+        while lote:
+            try:
+                # Lectura con lock y escritura en la misma transacción; lo válido
+                # hasta un tiro rechazado se guarda en esa misma transacción
+                with transaction.atomic():
+                    estado = EstadoPartida.cargar(partida, bloquear=True)
+                    rechazado = estado.registrar_lote(lote, parcial=True)
+            except IntegrityError:
+                # Otro proceso registró tiros en el medio: se recarga y se reintenta, con tope
+                choques += 1
+                if choques < MAX_REINTENTOS:
+                    continue
+                self.stderr.write(f"Pista {numero}: se descartan {len(lote)} tiros tras {choques} choques")
+                rechazados += len(lote)
+                break
+            confirmado = estado
+            if rechazado is None:
+                aplicados += len(lote)
+                break
+
+            # Se sigue con lo que viene después del rechazado
+            self.stderr.write(f"Pista {numero}: tiro rechazado ({rechazado['motivo']})")
+            indice = rechazado['indice']
+            aplicados += indice
+            if estado.siguiente_tiro() is None:
+                rechazados += len(lote) - indice
+                break
+            rechazados += 1
+            lote = lote[indice + 1:]
+
+        if aplicados:
+            # Un mensaje por lote a las pantallas de la partida, como la API de lotes
+            broker().publicar(canal_partida(partida.id_partida), 'tiro', confirmado.como_dict())
+            if confirmado.siguiente_tiro() is None:
+                finalizar_partida(partida)
+        return aplicados, rechazados, 0
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    async def _reportar_cada(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            self._reportar()
+
+    def _reportar(self, final=False):
+        transcurrido = max(time.monotonic() - self.inicio, 1e-9)
+        lags, self.lags = self.lags, []
+        lag = (
+            f"lag medio {sum(lags) / len(lags) * 1000:.0f} ms, máx {max(lags) * 1000:.0f} ms"
+            if lags else "sin lag medido"
+        )
+        mensaje = (
+            f"{self.aplicados} tiros aplicados ({self.aplicados / transcurrido:.1f} eventos/s), "
+            f"{self.rechazados} rechazados, {self.descartados} descartados, {lag}"
+        )
+        self.stdout.write(self.style.SUCCESS(mensaje) if final else mensaje)
@@ -0,0 +1,33 @@
+# bowl/management/commands/generar_miniaturas.py
+from django.core.management.base import BaseCommand
+
+from bowl import catalogo, miniaturas
+from bowl.models import Menu
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las versiones achicadas (WebP y JPEG) de las imágenes del menú que no las tienen "
+        "o que cambiaron desde la última vez. Las que fallaron no se reintentan sin --todas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help="Regenera también las que ya están al día o fallaron")
+
+    def handle(self, *args, **options):
+        generadas = fallidas = 0
+        for menu in Menu.objects.exclude(imagen='').exclude(imagen__isnull=True).order_by('pk').iterator():
+            if not options['todas'] and not miniaturas.desactualizados(menu):
+                continue
+            derivados = miniaturas.generar(menu)
+            # UPDATE directo: save() volvería a disparar la señal y a procesar la imagen
+            Menu.objects.filter(pk=menu.pk).update(derivados=derivados)
+            if derivados.get('error'):
+                fallidas += 1
+                self.stderr.write(f"No se pudo leer la imagen de «{menu}» ({menu.imagen.name}).")
+            else:
+                generadas += 1
+
+        if generadas or fallidas:
+            catalogo.invalidar()
+        self.stdout.write(self.style.SUCCESS(f"Miniaturas generadas para {generadas} productos ({fallidas} con error)."))
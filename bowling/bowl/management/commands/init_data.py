@@ -35,7 +35,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(f'TipoPista "{t["tipo"]}" {"creado" if created else "ya existe"}'))
 
         # === ESTADOS ===
-        estados = ['Disponible', 'Ocupada', 'En mantenimiento', 'Pendiente', "Completada", "Cancelada"]
+        estados = ['Disponible', 'Ocupada', 'En mantenimiento', 'Pendiente', "Completada", "Cancelada", "Vencida"]
         for e in estados:
             obj, created = Estado.objects.get_or_create(nombre=e)
             self.stdout.write(self.style.SUCCESS(f'Estado "{e}" {"creado" if created else "ya existe"}'))
@@ -96,11 +96,11 @@ class Command(BaseCommand):
         )
 
         menus_data = [
-            {'nombre': 'SpaceCafé', 'descripcion': 'Café recién hecho', 'precio': 350},
-            {'nombre': 'SpaceFries', 'descripcion': 'Papas doradas', 'precio': 600},
-            {'nombre': 'SpaceNuggets', 'descripcion': 'Nuggets crujientes', 'precio': 1200},
-            {'nombre': 'SpaceBowling Burger', 'descripcion': 'Hamburguesa', 'precio': 1800},
-            {'nombre': 'SpaceGaseosa', 'descripcion': 'Gaseosa', 'precio': 400},
+            {'nombre': 'SpaceCafé', 'descripcion': 'Café recién hecho', 'precio': 350, 'minutos_preparacion': 2},
+            {'nombre': 'SpaceFries', 'descripcion': 'Papas doradas', 'precio': 600, 'minutos_preparacion': 6},
+            {'nombre': 'SpaceNuggets', 'descripcion': 'Nuggets crujientes', 'precio': 1200, 'minutos_preparacion': 8},
+            {'nombre': 'SpaceBowling Burger', 'descripcion': 'Hamburguesa', 'precio': 1800, 'minutos_preparacion': 12},
+            {'nombre': 'SpaceGaseosa', 'descripcion': 'Gaseosa', 'precio': 400, 'minutos_preparacion': 1},
         ]
         menus = []
         for m in menus_data:
@@ -0,0 +1,17 @@
+# bowl/management/commands/reconstruir_estadisticas.py
+from django.core.management.base import BaseCommand
+
+from bowl.estadisticas import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde cero las estadísticas de clientes y jugadores a partir de las partidas finalizadas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000, help="Jugadores por bloque de lectura")
+
+    def handle(self, *args, **options):
+        jugadores, clientes = reconstruir(tamanio_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Estadísticas reconstruidas: {jugadores} jugadores, {clientes} clientes."
+        ))
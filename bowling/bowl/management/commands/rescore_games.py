@@ -0,0 +1,96 @@
+# bowl/management/commands/rescore_games.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bowl.models import Frame, Jugador
+from bowl.puntuacion import calcular_puntajes
+from bowl.puntuacion_lote import matriz_tiros, puntuar
+
+
+class Command(BaseCommand):
+    help = "Recalcula en bloque puntaje_frame y puntaje_acumulado de los frames guardados usando NumPy."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partida', type=int, nargs='*', help="Solo estas partidas (id_partida)")
+        parser.add_argument('--lote', type=int, default=5000, help="Jugadores por bloque")
+        parser.add_argument('--dry-run', action='store_true', help="Solo informa, no guarda")
+        parser.add_argument('--benchmark', action='store_true',
+                            help="Compara contra el cálculo jugador por jugador (no guarda)")
+
+    def handle(self, *args, **options):
+        jugadores = Jugador.objects.order_by('id_jugador')
+        if options['partida']:
+            jugadores = jugadores.filter(partida_id__in=options['partida'])
+        ids = list(jugadores.values_list('id_jugador', flat=True))
+
+        if options['benchmark']:
+            self._benchmark(ids, options['lote'])
+            return
+
+        revisados = corregidos = 0
+        for inicio in range(0, len(ids), options['lote']):
+            bloque = ids[inicio:inicio + options['lote']]
+            cambios = self._rescorear_bloque(bloque)
+            revisados += len(bloque)
+            corregidos += len(cambios)
+            if cambios and not options['dry_run']:
+                with transaction.atomic():
+                    Frame.objects.bulk_update(cambios, ['puntaje_frame', 'puntaje_acumulado'], batch_size=500)
+
+        accion = "a corregir" if options['dry_run'] else "corregidos"
+        self.stdout.write(self.style.SUCCESS(f"{revisados} jugadores revisados, {corregidos} frames {accion}."))
+
+    def _cargar(self, bloque):
+        """Una consulta por bloque, por rango de ids para no chocar con el límite de parámetros de SQLite."""
+        filas = list(
+            Frame.objects.filter(jugador_id__gte=bloque[0], jugador_id__lte=bloque[-1], numero__isnull=False)
+            .values_list('id', 'jugador_id', 'numero', 'tiro1', 'tiro2', 'tiro3',
+                         'puntaje_frame', 'puntaje_acumulado')
+        )
+        indice_de = {jugador_id: fila for fila, jugador_id in enumerate(bloque)}
+        filas = [f for f in filas if f[1] in indice_de]
+        tiros, jugados = matriz_tiros((f[1:6] for f in filas), indice_de)
+        return filas, indice_de, tiros, jugados
+
+    def _rescorear_bloque(self, bloque):
+        filas, indice_de, tiros, jugados = self._cargar(bloque)
+        puntajes, acumulados = puntuar(tiros)
+        # Los frames sin jugar quedan en 0, igual que con el cálculo incremental por tiro
+        puntajes[~jugados] = 0
+        acumulados[~jugados] = 0
+
+        cambios = []
+        for frame_id, jugador_id, numero, _, _, _, puntaje, acumulado in filas:
+            fila, columna = indice_de[jugador_id], numero - 1
+            nuevo_puntaje = int(puntajes[fila, columna])
+            nuevo_acumulado = int(acumulados[fila, columna])
+            if (puntaje, acumulado) != (nuevo_puntaje, nuevo_acumulado):
+                cambios.append(Frame(id=frame_id, puntaje_frame=nuevo_puntaje, puntaje_acumulado=nuevo_acumulado))
+        return cambios
+
+    def _benchmark(self, ids, lote):
+        inicio = time.perf_counter()
+        totales_por_jugador = {}
+        for jugador_id in ids:
+            frames = list(Frame.objects.filter(jugador_id=jugador_id).order_by('numero'))
+            if len(frames) == 10:
+                totales_por_jugador[jugador_id] = calcular_puntajes(frames)[1]
+        por_jugador = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        totales_lote = {}
+        for desde in range(0, len(ids), lote):
+            bloque = ids[desde:desde + lote]
+            _, indice_de, tiros, _ = self._cargar(bloque)
+            _, acumulados = puntuar(tiros)
+            totales_lote.update((j, int(acumulados[fila, 9])) for j, fila in indice_de.items())
+        vectorizado = time.perf_counter() - inicio
+
+        distintos = sum(1 for j, total in totales_por_jugador.items() if totales_lote[j] != total)
+        self.stdout.write(f"Jugador por jugador: {por_jugador:.3f} s ({len(ids)} jugadores)")
+        self.stdout.write(f"Vectorizado (NumPy): {vectorizado:.3f} s")
+        self.stdout.write(f"Aceleración: x{por_jugador / max(vectorizado, 1e-9):.1f}")
+        estilo = self.style.SUCCESS if not distintos else self.style.ERROR
+        self.stdout.write(estilo(f"{distintos} jugadores con totales distintos."))
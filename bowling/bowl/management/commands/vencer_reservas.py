@@ -0,0 +1,29 @@
+# bowl/management/commands/vencer_reservas.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from bowl.vencimientos import vencer_pendientes
+
+
+class Command(BaseCommand):
+    help = "Pasa a 'Vencida' las reservas que siguen pendientes en fechas pasadas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true', help="Ignora la marca de agua y revisa todas las fechas")
+        parser.add_argument('--cada', type=int, help="Segundos entre corridas; sin esto corre una sola vez")
+
+    def handle(self, *args, **options):
+        completo = options['completo']
+        while True:
+            vencidas = vencer_pendientes(completo=completo)
+            self.stdout.write(self.style.SUCCESS(f"Reservas vencidas: {vencidas}."))
+            if not options['cada']:
+                break
+            completo = False
+            close_old_connections()
+            try:
+                time.sleep(options['cada'])
+            except KeyboardInterrupt:
+                break
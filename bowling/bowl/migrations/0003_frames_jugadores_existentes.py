@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:41
+
+from django.db import migrations
+
+
+def crear_frames_faltantes(apps, schema_editor):
+    """Los frames ahora se crean al agregar el jugador; completa los jugadores viejos."""
+    Jugador = apps.get_model('bowl', 'Jugador')
+    Frame = apps.get_model('bowl', 'Frame')
+    Frame.objects.bulk_create(
+        [
+            Frame(jugador_id=jugador_id, numero=numero)
+            for jugador_id in Jugador.objects.values_list('id_jugador', flat=True)
+            for numero in range(1, 11)
+        ],
+        ignore_conflicts=True,
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0002_puntajejugador'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_frames_faltantes, migrations.RunPython.noop),
+    ]
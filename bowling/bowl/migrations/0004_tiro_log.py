@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0003_frames_jugadores_existentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partida',
+            name='ultimo_tiro',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Tiro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('secuencia', models.PositiveIntegerField()),
+                ('pinos', models.PositiveSmallIntegerField()),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('jugador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tiros', to='bowl.jugador')),
+                ('partida', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tiros', to='bowl.partida')),
+            ],
+            options={
+                'ordering': ['secuencia'],
+                'unique_together': {('partida', 'secuencia')},
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0004_tiro_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jugador',
+            name='cliente',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jugadores', to='bowl.cliente'),
+        ),
+        migrations.CreateModel(
+            name='EstadisticaCliente',
+            fields=[
+                ('partidas_jugadas', models.PositiveIntegerField(default=0)),
+                ('pinos_totales', models.PositiveIntegerField(default=0)),
+                ('mejor_partida', models.PositiveSmallIntegerField(default=0)),
+                ('strikes', models.PositiveIntegerField(default=0)),
+                ('spares', models.PositiveIntegerField(default=0)),
+                ('oportunidades_strike', models.PositiveIntegerField(default=0)),
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estadistica', serialize=False, to='bowl.cliente')),
+            ],
+            options={
+                'verbose_name': 'Estadística de cliente',
+                'verbose_name_plural': 'Estadísticas de clientes',
+                'indexes': [models.Index(fields=['-mejor_partida'], name='bowl_estadi_mejor_p_987bbd_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EstadisticaJugador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partidas_jugadas', models.PositiveIntegerField(default=0)),
+                ('pinos_totales', models.PositiveIntegerField(default=0)),
+                ('mejor_partida', models.PositiveSmallIntegerField(default=0)),
+                ('strikes', models.PositiveIntegerField(default=0)),
+                ('spares', models.PositiveIntegerField(default=0)),
+                ('oportunidades_strike', models.PositiveIntegerField(default=0)),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Estadística de jugador',
+                'verbose_name_plural': 'Estadísticas de jugadores',
+                'indexes': [models.Index(fields=['-mejor_partida'], name='bowl_estadi_mejor_p_649b48_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+def marcar_reservas_cerradas(apps, schema_editor):
+    """Las reservas canceladas o ya jugadas dejan de ocupar su horario."""
+    Reserva = apps.get_model('bowl', 'Reserva')
+    cerradas = models.Q()
+    for nombre in ('disponible', 'completada', 'cancelada'):
+        cerradas |= models.Q(estado__nombre__iexact=nombre)
+    Reserva.objects.filter(cerradas).update(activa=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0005_estadisticas'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='reserva',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='activa',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.RunPython(marcar_reservas_cerradas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reserva',
+            constraint=models.UniqueConstraint(condition=models.Q(('activa', True)), fields=('pista', 'fecha', 'hora'), name='reserva_activa_unica'),
+        ),
+    ]
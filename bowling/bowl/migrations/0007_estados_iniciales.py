@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:10
+
+from django.db import migrations
+
+ESTADOS = ["Pendiente", "Disponible", "Completada", "En preparación", "Listo", "Entregado"]
+
+
+def sembrar_estados(apps, schema_editor):
+    """Antes se creaban en cada pedido de GestionReservaView y CocinaView; ahora una sola vez."""
+    Estado = apps.get_model('bowl', 'Estado')
+    for nombre in ESTADOS:
+        Estado.objects.get_or_create(nombre=nombre)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0006_reserva_activa_unica'),
+    ]
+
+    operations = [
+        migrations.RunPython(sembrar_estados, migrations.RunPython.noop),
+    ]
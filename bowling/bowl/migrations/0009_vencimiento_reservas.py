@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+def sembrar_vencida(apps, schema_editor):
+    Estado = apps.get_model('bowl', 'Estado')
+    Estado.objects.get_or_create(nombre="Vencida")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0008_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Barrido',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('hasta', models.DateField(blank=True, null=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(sembrar_vencida, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Historial: reservas actuales (con número de pista y nombre de estado) + archivadas
+VISTA_HISTORIAL = """
+CREATE VIEW bowl_reserva_historica AS
+SELECT r.id_reserva, r.fecha, r.hora, r.cliente_id, p.numero AS pista_numero,
+       r.precio_total, e.nombre AS estado, FALSE AS archivada
+  FROM bowl_reserva r
+  LEFT JOIN bowl_pista p ON p.id_pista = r.pista_id
+  LEFT JOIN bowl_estado e ON e.id = r.estado_id
+UNION ALL
+SELECT a.id_reserva, a.fecha, a.hora, a.cliente_id, a.pista_numero,
+       a.precio_total, a.estado, TRUE AS archivada
+  FROM bowl_reservaarchivada a
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0009_vencimiento_reservas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaHistorica',
+            fields=[
+                ('id_reserva', models.IntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('hora', models.TimeField()),
+                ('pista_numero', models.PositiveIntegerField(null=True)),
+                ('precio_total', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('estado', models.CharField(max_length=50, null=True)),
+                ('archivada', models.BooleanField()),
+            ],
+            options={
+                'verbose_name': 'Reserva (historial)',
+                'verbose_name_plural': 'Reservas (historial)',
+                'db_table': 'bowl_reserva_historica',
+                'ordering': ['-fecha', '-hora'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PartidaArchivada',
+            fields=[
+                ('id_partida', models.IntegerField(primary_key=True, serialize=False)),
+                ('id_reserva', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('pista_numero', models.PositiveIntegerField(blank=True, null=True)),
+                ('fecha', models.DateField(blank=True, null=True)),
+                ('finalizada', models.BooleanField(default=False)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('jugadores', models.JSONField(default=list)),
+                ('archivada', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='partidas_archivadas', to='bowl.cliente')),
+            ],
+            options={
+                'verbose_name': 'Partida archivada',
+                'verbose_name_plural': 'Partidas archivadas',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PedidoArchivado',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('id_reserva', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('fecha', models.DateTimeField(blank=True, null=True)),
+                ('estado', models.CharField(blank=True, max_length=50)),
+                ('precio_total', models.DecimalField(blank=True, decimal_places=2, default=0.0, max_digits=10, null=True)),
+                ('detalles', models.JSONField(default=list)),
+                ('archivada', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pedidos_archivados', to='bowl.cliente')),
+            ],
+            options={
+                'verbose_name': 'Pedido archivado',
+                'verbose_name_plural': 'Pedidos archivados',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReservaArchivada',
+            fields=[
+                ('id_reserva', models.IntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('hora', models.TimeField()),
+                ('pista_numero', models.PositiveIntegerField(blank=True, null=True)),
+                ('precio_total', models.DecimalField(blank=True, decimal_places=2, default=0.0, max_digits=10, null=True)),
+                ('estado', models.CharField(blank=True, max_length=50)),
+                ('fecha_creacion', models.DateTimeField(blank=True, null=True)),
+                ('archivada', models.DateTimeField(auto_now_add=True)),
+                ('cliente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservas_archivadas', to='bowl.cliente')),
+            ],
+            options={
+                'verbose_name': 'Reserva archivada',
+                'verbose_name_plural': 'Reservas archivadas',
+                'ordering': ['-fecha', '-hora'],
+                'indexes': [models.Index(fields=['cliente', 'fecha', 'hora'], name='reserva_arch_cliente_idx')],
+            },
+        ),
+        migrations.RunSQL(VISTA_HISTORIAL, 'DROP VIEW bowl_reserva_historica'),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:13
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def congelar_precios(apps, schema_editor):
+    """Los ítems existentes congelan el precio que ya cobraron (o el del menú); los totales se recalculan una vez."""
+    DetallePedido = apps.get_model('bowl', 'DetallePedido')
+    Menu = apps.get_model('bowl', 'Menu')
+    Pedido = apps.get_model('bowl', 'Pedido')
+
+    DetallePedido.objects.filter(subtotal__isnull=False, cantidad__gt=0).update(
+        precio_unitario=ExpressionWrapper(
+            F('subtotal') / F('cantidad'), output_field=DecimalField(max_digits=8, decimal_places=2)
+        )
+    )
+    DetallePedido.objects.filter(precio_unitario__isnull=True, menu__isnull=False).update(
+        precio_unitario=Coalesce(Subquery(Menu.objects.filter(pk=OuterRef('menu_id')).values('precio')[:1]), 0,
+                                 output_field=DecimalField(max_digits=8, decimal_places=2))
+    )
+    sumas = (
+        DetallePedido.objects.filter(pedido=OuterRef('pk')).order_by()
+        .values('pedido').annotate(total=Sum('subtotal')).values('total')
+    )
+    Pedido.objects.update(
+        precio_total=Coalesce(Subquery(sumas), 0, output_field=DecimalField(max_digits=10, decimal_places=2))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0010_archivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detallepedido',
+            name='precio_unitario',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.RunPython(congelar_precios, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0011_precio_congelado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menu',
+            name='derivados',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0012_miniaturas_menu'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menu',
+            name='minutos_preparacion',
+            field=models.PositiveSmallIntegerField(default=5),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='enviado_a_cocina',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:05
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def continuar_versiones(apps, schema_editor):
+    # Por encima de la versión anterior (último tiro + jugadores): ningún ETag ya entregado se repite
+    Partida = apps.get_model('bowl', 'Partida')
+    Tiro = apps.get_model('bowl', 'Tiro')
+    Jugador = apps.get_model('bowl', 'Jugador')
+    ultimo = (
+        Tiro.objects.filter(partida=OuterRef('pk')).values('partida')
+        .annotate(ultimo=Max('secuencia')).values('ultimo')
+    )
+    jugadores = (
+        Jugador.objects.filter(partida=OuterRef('pk')).values('partida')
+        .annotate(cantidad=Count('pk')).values('cantidad')
+    )
+    Partida.objects.update(version=Coalesce(Subquery(ultimo), 0) + Coalesce(Subquery(jugadores), 0) + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bowl', '0013_cola_cocina'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='partida',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(continuar_versiones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,135 @@
+# bowl/miniaturas.py
+"""
+Versiones achicadas de las imágenes del menú.
+
+Menu.imagen guarda el archivo tal como se subió (a veces fotos de varios
+MB) y las tarjetas del menú se ven en celulares. Al guardar un Menu con
+imagen nueva (ver bowl.signals) se generan anchos fijos en WebP y en JPEG
+y quedan anotados en Menu.derivados; el catálogo arma con eso los srcset
+y cada template elige con `sizes`. Las imágenes ya cargadas se procesan
+con `manage.py generar_miniaturas`.
+
+El nombre de cada derivado es el hash de su contenido: si el archivo
+cambia, cambia la URL, así que se pueden cachear para siempre (ver
+servir_media en bowl.views). Los derivados viejos no se borran: alguna
+página cacheada todavía puede apuntarles.
+"""
+import hashlib
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+CARPETA = 'menu/derivados'
+ANCHOS = (320, 640, 960)
+FORMATOS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Ancho del src de respaldo (navegadores sin srcset)
+ANCHO_RESPALDO = 640
+
+
+def anchos():
+    return tuple(getattr(settings, 'MENU_ANCHOS_IMAGEN', ANCHOS))
+
+
+def _abrir(archivo):
+    archivo.open('rb')
+    try:
+        imagen = Image.open(archivo)
+        imagen.load()
+    finally:
+        archivo.close()
+    # Las fotos de celular vienen giradas por EXIF
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode in ('RGBA', 'LA', 'P'):
+        # JPEG no tiene transparencia: fondo blanco, como las tarjetas
+        imagen = imagen.convert('RGBA')
+        fondo = Image.new('RGB', imagen.size, (255, 255, 255))
+        fondo.paste(imagen, mask=imagen.getchannel('A'))
+        return fondo
+    return imagen.convert('RGB')
+
+
+def _guardar(storage, imagen, ancho, formato):
+    nombre_pil, opciones = FORMATOS[formato]
+    buffer = io.BytesIO()
+    imagen.save(buffer, nombre_pil, **opciones)
+    contenido = buffer.getvalue()
+    huella = hashlib.sha256(contenido).hexdigest()[:16]
+    nombre = f'{CARPETA}/{huella}-{ancho}.{formato}'
+    # Mismo hash, mismo contenido: si ya está (reproceso, backfill repetido) no se escribe
+    if not storage.exists(nombre):
+        nombre = storage.save(nombre, ContentFile(contenido))
+    return nombre
+
+
+def generar(menu):
+    """
+    Genera los derivados de menu.imagen y devuelve el dict para Menu.derivados
+    ({} si no tiene imagen). No guarda el Menu.
+
+    Si la imagen no se puede leer devuelve {'origen': ..., 'error': True}: queda
+    al día para desactualizados() y no se reintenta hasta que cambie la imagen.
+    """
+    if not menu.imagen:
+        return {}
+    try:
+        original = _abrir(menu.imagen)
+    except (OSError, Image.DecompressionBombError):
+        logger.exception("No se pudo procesar la imagen %s del menú %s", menu.imagen.name, menu.pk)
+        return {'origen': menu.imagen.name, 'error': True}
+
+    storage = menu.imagen.storage
+    ancho_original, alto_original = original.size
+    derivados = {'origen': menu.imagen.name, 'ancho': ancho_original, 'alto': alto_original}
+    for formato in FORMATOS:
+        derivados[formato] = {}
+    # Nunca se agranda: los anchos mayores que el original se reemplazan por el original
+    for ancho in sorted({min(ancho, ancho_original) for ancho in anchos()}):
+        alto = max(1, round(alto_original * ancho / ancho_original))
+        achicada = original if ancho == ancho_original else original.resize((ancho, alto), Image.LANCZOS)
+        for formato in FORMATOS:
+            derivados[formato][str(ancho)] = _guardar(storage, achicada, ancho, formato)
+    return derivados
+
+
+def desactualizados(menu):
+    """True si los derivados no corresponden a la imagen actual."""
+    if not menu.imagen:
+        return bool(menu.derivados)
+    return (menu.derivados or {}).get('origen') != menu.imagen.name
+
+
+def _srcset(storage, nombres):
+    return ', '.join(f'{storage.url(nombre)} {ancho}w' for ancho, nombre in
+                     sorted(nombres.items(), key=lambda par: int(par[0])))
+
+
+def para_template(menu):
+    """
+    Datos de la imagen para una tarjeta: `imagen` (src de respaldo), `srcset` (JPEG),
+    `srcset_webp`, `ancho` y `alto`. Sin derivados (o si fallaron) queda solo la original.
+    """
+    if not menu.imagen:
+        return {'imagen': None, 'srcset': '', 'srcset_webp': '', 'ancho': None, 'alto': None}
+    derivados = menu.derivados or {}
+    if derivados.get('origen') != menu.imagen.name or derivados.get('error'):
+        return {'imagen': menu.imagen.url, 'srcset': '', 'srcset_webp': '', 'ancho': None, 'alto': None}
+
+    storage = menu.imagen.storage
+    jpeg = derivados['jpeg']
+    # El src de respaldo: el ancho más chico que cubra ANCHO_RESPALDO, o el más grande que haya
+    ancho_respaldo = min((int(a) for a in jpeg if int(a) >= ANCHO_RESPALDO), default=max(int(a) for a in jpeg))
+    return {
+        'imagen': storage.url(jpeg[str(ancho_respaldo)]),
+        'srcset': _srcset(storage, jpeg),
+        'srcset_webp': _srcset(storage, derivados['webp']),
+        'ancho': derivados['ancho'],
+        'alto': derivados['alto'],
+    }
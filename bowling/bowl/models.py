@@ -92,14 +92,61 @@ class Reserva(models.Model):
     precio_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, blank=True, null=True)
     estado = models.ForeignKey(Estado, on_delete=models.SET_NULL, null=True, blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True, blank=True, null=True)
+    # Ocupa la pista; se deriva del estado al guardar y es lo que cubre la restricción única
+    activa = models.BooleanField(default=True, editable=False)
+
+    # Estados con los que la reserva libera el horario (cancelada, ya jugada o vencida sin jugarse)
+    ESTADOS_CERRADOS = ('disponible', 'completada', 'cancelada', 'vencida')
+
+    @classmethod
+    def activa_con(cls, estado_id):
+        """
+        Si una reserva con ese estado ocupa la pista. Lo usan save() y los caminos que no
+        pasan por save() (bulk_create, update), así la regla está en un solo lugar.
+        El nombre sale del registro de estados, sin consultar la tabla.
+        """
+        from . import estados  # estados importa este módulo
+
+        nombre = estados.nombre_de(estado_id)
+        return nombre is None or nombre.lower() not in cls.ESTADOS_CERRADOS
+
+    def save(self, *args, **kwargs):
+        self.activa = self.activa_con(self.estado_id)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'estado' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'activa'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         hora_str = self.hora.strftime('%H:%M') if self.hora else "??:??"
         return f"Reserva {self.id_reserva} - {self.fecha} {hora_str}"
 
     class Meta:
-        unique_together = ('pista', 'fecha', 'hora')
         ordering = ['-fecha', '-hora']
+        constraints = [
+            # Una sola reserva activa por pista y horario; las canceladas no bloquean el horario
+            models.UniqueConstraint(
+                fields=['pista', 'fecha', 'hora'],
+                condition=models.Q(activa=True),
+                name='reserva_activa_unica',
+            ),
+        ]
+        indexes = [
+            # Disponibilidad y calendario: reservas activas de una fecha (o rango)
+            models.Index(fields=['fecha', 'activa', 'hora'], name='reserva_fecha_activa_idx'),
+            # "Mis reservas": del cliente, por estado, más nuevas primero
+            models.Index(fields=['cliente', 'estado', 'fecha', 'hora'], name='reserva_cliente_estado_idx'),
+        ]
+
+
+class Barrido(models.Model):
+    """Marca de agua de un barrido periódico: hasta qué fecha (exclusive) ya se procesó."""
+    nombre = models.CharField(max_length=50, unique=True)
+    hasta = models.DateField(null=True, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.nombre} hasta {self.hasta or '-'}"
 
 
 # ==============================================================================
@@ -115,6 +162,10 @@ class Partida(models.Model):
     finalizada = models.BooleanField(default=False)
     fecha_inicio = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     fecha_fin = models.DateTimeField(null=True, blank=True)
+    # Último Tiro del log ya aplicado a los frames
+    ultimo_tiro = models.PositiveIntegerField(default=0)
+    # Versión del tablero (ETag): solo sube, con cada tiro y cada alta, cambio o baja de un jugador
+    version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         pista_num = self.pista.numero if self.pista else "?"
@@ -130,6 +181,8 @@ class Jugador(models.Model):
     partida = models.ForeignKey(Partida, on_delete=models.CASCADE, related_name='jugadores', null=True, blank=True)
     nombre = models.CharField(max_length=100, blank=True, null=True)
     orden = models.PositiveIntegerField(default=0, blank=True, null=True)
+    # Solo para el jugador que es el dueño de la reserva
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True, related_name='jugadores')
 
     class Meta:
         ordering = ['orden']
@@ -139,7 +192,8 @@ class Jugador(models.Model):
         return self.nombre or "Jugador sin nombre"
 
     def puntaje_total(self):
-        ultimo_frame = self.frames.order_by('numero').last()
+        # puntaje_acumulado se guarda en cada tiro: alcanza con el último frame jugado
+        ultimo_frame = self.frames.filter(tiro1__isnull=False).order_by('numero').last()
         return ultimo_frame.puntaje_acumulado if ultimo_frame else 0
 
 
@@ -169,6 +223,22 @@ class Frame(models.Model):
                 self.tiro1 + self.tiro2 == 10 and self.tiro1 != 10)
 
 
+class Tiro(models.Model):
+    """Log de tiros (solo se agrega). Los frames se proyectan a partir de acá."""
+    partida = models.ForeignKey(Partida, on_delete=models.CASCADE, related_name='tiros')
+    jugador = models.ForeignKey(Jugador, on_delete=models.CASCADE, related_name='tiros')
+    secuencia = models.PositiveIntegerField()
+    pinos = models.PositiveSmallIntegerField()
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('partida', 'secuencia')
+        ordering = ['secuencia']
+
+    def __str__(self):
+        return f"Tiro {self.secuencia} - {self.jugador}: {self.pinos}"
+
+
 # ==============================================================================
 # 5. CAFETERÍA Y PEDIDOS
 # ==============================================================================
@@ -190,6 +260,10 @@ class Menu(models.Model):
     precio = models.DecimalField(max_digits=8, decimal_places=2, default=0.00, blank=True, null=True)
     disponible = models.BooleanField(default=True)
     imagen = models.ImageField(upload_to='menu/', blank=True, null=True)
+    # Versiones achicadas de la imagen (WebP y JPEG por ancho), ver bowl/miniaturas.py
+    derivados = models.JSONField(default=dict, blank=True, editable=False)
+    # Estimación por unidad para ordenar la cola de la cocina (ver bowl/planificador.py)
+    minutos_preparacion = models.PositiveSmallIntegerField(default=5)
 
     def __str__(self):
         return f"{self.nombre or 'Sin nombre'} - ${self.precio or 0}"
@@ -201,20 +275,33 @@ class Pedido(models.Model):
     fecha = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     estado = models.ForeignKey(Estado, on_delete=models.SET_NULL, null=True, blank=True)
     precio_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, blank=True, null=True)
+    # Cuándo pasó a En preparación (lo completa bowl.signals); es la llegada a la cola de la cocina
+    enviado_a_cocina = models.DateTimeField(blank=True, null=True)
 
     def __str__(self):
         return f"Pedido {self.id} - {self.cliente or 'Anónimo'}"
 
+    class Meta:
+        indexes = [
+            # Pedido activo de una reserva (excluye entregados, el más nuevo primero)
+            models.Index(fields=['reserva', 'estado', 'fecha'], name='pedido_reserva_estado_idx'),
+        ]
+
 
 class DetallePedido(models.Model):
     pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='detalles', null=True, blank=True)
     menu = models.ForeignKey(Menu, on_delete=models.CASCADE, null=True, blank=True)
     cantidad = models.PositiveIntegerField(default=1, blank=True, null=True)
+    # Precio del menú cuando se agregó el ítem: si el menú cambia de precio, el pedido no
+    precio_unitario = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
     subtotal = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
 
     def save(self, *args, **kwargs):
-        if self.menu and self.menu.precio is not None:
-            self.subtotal = (self.menu.precio or 0) * (self.cantidad or 1)
+        # El menú solo se lee si todavía no hay precio congelado (bowl.pedidos ya lo trae)
+        if self.precio_unitario is None and self.menu_id:
+            self.precio_unitario = self.menu.precio or 0
+        if self.precio_unitario is not None:
+            self.subtotal = self.precio_unitario * (self.cantidad or 1)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -237,6 +324,7 @@ class Mensaje(models.Model):
 
     class Meta:
         ordering = ['-fecha']
+        indexes = [models.Index(fields=['-fecha'], name='mensaje_fecha_idx')]
 class PuntajeJugador(models.Model):
     id_puntaje = models.AutoField(primary_key=True)
     partida = models.ForeignKey(Partida, on_delete=models.CASCADE)
@@ -251,4 +339,148 @@ class PuntajeJugador(models.Model):
         verbose_name_plural = "Puntajes por set"
 
     def __str__(self):
-        return f"{self.jugador} - Set {self.set}: {self.puntaje}"
\ No newline at end of file
+        return f"{self.jugador} - Set {self.set}: {self.puntaje}"
+
+
+# ==============================================================================
+# 7. ESTADÍSTICAS (se actualizan al terminar cada partida)
+# ==============================================================================
+
+class EstadisticaBase(models.Model):
+    partidas_jugadas = models.PositiveIntegerField(default=0)
+    pinos_totales = models.PositiveIntegerField(default=0)
+    mejor_partida = models.PositiveSmallIntegerField(default=0)
+    strikes = models.PositiveIntegerField(default=0)
+    spares = models.PositiveIntegerField(default=0)
+    oportunidades_strike = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def promedio(self):
+        return round(self.pinos_totales / self.partidas_jugadas, 1) if self.partidas_jugadas else 0
+
+    @property
+    def porcentaje_strikes(self):
+        return round(100 * self.strikes / self.oportunidades_strike, 1) if self.oportunidades_strike else 0
+
+
+class EstadisticaCliente(EstadisticaBase):
+    cliente = models.OneToOneField(Cliente, on_delete=models.CASCADE, primary_key=True, related_name='estadistica')
+
+    class Meta:
+        verbose_name = "Estadística de cliente"
+        verbose_name_plural = "Estadísticas de clientes"
+        indexes = [models.Index(fields=['-mejor_partida'])]
+
+    def __str__(self):
+        return f"{self.cliente.nombre} - {self.partidas_jugadas} partidas"
+
+
+class EstadisticaJugador(EstadisticaBase):
+    nombre = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        verbose_name = "Estadística de jugador"
+        verbose_name_plural = "Estadísticas de jugadores"
+        indexes = [models.Index(fields=['-mejor_partida'])]
+
+    def __str__(self):
+        return f"{self.nombre} - {self.partidas_jugadas} partidas"
+
+
+# ==============================================================================
+# 8. ARCHIVO (reservas, partidas y pedidos viejos, fuera de las tablas calientes)
+# ==============================================================================
+
+class ReservaArchivada(models.Model):
+    # Mismo id que tenía la reserva: el historial no distingue de qué tabla viene
+    id_reserva = models.IntegerField(primary_key=True)
+    fecha = models.DateField()
+    hora = models.TimeField()
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='reservas_archivadas')
+    pista_numero = models.PositiveIntegerField(null=True, blank=True)
+    precio_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, blank=True, null=True)
+    estado = models.CharField(max_length=50, blank=True)
+    fecha_creacion = models.DateTimeField(blank=True, null=True)
+    archivada = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-fecha', '-hora']
+        verbose_name = "Reserva archivada"
+        verbose_name_plural = "Reservas archivadas"
+        indexes = [models.Index(fields=['cliente', 'fecha', 'hora'], name='reserva_arch_cliente_idx')]
+
+    def __str__(self):
+        return f"Reserva {self.id_reserva} - {self.fecha} {self.hora:%H:%M} (archivada)"
+
+
+class PartidaArchivada(models.Model):
+    """Resumen de una partida: totales, estadísticas y tiros por jugador, sin Jugador/Frame/Tiro."""
+    id_partida = models.IntegerField(primary_key=True)
+    id_reserva = models.IntegerField(null=True, blank=True, db_index=True)
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='partidas_archivadas')
+    pista_numero = models.PositiveIntegerField(null=True, blank=True)
+    fecha = models.DateField(null=True, blank=True)
+    finalizada = models.BooleanField(default=False)
+    fecha_inicio = models.DateTimeField(blank=True, null=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+    # [{nombre, cliente_id, total, resumen: {...}, frames: [[t1, t2, t3], ...]}, ...]
+    jugadores = models.JSONField(default=list)
+    archivada = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name = "Partida archivada"
+        verbose_name_plural = "Partidas archivadas"
+
+    def __str__(self):
+        return f"Partida {self.id_partida} - Pista {self.pista_numero or '?'} - {self.fecha or '?'} (archivada)"
+
+
+class PedidoArchivado(models.Model):
+    id = models.IntegerField(primary_key=True)
+    id_reserva = models.IntegerField(null=True, blank=True, db_index=True)
+    cliente = models.ForeignKey(Cliente, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='pedidos_archivados')
+    fecha = models.DateTimeField(blank=True, null=True)
+    estado = models.CharField(max_length=50, blank=True)
+    precio_total = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, blank=True, null=True)
+    # [{menu, cantidad, subtotal}, ...]
+    detalles = models.JSONField(default=list)
+    archivada = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Pedido archivado"
+        verbose_name_plural = "Pedidos archivados"
+
+    def __str__(self):
+        return f"Pedido {self.id} (archivado)"
+
+
+class ReservaHistorica(models.Model):
+    """
+    Vista de solo lectura (migración 0010): reservas actuales y archivadas juntas,
+    para que historiales y reportes no tengan que saber dónde quedó cada una.
+    """
+    id_reserva = models.IntegerField(primary_key=True)
+    fecha = models.DateField()
+    hora = models.TimeField()
+    cliente = models.ForeignKey(Cliente, on_delete=models.DO_NOTHING, null=True, related_name='+')
+    pista_numero = models.PositiveIntegerField(null=True)
+    precio_total = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    estado = models.CharField(max_length=50, null=True)
+    archivada = models.BooleanField()
+
+    class Meta:
+        managed = False
+        db_table = 'bowl_reserva_historica'
+        ordering = ['-fecha', '-hora']
+        verbose_name = "Reserva (historial)"
+        verbose_name_plural = "Reservas (historial)"
+
+    def __str__(self):
+        return f"Reserva {self.id_reserva} - {self.fecha} {self.hora:%H:%M}"
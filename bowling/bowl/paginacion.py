@@ -0,0 +1,140 @@
+# bowl/paginacion.py
+"""
+Paginación por cursor (keyset).
+
+En vez de OFFSET, cada página pide "las filas que vienen después de la
+última que mostré" según el mismo orden del listado. Con un índice que
+cubra ese orden, la página 2.000 cuesta lo mismo que la primera, y el
+cursor no se corre si entran filas nuevas mientras alguien navega.
+
+El cursor es opaco para el cliente: los valores de orden de la última
+fila, en JSON y base64. Al orden se le agrega siempre la pk para que no
+haya empates entre filas con la misma fecha y hora.
+"""
+import base64
+import binascii
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+
+TAMANIO_PAGINA = 50
+MAX_TAMANIO_PAGINA = 200
+
+
+def codificar(valores):
+    crudo = json.dumps(valores, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip('=')
+
+
+def decodificar(cursor, cantidad):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise Http404("Cursor inválido")
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise Http404("Cursor inválido")
+    return valores
+
+
+def _valor(objeto, campo):
+    for parte in campo.split('__'):
+        objeto = getattr(objeto, parte)
+    return objeto
+
+
+def _despues_de(orden, valores):
+    """(a > va) OR (a = va AND b > vb) OR ..., respetando la dirección de cada campo."""
+    condicion = Q()
+    iguales = {}
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip('-')
+        comparacion = 'lt' if campo.startswith('-') else 'gt'
+        condicion |= Q(**iguales, **{f'{nombre}__{comparacion}': valor})
+        iguales[nombre] = valor
+    return condicion
+
+
+class Pagina:
+    def __init__(self, objetos, siguiente):
+        self.objetos = objetos
+        self.siguiente = siguiente  # Cursor de la próxima página, o None si es la última
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+
+def paginar(queryset, orden, cursor=None, tamanio=TAMANIO_PAGINA):
+    """
+    Una página de `queryset` ordenado por `orden` (campos con '-' para descendente).
+    Se lee una fila de más solo para saber si hay página siguiente.
+    """
+    pk = '-pk' if orden[-1].startswith('-') else 'pk'
+    orden = [*orden, pk]
+    queryset = queryset.order_by(*orden)
+    if cursor:
+        queryset = queryset.filter(_despues_de(orden, decodificar(cursor, len(orden))))
+
+    objetos = list(queryset[:tamanio + 1])
+    siguiente = None
+    if len(objetos) > tamanio:
+        objetos = objetos[:tamanio]
+        siguiente = codificar([_valor(objetos[-1], campo.lstrip('-')) for campo in orden])
+    return Pagina(objetos, siguiente)
+
+
+def tamanio_pedido(request):
+    try:
+        tamanio = int(request.GET.get('tamanio', TAMANIO_PAGINA))
+    except ValueError:
+        tamanio = TAMANIO_PAGINA
+    return min(max(tamanio, 1), MAX_TAMANIO_PAGINA)
+
+
+def pide_json(request):
+    return request.GET.get('formato') == 'json'
+
+
+def respuesta_json(pagina, serializar):
+    return JsonResponse({
+        'resultados': [serializar(objeto) for objeto in pagina],
+        'siguiente': pagina.siguiente,
+    })
+
+
+class PaginacionKeysetMixin:
+    """
+    Para ListView: reemplaza la paginación por OFFSET. La página sale del
+    get_queryset de la vista ordenado por `orden` y cortado por cursor
+    (?cursor=...&tamanio=...); en el template queda como `pagina`. Con
+    ?formato=json devuelve la misma página serializada con `serializar`.
+    """
+    orden = ()
+    # Campos del JSON por defecto (se puede atravesar relaciones con '__'); None = las columnas del modelo
+    campos_json = None
+
+    def get_paginate_by(self, queryset):
+        return tamanio_pedido(self.request)
+
+    def paginate_queryset(self, queryset, page_size):
+        self.pagina = paginar(queryset, self.orden, self.request.GET.get('cursor'), page_size)
+        return None, self.pagina, self.pagina.objetos, self.pagina.siguiente is not None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['pagina'] = self.pagina
+        return context
+
+    def serializar(self, objeto):
+        """Fila del JSON; las vistas que necesitan otro formato lo redefinen."""
+        campos = self.campos_json or [campo.attname for campo in objeto._meta.concrete_fields]
+        return {campo: _valor(objeto, campo) for campo in campos}
+
+    def render_to_response(self, context, **kwargs):
+        if pide_json(self.request):
+            return respuesta_json(self.pagina, self.serializar)
+        return super().render_to_response(context, **kwargs)
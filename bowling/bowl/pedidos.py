@@ -0,0 +1,59 @@
+# bowl/pedidos.py
+"""
+Ítems de los pedidos de la cafetería.
+
+El total del pedido no se recalcula sumando los detalles: cada alta o baja
+lo corrige con un UPDATE relativo (F) en la base, así dos celulares que
+agregan a la vez sobre la misma pista no se pisan. El precio de cada ítem
+se congela al agregarlo (DetallePedido.precio_unitario). Cada operación
+hace una cantidad fija de consultas, sin importar cuántos ítems tenga el
+pedido.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Coalesce
+
+from . import cocina
+from .models import DetallePedido, Pedido
+
+
+def _sumar_al_total(pedido_id, importe):
+    total = Coalesce(F('precio_total'), Value(Decimal('0')), output_field=DecimalField(max_digits=10, decimal_places=2))
+    Pedido.objects.filter(pk=pedido_id).update(precio_total=total + importe)
+    # El UPDATE no dispara post_save: la pantalla de cocina se avisa a mano
+    transaction.on_commit(lambda: cocina.notificar(pedido_id))
+
+
+def agregar_item(pedido_id, menu, cantidad):
+    """Suma `cantidad` del menú al pedido, al precio de ahora. Devuelve el importe agregado."""
+    precio = menu.precio or 0
+    importe = precio * cantidad
+    with transaction.atomic():
+        # Mismo producto al mismo precio: se suma a la línea existente
+        sumado = DetallePedido.objects.filter(pedido_id=pedido_id, menu_id=menu.pk, precio_unitario=precio).update(
+            cantidad=F('cantidad') + cantidad, subtotal=F('subtotal') + importe
+        )
+        if not sumado:
+            DetallePedido.objects.create(
+                pedido_id=pedido_id, menu=menu, cantidad=cantidad, precio_unitario=precio, subtotal=importe
+            )
+        _sumar_al_total(pedido_id, importe)
+    return importe
+
+
+def quitar_item(pedido_id, detalle_id):
+    """Borra el ítem y descuenta su subtotal. Devuelve False si ya no estaba (otro lo borró antes)."""
+    with transaction.atomic():
+        subtotal = (
+            DetallePedido.objects.select_for_update()
+            .filter(pk=detalle_id, pedido_id=pedido_id)
+            .values_list('subtotal', flat=True)
+            .first()
+        )
+        borrados, _ = DetallePedido.objects.filter(pk=detalle_id, pedido_id=pedido_id).delete()
+        if not borrados:
+            return False
+        _sumar_al_total(pedido_id, -(subtotal or 0))
+    return True
@@ -0,0 +1,178 @@
+# bowl/planificador.py
+"""
+Cola de trabajo de la cocina.
+
+Ordenar por hora de la reserva dejaba un pedido grande trabando las
+bebidas de la pista de al lado. La cola ordena los pedidos enviados (En
+preparación) por
+
+    llegada + duración × COCINA_PESO_DURACION
+
+La llegada es cuando el pedido se mandó a la cocina, o el comienzo del
+turno si se pidió antes de jugar. La duración suma los minutos de cada
+producto (Menu.minutos_preparacion) por la cantidad pedida. Es como si
+cada pedido llegara tantos minutos más tarde como tarda: lo rápido se
+adelanta, pero lo largo no se posterga para siempre (nada que llegue
+después de su llegada más su duración le pasa adelante). La clave no
+depende de la hora actual, así que la cola se mantiene ordenada sin
+recalcular.
+
+Con la cola y COCINA_PUESTOS (pedidos que se preparan a la vez) se estima
+a qué hora sale cada uno. Los Listo van primero (solo falta entregarlos)
+y los que el cliente todavía está armando, al final y sin estimación.
+
+Hay una cola por día en la memoria del proceso. Se arma desde la base la
+primera vez que se pide y después se corrige pedido por pedido desde
+bowl.cocina.notificar. Cada cola recuerda la versión del feed de la
+cocina que refleja, (época, número): si la de la caché es otra (un cambio
+en otro worker, un Menu con otro tiempo, una caché que se vació y volvió
+a contar desde cero) se vuelve a armar.
+"""
+import bisect
+import heapq
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import estados
+
+PUESTOS = 2
+PESO_DURACION = 1.0
+# Ítems sin producto (menú borrado) no se quedan en cero minutos
+MINUTOS_SIN_MENU = 5
+
+# Grupos, en el orden en que se muestran
+LISTOS, ENVIADOS, SIN_ENVIAR = 0, 1, 2
+
+Entrada = namedtuple('Entrada', 'pedido_id grupo llegada duracion clave')
+Turno = namedtuple('Turno', 'pedido_id posicion grupo minutos listo')
+
+_colas = {}
+_candado = threading.Lock()
+
+
+def puestos():
+    return max(1, getattr(settings, 'COCINA_PUESTOS', PUESTOS))
+
+
+def _inicio_turno(reserva):
+    if reserva is None or reserva.fecha is None or reserva.hora is None:
+        return None
+    return timezone.make_aware(datetime.combine(reserva.fecha, reserva.hora))
+
+
+def entrada(pedido):
+    """Entrada de la cola de un pedido con su reserva y sus detalles (con menú) ya cargados."""
+    minutos = sum(
+        (detalle.menu.minutos_preparacion if detalle.menu else MINUTOS_SIN_MENU) * (detalle.cantidad or 1)
+        for detalle in pedido.detalles.all()
+    )
+    duracion = timedelta(minutes=minutos)
+    estado = estados.nombre_de(pedido.estado_id)
+
+    if estado == estados.LISTO:
+        grupo = LISTOS
+    elif estado == estados.EN_PREPARACION:
+        grupo = ENVIADOS
+    else:
+        grupo = SIN_ENVIAR
+    llegadas = [pedido.enviado_a_cocina or pedido.fecha, _inicio_turno(pedido.reserva)]
+    llegada = max((momento for momento in llegadas if momento), default=timezone.now())
+
+    prioridad = llegada + duracion * getattr(settings, 'COCINA_PESO_DURACION', PESO_DURACION)
+    # El id desempata: dos claves nunca son iguales
+    clave = (grupo, prioridad if grupo == ENVIADOS else llegada, pedido.pk)
+    return Entrada(pedido.pk, grupo, llegada, duracion, clave)
+
+
+class Cola:
+    """Pedidos del día ordenados por clave (lista ordenada con bisect)."""
+
+    def __init__(self, fecha, version, entradas=()):
+        self.fecha = fecha
+        self.version = version
+        self._entradas = {}
+        self._claves = []
+        for nueva in entradas:
+            self.poner(nueva)
+
+    def poner(self, nueva):
+        self.quitar(nueva.pedido_id)
+        self._entradas[nueva.pedido_id] = nueva
+        bisect.insort(self._claves, nueva.clave)
+
+    def quitar(self, pedido_id):
+        anterior = self._entradas.pop(pedido_id, None)
+        if anterior is not None:
+            del self._claves[bisect.bisect_left(self._claves, anterior.clave)]
+
+    def __len__(self):
+        return len(self._claves)
+
+    def __iter__(self):
+        return (self._entradas[clave[-1]] for clave in self._claves)
+
+    def plan(self, ahora=None):
+        """Turnos en orden de trabajo, con la hora estimada de salida de los enviados."""
+        ahora = ahora or timezone.now()
+        entradas = list(self)
+        # Se simula desde la primera llegada: lo atrasado ocupa los puestos hasta ahora
+        comienzo = min((e.llegada for e in entradas if e.grupo == ENVIADOS), default=ahora)
+        libres = [comienzo] * puestos()
+
+        turnos = []
+        for posicion, e in enumerate(entradas, start=1):
+            listo = None
+            if e.grupo == ENVIADOS:
+                libre = heapq.heappop(libres)
+                # Si ya tendría que haber salido, sale ahora (nadie lo marcó Listo todavía)
+                listo = max(max(libre, e.llegada) + e.duracion, ahora)
+                heapq.heappush(libres, listo)
+            turnos.append(Turno(e.pedido_id, posicion, e.grupo, int(e.duracion.total_seconds() // 60), listo))
+        return turnos
+
+
+def plan(fecha, version, pedidos, ahora=None):
+    """
+    Turnos de la cola del día en la versión `version` ((época, número), ver bowl.cocina).
+    `pedidos` (los activos del día, con reserva y detalles cargados; puede ser un queryset
+    sin evaluar) solo se recorre si la cola no está en memoria o quedó en otra versión.
+    """
+    with _candado:
+        cola = _colas.get(fecha)
+        if cola is None or cola.version != version:
+            cola = Cola(fecha, version, [entrada(pedido) for pedido in pedidos])
+            # Las de días pasados ya no se piden
+            for vieja in [f for f in _colas if f < date.today()]:
+                del _colas[vieja]
+            _colas[fecha] = cola
+        return cola.plan(ahora)
+
+
+def aplicar(fecha, version, pedido_id, pedido=None):
+    """
+    Corrige la cola con un cambio ya confirmado: `pedido` como quedó (con reserva y detalles
+    cargados) o None si salió de la cocina. `version` es la que le tocó al cambio en el feed.
+    """
+    with _candado:
+        cola = _colas.get(fecha)
+        if cola is None:
+            return  # Nadie la pidió todavía: se arma entera cuando haga falta
+        epoca, numero = cola.version
+        if version != (epoca, numero + 1):
+            # Hubo cambios que este proceso no vio: se rearma en la próxima lectura
+            del _colas[fecha]
+            return
+        cola.quitar(pedido_id)
+        if pedido is not None:
+            cola.poner(entrada(pedido))
+        cola.version = version
+
+
+def invalidar(**kwargs):
+    """Descarta las colas; se vuelven a armar en la próxima lectura. Sirve como receptor de señales."""
+    with _candado:
+        _colas.clear()
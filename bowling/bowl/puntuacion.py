@@ -0,0 +1,462 @@
+# bowl/puntuacion.py
+"""
+Motor de puntuación de bowling en memoria.
+
+Carga todos los frames de una partida con una sola consulta y resuelve en
+Python el siguiente tiro, el máximo de pinos, la notación y los acumulados.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import estados
+from .estadisticas import registrar_partida
+from .models import Frame, Jugador, Partida, Tiro
+
+FRAMES_POR_JUGADOR = 10
+
+
+# ==============================================================================
+# REGLAS POR FRAME
+# ==============================================================================
+
+def tiro_pendiente(frame):
+    """
+    Devuelve (tiro, maximo) del próximo tiro de este frame,
+    o None si el frame ya está completo.
+    """
+    t1, t2, t3 = frame.tiro1, frame.tiro2, frame.tiro3
+
+    # Tiro 1 siempre pendiente si no está hecho
+    if t1 is None:
+        return 1, 10
+
+    # Frames 1-9
+    if frame.numero < 10:
+        if t1 < 10 and t2 is None:
+            return 2, 10 - t1
+        return None
+
+    # Frame 10 - lógica especial
+    if t2 is None:
+        return 2, 10 if t1 == 10 else 10 - t1
+
+    if (t1 == 10 or t1 + t2 >= 10) and t3 is None:
+        if t1 == 10 and t2 == 10:
+            return 3, 10
+        if t1 == 10:
+            return 3, 10 - t2
+        return 3, 10
+
+    return None
+
+
+def formatear_frame(frame):
+    """Devuelve X, /, números o guiones para mostrar en la tabla."""
+    t1, t2, t3 = frame.tiro1, frame.tiro2, frame.tiro3
+
+    if frame.numero < 10:
+        if t1 is None:
+            return "-"
+        if t1 == 10:
+            return "X"
+        if t2 is None:
+            return f"{t1} -"
+        if t1 + t2 >= 10:
+            return f"{t1} /"
+        return f"{t1} {t2}"
+
+    # Frame 10
+    partes = []
+
+    # Tiro 1
+    if t1 == 10:
+        partes.append("X")
+    elif t1 is None:
+        partes.append("-")
+    else:
+        partes.append(str(t1))
+
+    # Tiro 2
+    if t2 is None:
+        partes.append("-")
+    elif t1 == 10 and t2 == 10:
+        partes.append("X")
+    elif t1 != 10 and t1 + t2 >= 10:
+        partes.append("/")
+    else:
+        partes.append(str(t2))
+
+    # Tiro 3 (solo si existe)
+    if t3 is not None:
+        if t3 == 10:
+            partes.append("X")
+        elif (t1 == 10 or t1 + t2 >= 10) and (t2 + t3 >= 10) and t2 != 10:
+            partes.append("/")
+        else:
+            partes.append(str(t3))
+
+    return " ".join(partes) if partes else "-"
+
+
+def puntaje_frame(frames, indice):
+    """
+    Puntaje del frame `indice` dentro de la lista ordenada de 10 frames
+    de un jugador. Los tiros todavía no jugados cuentan como 0.
+    """
+    frame = frames[indice]
+    t1 = frame.tiro1 or 0
+    t2 = frame.tiro2 or 0
+
+    # Frame 10 → sin bonus, se suman los 3 tiros tal cual
+    if frame.numero == 10:
+        return t1 + t2 + (frame.tiro3 or 0)
+
+    if t1 == 10:  # Strike: próximos 2 tiros
+        siguiente = frames[indice + 1]
+        bonus1 = siguiente.tiro1 or 0
+        if siguiente.tiro1 == 10 and siguiente.numero < 10:
+            bonus2 = frames[indice + 2].tiro1 or 0
+        else:
+            bonus2 = siguiente.tiro2 or 0
+        return 10 + bonus1 + bonus2
+
+    if t1 + t2 == 10:  # Spare: próximo tiro
+        return 10 + (frames[indice + 1].tiro1 or 0)
+
+    return t1 + t2
+
+
+def calcular_puntajes(frames):
+    """
+    CÁLCULO OFICIAL DE BOWLING.
+    Devuelve lista de 10 frames con puntaje acumulado correcto y el total.
+    """
+    resultado = []
+    total = 0
+
+    for i, frame in enumerate(frames):
+        puntaje = puntaje_frame(frames, i)
+        total += puntaje
+        resultado.append({
+            'frame_numero': frame.numero,
+            'puntaje_frame': puntaje,
+            'puntaje_acumulado': total,
+            'display': formatear_frame(frame),
+            'frame_obj': frame,
+        })
+
+    return resultado, total
+
+
+def rescorear(frames, indice):
+    """
+    Recalcula puntaje_frame y puntaje_acumulado después de un tiro en
+    frames[indice]. Solo pueden cambiar ese frame y hasta dos frames
+    anteriores que esperan bonus (spare o strikes). Devuelve los frames
+    modificados, listos para un bulk_update.
+    """
+    desde = indice
+    anterior = frames[indice - 1] if indice >= 1 else None
+    if anterior and (anterior.es_strike() or anterior.es_spare()):
+        desde = indice - 1
+        # Un strike dos frames atrás sólo toma bonus de este frame si el del medio es strike
+        if indice >= 2 and anterior.es_strike() and frames[indice - 2].es_strike():
+            desde = indice - 2
+
+    acumulado = (frames[desde - 1].puntaje_acumulado or 0) if desde > 0 else 0
+    cambiados = []
+    for i in range(desde, indice + 1):
+        frame = frames[i]
+        frame.puntaje_frame = puntaje_frame(frames, i)
+        acumulado += frame.puntaje_frame
+        frame.puntaje_acumulado = acumulado
+        cambiados.append(frame)
+
+    return cambiados
+
+
+# ==============================================================================
+# PROVISIÓN DE FRAMES
+# ==============================================================================
+
+def crear_frames(*jugadores):
+    """
+    Crea los 10 frames vacíos de cada jugador en un único INSERT.
+    Los que ya existan se ignoran (unique_together jugador/numero).
+    """
+    Frame.objects.bulk_create(
+        [
+            Frame(jugador=jugador, numero=numero)
+            for jugador in jugadores
+            for numero in range(1, FRAMES_POR_JUGADOR + 1)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+# ==============================================================================
+# ESTADO DE UNA PARTIDA
+# ==============================================================================
+
+class EstadoPartida:
+    """
+    Foto en memoria de una partida: jugadores y sus 10 frames.
+    Se arma una vez por request y se comparte entre todos los cálculos.
+
+    Los frames son una proyección del log de Tiro. Cada tiro se proyecta en
+    la misma transacción que lo agrega al log, así que cargar solo lee: si
+    quedó algún tiro sin proyectar (datos anteriores a este esquema) se
+    aplica en memoria y se guarda junto con el próximo tiro.
+    """
+
+    CAMPOS_FRAME = ['tiro1', 'tiro2', 'tiro3', 'puntaje_frame', 'puntaje_acumulado']
+
+    def __init__(self, partida, jugadores, frames_por_jugador):
+        self.partida = partida
+        self.jugadores = jugadores
+        self.frames_por_jugador = frames_por_jugador
+        # Último tiro del log aplicado a los frames en memoria
+        self.secuencia = partida.ultimo_tiro
+        # Frames cambiados en memoria que todavía no se guardaron, por (jugador, número)
+        self._sin_guardar = {}
+
+    @classmethod
+    def cargar(cls, partida, bloquear=False):
+        """
+        Carga jugadores, frames y tiros sin proyectar con un número fijo de consultas, sin escribir.
+        Con `bloquear` toma el lock de la partida hasta el final de la transacción: es para quien va
+        a registrar tiros, y se llama dentro del mismo transaction.atomic() que los registra.
+        """
+        consulta = Partida.objects.filter(pk=partida.pk)
+        if bloquear:
+            consulta = consulta.select_for_update()
+        partida.ultimo_tiro, partida.version = consulta.values_list('ultimo_tiro', 'version').get()
+        jugadores = list(Jugador.objects.filter(partida=partida).order_by('id_jugador'))
+        frames = Frame.objects.filter(jugador__partida=partida)
+
+        por_jugador = {j.id_jugador: {} for j in jugadores}
+        for frame in frames:
+            if frame.jugador_id in por_jugador:
+                por_jugador[frame.jugador_id][frame.numero] = frame
+
+        frames_por_jugador = {}
+        for jugador in jugadores:
+            existentes = por_jugador[jugador.id_jugador]
+            # Los frames que falten se representan vacíos (sin guardar)
+            frames_por_jugador[jugador.id_jugador] = [
+                existentes.get(numero) or Frame(jugador=jugador, numero=numero)
+                for numero in range(1, FRAMES_POR_JUGADOR + 1)
+            ]
+
+        estado = cls(partida, jugadores, frames_por_jugador)
+        estado._proyectar(
+            Tiro.objects.filter(partida=partida, secuencia__gt=partida.ultimo_tiro)
+        )
+        return estado
+
+    def _proyectar(self, tiros):
+        """Aplica en memoria los tiros del log que todavía no están en los frames."""
+        for tiro in tiros:
+            self._anotar(self.aplicar(tiro.pinos))
+            self.secuencia = tiro.secuencia
+
+    def _anotar(self, frames):
+        for frame in frames:
+            self._sin_guardar[(frame.jugador_id, frame.numero)] = frame
+
+    def _guardar_proyeccion(self):
+        """Guarda los frames cambiados en memoria y la marca del último tiro proyectado."""
+        frames = list(self._sin_guardar.values())
+        # Un jugador creado sin pasar por save() (bulk_create) puede no tener sus frames en la base
+        nuevos = [frame for frame in frames if frame.pk is None]
+        existentes = [frame for frame in frames if frame.pk is not None]
+        if nuevos:
+            Frame.objects.bulk_create(nuevos)
+        Frame.objects.bulk_update(existentes, self.CAMPOS_FRAME)
+        Partida.objects.filter(pk=self.partida.pk).update(ultimo_tiro=self.secuencia, version=F('version') + 1)
+        self.partida.ultimo_tiro = self.secuencia
+        # Quien escribe tiene el lock de la partida: nadie más subió la versión en el medio
+        self.partida.version += 1
+        self._sin_guardar = {}
+
+    def frames(self, jugador):
+        return self.frames_por_jugador[jugador.id_jugador]
+
+    def siguiente_tiro(self):
+        """
+        Devuelve el siguiente tiro pendiente.
+        Retorna dict con: jugador, frame, tiro (1/2/3), maximo permitido.
+        """
+        for indice in range(FRAMES_POR_JUGADOR):
+            for jugador in self.jugadores:
+                frame = self.frames_por_jugador[jugador.id_jugador][indice]
+                pendiente = tiro_pendiente(frame)
+                if pendiente:
+                    tiro, maximo = pendiente
+                    return {'jugador': jugador, 'frame': frame, 'tiro': tiro, 'maximo': maximo}
+
+        return None  # Partida terminada
+
+    def aplicar(self, pinos):
+        """
+        Aplica en memoria un tiro al turno actual.
+        Devuelve los frames cuyo contenido o puntaje cambió.
+        """
+        turno = self.siguiente_tiro()
+        frame = turno['frame']
+
+        if turno['tiro'] == 1:
+            frame.tiro1 = pinos
+            if frame.numero < 10 and pinos == 10:
+                frame.tiro2 = 0  # Strike en 1-9 → segundo tiro no se juega
+        elif turno['tiro'] == 2:
+            frame.tiro2 = pinos
+        else:  # tiro 3 (solo frame 10)
+            frame.tiro3 = pinos
+
+        return rescorear(self.frames(turno['jugador']), frame.numero - 1)
+
+    def registrar(self, pinos):
+        """
+        Agrega el tiro al log y lo proyecta en los frames en una misma transacción.
+        Si otro tiro ocupó la misma secuencia se levanta IntegrityError y no se guarda nada.
+        """
+        turno = self.siguiente_tiro()
+        with transaction.atomic():
+            Tiro.objects.create(
+                partida=self.partida,
+                jugador=turno['jugador'],
+                secuencia=self.secuencia + 1,
+                pinos=pinos,
+            )
+            self.secuencia += 1
+            self._anotar(self.aplicar(pinos))
+            self._guardar_proyeccion()
+        return turno
+
+    def registrar_lote(self, lote, parcial=False):
+        """
+        Valida una lista ordenada de tiros con las mismas reglas de máximo
+        de pinos y, si todos son válidos, los guarda en una transacción:
+        un bulk_create en el log y una sola proyección de los frames.
+
+        Devuelve None si se aplicó todo o el primer tiro rechazado. En ese
+        caso no se guarda nada y este estado queda descartable; con
+        `parcial` se guardan los tiros válidos anteriores al rechazado y el
+        estado sigue sirviendo.
+        """
+        tiros = []
+        rechazado = None
+        for indice, pinos in enumerate(lote):
+            turno = self.siguiente_tiro()
+            if turno is None:
+                rechazado = {'indice': indice, 'pinos': pinos, 'motivo': "La partida ya terminó."}
+            elif type(pinos) is not int or not 0 <= pinos <= turno['maximo']:
+                rechazado = {
+                    'indice': indice,
+                    'pinos': pinos,
+                    'motivo': f"{turno['jugador'].nombre}, frame {turno['frame'].numero}, "
+                              f"tiro {turno['tiro']}: máximo {turno['maximo']} pinos.",
+                }
+            if rechazado:
+                if not parcial:
+                    return rechazado
+                break
+
+            self.secuencia += 1
+            tiros.append(Tiro(
+                partida=self.partida, jugador=turno['jugador'], secuencia=self.secuencia, pinos=pinos
+            ))
+            self._anotar(self.aplicar(pinos))
+
+        if tiros:
+            with transaction.atomic():
+                Tiro.objects.bulk_create(tiros)
+                self._guardar_proyeccion()
+        return rechazado
+
+    def puntajes(self, jugador):
+        return calcular_puntajes(self.frames(jugador))
+
+    @property
+    def version(self):
+        """Versión de la partida (Partida.version): sube con cada tiro y con cada cambio en los jugadores."""
+        return self.partida.version
+
+    def _fila_jugador(self, jugador):
+        puntajes, total = self.puntajes(jugador)
+        return {
+            'id': jugador.id_jugador,
+            'nombre': jugador.nombre,
+            'frames': [
+                {
+                    'numero': p['frame_numero'],
+                    'display': p['display'],
+                    'puntaje_acumulado': p['puntaje_acumulado'],
+                }
+                for p in puntajes
+            ],
+            'total': total,
+        }
+
+    def _cabecera(self):
+        turno = self.siguiente_tiro()
+        return {
+            'partida': self.partida.pk,
+            'version': self.version,
+            'turno': {
+                'jugador': turno['jugador'].id_jugador,
+                'nombre': turno['jugador'].nombre,
+                'frame': turno['frame'].numero,
+                'tiro': turno['tiro'],
+                'maximo': turno['maximo'],
+            } if turno else None,
+            'terminada': bool(self.jugadores) and turno is None,
+        }
+
+    def como_dict(self):
+        """Estado serializable para la API y las pantallas de las pistas."""
+        datos = self._cabecera()
+        datos['jugadores'] = [self._fila_jugador(jugador) for jugador in self.jugadores]
+        return datos
+
+    def delta(self, jugador):
+        """Lo que cambia con un tiro: la fila del jugador que tiró, el turno y la versión."""
+        datos = self._cabecera()
+        datos['jugadores'] = [self._fila_jugador(jugador)]
+        return datos
+
+
+def finalizar_partida(partida, reserva=None):
+    """
+    Cierra la partida cuando ya no quedan tiros y marca la reserva como completada.
+    Solo la primera llamada cierra la partida y suma las estadísticas.
+    """
+    partida.finalizada = True
+    partida.fecha_fin = timezone.now()
+    cerrada = Partida.objects.filter(pk=partida.pk, finalizada=False).update(
+        finalizada=True, fecha_fin=partida.fecha_fin
+    )
+    if not cerrada:
+        return
+    registrar_partida(partida)
+
+    reserva = reserva or partida.reserva
+    if reserva is None:
+        return
+    reserva.estado = estados.obtener(estados.COMPLETADA)
+    reserva.fecha_completada = date.today()
+    reserva.save()
+
+
+def version_partida(partida_id):
+    """Misma versión que EstadoPartida.version, sin cargar frames ni puntuar."""
+    return Partida.objects.filter(pk=partida_id).values_list('version', flat=True).first() or 0
+
+
+def subir_version(partida_id):
+    """Sube la versión del tablero con un UPDATE, sin leer la partida."""
+    Partida.objects.filter(pk=partida_id).update(version=F('version') + 1)
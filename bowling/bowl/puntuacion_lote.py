@@ -0,0 +1,60 @@
+# bowl/puntuacion_lote.py
+"""
+Puntuación vectorizada con NumPy para miles de jugadores a la vez.
+
+Cada jugador es una fila de 21 tiros con el mismo formato que Frame:
+frames 1-9 en las posiciones 2k y 2k+1 (un strike deja 0 en la segunda)
+y el frame 10 en las posiciones 18, 19 y 20. Los tiros no jugados van en
+0, igual que en bowl.puntuacion.
+"""
+import numpy as np
+
+TIROS_POR_JUGADOR = 21
+
+
+def matriz_tiros(filas, indice_de):
+    """
+    Arma la matriz (jugadores × 21) a partir de filas
+    (jugador_id, numero, tiro1, tiro2, tiro3) de Frame.
+    `indice_de` mapea jugador_id a la fila de la matriz.
+    Devuelve la matriz y una máscara (jugadores × 10) de frames jugados.
+    """
+    tiros = np.zeros((len(indice_de), TIROS_POR_JUGADOR), dtype=np.int16)
+    jugados = np.zeros((len(indice_de), 10), dtype=bool)
+    for jugador_id, numero, tiro1, tiro2, tiro3 in filas:
+        fila = indice_de[jugador_id]
+        base = 2 * (numero - 1)
+        tiros[fila, base] = tiro1 or 0
+        tiros[fila, base + 1] = tiro2 or 0
+        if numero == 10:
+            tiros[fila, 20] = tiro3 or 0
+        jugados[fila, numero - 1] = tiro1 is not None
+    return tiros, jugados
+
+
+def puntuar(tiros):
+    """
+    Puntaje por frame y acumulado de cada jugador, ambos (jugadores × 10).
+    Mismas reglas que puntuacion.puntaje_frame, sin recorrer jugadores.
+    """
+    tiros = np.asarray(tiros, dtype=np.int32)
+    primero = tiros[:, 0:20:2]   # Primer tiro de cada frame (frame 10 → posición 18)
+    segundo = tiros[:, 1:20:2]   # Segundo tiro de cada frame (frame 10 → posición 19)
+
+    t1, t2 = primero[:, :9], segundo[:, :9]
+    proximo1 = primero[:, 1:]
+    # Si el frame siguiente es un strike de 1-9, el segundo bonus sale del primer tiro del otro
+    siguiente_strike = (proximo1 == 10) & (np.arange(9) < 8)
+    despues = np.concatenate([primero[:, 2:], np.zeros((len(tiros), 1), dtype=np.int32)], axis=1)
+    proximo2 = np.where(siguiente_strike, despues, segundo[:, 1:])
+
+    strike = t1 == 10
+    spare = ~strike & (t1 + t2 == 10)
+    puntajes = np.empty((len(tiros), 10), dtype=np.int32)
+    puntajes[:, :9] = np.where(
+        strike, 10 + proximo1 + proximo2,
+        np.where(spare, 10 + proximo1, t1 + t2),
+    )
+    puntajes[:, 9] = tiros[:, 18] + tiros[:, 19] + tiros[:, 20]
+
+    return puntajes, np.cumsum(puntajes, axis=1)
@@ -0,0 +1,99 @@
+# bowl/reservas.py
+"""
+Alta de reservas.
+
+El horario no se chequea antes de insertar: la restricción
+reserva_activa_unica (pista, fecha, hora de las reservas activas) decide
+en el mismo INSERT, así dos clientes que reservan a la vez no pueden
+quedarse con la misma pista. Las series de las ligas (mismas pistas, día
+y hora durante varias semanas) se resuelven con una consulta y un
+bulk_create.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+
+from . import disponibilidad
+from .models import Reserva
+
+
+class HorarioOcupado(Exception):
+    """La pista ya tiene una reserva activa en ese horario."""
+
+
+def reservar(reserva):
+    """Guarda una reserva nueva; si el horario ya está tomado levanta HorarioOcupado."""
+    try:
+        # Savepoint propio: el error no rompe la transacción de quien llama
+        with transaction.atomic():
+            reserva.save(force_insert=True)
+    except IntegrityError as error:
+        raise HorarioOcupado(f"La pista ya está reservada el {reserva.fecha} a las {reserva.hora}.") from error
+    return reserva
+
+
+def reservar_mejor_pista(reserva, tipo_id=None, personas=1, intentos=3):
+    """
+    Modo "cualquier pista": elige con disponibilidad.mejor_pista y reserva.
+    Si otro se quedó con la pista en el medio (el índice venía atrasado), se
+    relee ese horario y se prueba con la siguiente. Devuelve (reserva, pista del catálogo).
+    """
+    for _ in range(intentos):
+        pista = disponibilidad.mejor_pista(reserva.fecha, reserva.hora, tipo_id, personas)
+        if pista is None:
+            break
+        reserva.pista_id = pista['pk']
+        reserva.precio_total = pista['precio']
+        try:
+            return reservar(reserva), pista
+        except HorarioOcupado:
+            disponibilidad.actualizar_horario(reserva.fecha, reserva.hora)
+    raise HorarioOcupado(f"No quedan pistas libres que sirvan el {reserva.fecha} a las {reserva.hora}.")
+
+
+# ==============================================================================
+# SERIES (LIGAS)
+# ==============================================================================
+
+def fechas_serie(desde, dia_semana, semanas):
+    """El mismo día de la semana (0 = lunes) durante `semanas` semanas, desde `desde` inclusive."""
+    primera = desde + timedelta(days=(dia_semana - desde.weekday()) % 7)
+    return [primera + timedelta(weeks=n) for n in range(semanas)]
+
+
+def _actualizar_indice(fechas, hora):
+    for fecha in fechas:
+        disponibilidad.actualizar_horario(fecha, hora)
+
+
+def reservar_serie(pistas, fechas, hora, cliente=None, estado=None, intentos=3):
+    """
+    Reserva las pistas en todas las fechas a la misma hora.
+    Los choques salen de una sola consulta y el resto se inserta con un solo
+    bulk_create. Devuelve (reservas creadas, [(pista, fecha) que chocaron]).
+    """
+    for _ in range(intentos):
+        tomadas = set(
+            Reserva.objects.filter(activa=True, pista__in=pistas, fecha__in=fechas, hora=hora)
+            .values_list('pista_id', 'fecha')
+        )
+        choques = [(pista, fecha) for fecha in fechas for pista in pistas if (pista.pk, fecha) in tomadas]
+        nuevas = [
+            Reserva(
+                fecha=fecha, hora=hora, pista=pista, cliente=cliente, estado=estado,
+                precio_total=pista.tipo_pista.precio if pista.tipo_pista else 0,
+                # bulk_create no pasa por save(): `activa` se deriva igual que ahí
+                activa=Reserva.activa_con(estado.pk if estado else None),
+            )
+            for fecha in fechas for pista in pistas if (pista.pk, fecha) not in tomadas
+        ]
+        try:
+            with transaction.atomic():
+                creadas = Reserva.objects.bulk_create(nuevas)
+                # bulk_create no dispara señales: el índice se corrige a mano
+                transaction.on_commit(lambda: _actualizar_indice(fechas, hora))
+            return creadas, choques
+        except IntegrityError:
+            # Alguien reservó entre la consulta y el INSERT: se vuelve a mirar
+            continue
+    raise HorarioOcupado("Las pistas se siguen reservando mientras se arma la serie; probá de nuevo.")
@@ -0,0 +1,156 @@
+# bowl/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import archivo, catalogo, cocina, disponibilidad, estados, miniaturas, planificador
+from .models import DetallePedido, Estado, Jugador, Menu, Pedido, Pista, Reserva
+from .puntuacion import crear_frames, subir_version
+
+
+# ==============================================================================
+# ÍNDICE DE DISPONIBILIDAD
+# ==============================================================================
+
+@receiver(post_init, sender=Reserva)
+def recordar_horario(sender, instance, **kwargs):
+    # Horario con el que se cargó, para liberar el anterior si se mueve la reserva
+    # (sin tocar campos diferidos, que dispararían una consulta por fila)
+    instance._horario_original = (instance.__dict__.get('fecha'), instance.__dict__.get('hora'))
+
+
+def _actualizar_horarios(reserva):
+    horarios = {(reserva.fecha, reserva.hora), getattr(reserva, '_horario_original', (None, None))}
+    reserva._horario_original = (reserva.fecha, reserva.hora)
+
+    def actualizar():
+        for fecha, hora in horarios:
+            if fecha and hora:
+                disponibilidad.actualizar_horario(fecha, hora)
+
+    # Solo cuando la reserva quedó guardada; un rollback no toca el índice
+    transaction.on_commit(actualizar)
+
+
+@receiver(post_save, sender=Reserva)
+def reserva_guardada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _actualizar_horarios(instance)
+
+
+@receiver(post_delete, sender=Reserva)
+def reserva_borrada(sender, instance, **kwargs):
+    # El archivo descarta las fechas una vez por lote
+    if not archivo.archivando():
+        _actualizar_horarios(instance)
+
+
+@receiver([post_save, post_delete], sender=Pista)
+def pista_cambiada(sender, **kwargs):
+    transaction.on_commit(disponibilidad.invalidar_pistas)
+
+
+# ==============================================================================
+# FRAMES DE LOS JUGADORES
+# ==============================================================================
+
+@receiver(post_save, sender=Jugador)
+def jugador_creado(sender, instance, created=False, raw=False, **kwargs):
+    # Cada jugador nace con sus 10 frames, lo agregue el tablero, el admin o un script
+    if created and not raw:
+        crear_frames(instance)
+
+
+@receiver([post_save, post_delete], sender=Jugador)
+def jugador_cambiado(sender, instance, raw=False, **kwargs):
+    # El nombre y la lista de jugadores están en el JSON del tablero: otro ETag
+    if not raw and instance.partida_id and not archivo.archivando():
+        subir_version(instance.partida_id)
+
+
+# ==============================================================================
+# FEED Y COLA DE LA COCINA
+# ==============================================================================
+
+@receiver(pre_save, sender=Pedido)
+def marcar_envio_a_cocina(sender, instance, raw=False, **kwargs):
+    # La primera vez que pasa a En preparación: desde ahí cuenta su lugar en la cola
+    if raw or instance.enviado_a_cocina is not None:
+        return
+    if instance.estado_id == estados.id_de(estados.EN_PREPARACION):
+        instance.enviado_a_cocina = timezone.now()
+
+
+@receiver([post_save, post_delete], sender=Pedido)
+def pedido_cambiado(sender, instance, raw=False, **kwargs):
+    # Un pedido archivado es viejo y está cerrado: no está en ninguna cola de hoy
+    if not raw and not archivo.archivando():
+        pedido_id, reserva_id = instance.pk, instance.reserva_id
+        transaction.on_commit(lambda: cocina.notificar(pedido_id, reserva_id))
+
+
+@receiver([post_save, post_delete], sender=DetallePedido)
+def detalle_cambiado(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pedido_id and not archivo.archivando():
+        pedido_id = instance.pedido_id
+        transaction.on_commit(lambda: cocina.notificar(pedido_id))
+
+
+@receiver(post_init, sender=Menu)
+def recordar_minutos(sender, instance, **kwargs):
+    instance._minutos_originales = instance.__dict__.get('minutos_preparacion')
+
+
+@receiver(post_save, sender=Menu)
+def minutos_cambiados(sender, instance, created=False, raw=False, **kwargs):
+    # Otro tiempo de preparación cambia la prioridad de los pedidos que ya están en la cola
+    if not raw and not created and instance.minutos_preparacion != instance._minutos_originales:
+        transaction.on_commit(cocina.reiniciar)
+    instance._minutos_originales = instance.minutos_preparacion
+
+
+# ==============================================================================
+# IMÁGENES DEL MENÚ
+# ==============================================================================
+
+@receiver(post_save, sender=Menu)
+def generar_miniaturas(sender, instance, raw=False, **kwargs):
+    # Solo si cambió la imagen (un cambio de precio desde el admin no reprocesa nada)
+    if raw or not miniaturas.desactualizados(instance):
+        return
+    pk, nombre = instance.pk, instance.imagen.name or ''
+
+    def generar():
+        # Después del commit: si la transacción se revierte no quedan archivos sin Menu que los use
+        menu = Menu.objects.filter(pk=pk).first()
+        if menu is None or (menu.imagen.name or '') != nombre:
+            return  # Se borró o cambió de imagen otra vez: ese save agenda lo suyo
+        # UPDATE directo: no vuelve a disparar esta señal
+        Menu.objects.filter(pk=pk, imagen=nombre).update(derivados=miniaturas.generar(menu))
+        catalogo.invalidar()
+
+    transaction.on_commit(generar)
+
+
+# ==============================================================================
+# CATÁLOGO DEL MENÚ
+# ==============================================================================
+
+@receiver([post_save, post_delete], sender=Menu)
+def menu_cambiado(sender, **kwargs):
+    transaction.on_commit(catalogo.invalidar)
+
+
+# ==============================================================================
+# REGISTRO DE ESTADOS
+# ==============================================================================
+
+@receiver([post_save, post_delete], sender=Estado)
+def estado_cambiado(sender, **kwargs):
+    transaction.on_commit(estados.invalidar)
+
+
+# Un flush o una migración pueden cambiar los ids de los estados (y dejar colas de cocina de otra base)
+post_migrate.connect(estados.invalidar, dispatch_uid='bowl_invalidar_estados')
+post_migrate.connect(planificador.invalidar, dispatch_uid='bowl_invalidar_colas_cocina')
@@ -1,3 +1,918 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import random
+import tempfile
+from datetime import date, time, timedelta
+from unittest import skipUnless
+
+from PIL import Image
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import cocina, disponibilidad, estados, miniaturas, planificador
+from .cocina import canal_cocina
+from .eventos import BackendLocal, Broker, broker, canal_partida
+from .models import (
+    Cliente, DetallePedido, EstadisticaCliente, EstadisticaJugador, Frame, Jugador, Mensaje, Menu, Partida,
+    PartidaArchivada, Pedido, PedidoArchivado, Pista, Reserva, TipoPista, Tiro, Usuario,
+)
+from .paginacion import PaginacionKeysetMixin
+from .puntuacion import (
+    EstadoPartida, calcular_puntajes, crear_frames, finalizar_partida, formatear_frame, tiro_pendiente,
+)
+from .puntuacion_lote import matriz_tiros, puntuar
+from .reservas import reservar_serie
+from .vencimientos import vencer_pendientes
+from .views import servir_media
+
+
+@override_settings(PINSETTER_TOKENS={1: 'token-pista-1', 2: 'token-pista-2'})
+class TableroPuntuacionesTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user('jugador1', password='1234')
+        cliente = Cliente.objects.create(user=self.usuario, nombre='Jugador 1', email='j1@bowling.com')
+        tipo = TipoPista.objects.create(tipo='BASE', precio=10000)
+        pista = Pista.objects.create(numero=1, tipo_pista=tipo)
+        pendiente = estados.obtener(estados.PENDIENTE)
+        self.reserva = Reserva.objects.create(
+            fecha=date.today(), hora=time(15, 0), cliente=cliente, pista=pista, estado=pendiente
+        )
+        self.url = reverse('tablero_puntuaciones', args=[self.reserva.pk])
+        self.client.force_login(self.usuario)
+
+    def _tirar(self, tiros, token='token-pista-1'):
+        # Como el pinsetter: sin sesión, con CSRF activo y el token de la pista en el header
+        pinsetter = Client(enforce_csrf_checks=True)
+        return pinsetter.post(
+            reverse('tablero_tiros', args=[self.reserva.pk]), {'tiros': tiros},
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+
+    def _consultas_get(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        return len(consultas)
+
+    def test_agregar_jugador_crea_sus_frames(self):
+        self.client.get(self.url)
+        self.client.post(self.url, {'agregar_jugador': '1', 'nombre': 'Ana'})
+
+        ana = Jugador.objects.get(nombre='Ana')
+        self.assertEqual(list(ana.frames.values_list('numero', flat=True)), list(range(1, 11)))
+
+    def test_get_no_crece_con_los_jugadores(self):
+        self.client.get(self.url)  # Crea la partida y el jugador dueño de la reserva
+        con_un_jugador = self._consultas_get()
+
+        for nombre in ['Ana', 'Beto', 'Caro', 'Dani', 'Eze']:
+            self.client.post(self.url, {'agregar_jugador': '1', 'nombre': nombre})
+        frames = Frame.objects.count()
+
+        self.assertEqual(self._consultas_get(), con_un_jugador)
+        self.assertEqual(Frame.objects.count(), frames)  # El GET no provisiona frames
+
+    def test_tiro_se_agrega_al_log_y_se_proyecta(self):
+        self.client.get(self.url)
+        self.client.post(self.url, {'empezar_partida': '1'})
+        for pinos in [10, 7, 3, 4]:
+            self.client.post(self.url, {'registrar_turno': '1', 'puntaje_turno': pinos})
+
+        self.assertEqual(list(Tiro.objects.values_list('secuencia', 'pinos')), [(1, 10), (2, 7), (3, 3), (4, 4)])
+
+        # Cada tiro se proyectó al registrarlo, sin esperar a otra carga
+        self.assertEqual(Partida.objects.get().ultimo_tiro, 4)
+        jugador = Jugador.objects.get()
+        self.assertEqual(
+            list(jugador.frames.filter(numero__lte=3).values_list('puntaje_acumulado', flat=True)),
+            [20, 34, 38],
+        )
+        self.assertEqual(jugador.puntaje_total(), 38)
+
+    def test_get_no_escribe_aunque_haya_tiros_sin_proyectar(self):
+        self.client.get(self.url)
+        partida = Partida.objects.get()
+        Tiro.objects.create(partida=partida, jugador=Jugador.objects.get(), secuencia=1, pinos=10)
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(reverse('tablero_estado', args=[self.reserva.pk]))
+        self.assertEqual(respuesta.json()['jugadores'][0]['frames'][0]['display'], 'X')
+        self.assertFalse([q['sql'] for q in consultas.captured_queries
+                          if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))])
+
+        # El próximo tiro guarda también el que había quedado pendiente
+        self.client.post(self.url, {'registrar_turno': '1', 'puntaje_turno': 4})
+        self.assertEqual(Partida.objects.get().ultimo_tiro, 2)
+        self.assertEqual(Jugador.objects.get().frames.get(numero=1).puntaje_frame, 14)
+
+    def test_estado_json_responde_304_si_no_hubo_cambios(self):
+        self.client.get(self.url)
+        url_estado = reverse('tablero_estado', args=[self.reserva.pk])
+
+        respuesta = self.client.get(url_estado)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['turno']['frame'], 1)
+        etag = respuesta['ETag']
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url_estado, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertFalse(any('bowl_frame' in q['sql'] for q in consultas.captured_queries))
+
+        self.client.post(self.url, {'empezar_partida': '1'})
+        self.client.post(self.url, {'registrar_turno': '1', 'puntaje_turno': 10})
+        respuesta = self.client.get(url_estado, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['jugadores'][0]['frames'][0]['display'], 'X')
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_etag_cambia_al_renombrar_o_borrar_jugadores_y_no_se_repite(self):
+        self.client.get(self.url)
+        self.client.post(self.url, {'agregar_jugador': '1', 'nombre': 'Ana'})
+        url_estado = reverse('tablero_estado', args=[self.reserva.pk])
+        etags = [self.client.get(url_estado)['ETag']]
+
+        ana = Jugador.objects.get(nombre='Ana')
+        ana.nombre = 'Ana María'
+        ana.save()
+        respuesta = self.client.get(url_estado, HTTP_IF_NONE_MATCH=etags[-1])
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('Ana María', [j['nombre'] for j in respuesta.json()['jugadores']])
+        etags.append(respuesta['ETag'])
+
+        ana.delete()
+        etags.append(self.client.get(url_estado)['ETag'])
+        self._tirar([10])
+        etags.append(self.client.get(url_estado)['ETag'])
+        self.assertEqual(len(set(etags)), len(etags))
+
+    def test_lote_de_tiros_se_aplica_entero_o_se_rechaza(self):
+        self.client.get(self.url)
+
+        respuesta = self._tirar([7, 5, 3])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['rechazado']['indice'], 1)
+        self.assertFalse(Tiro.objects.exists())
+
+        respuesta = self._tirar([10] * 12)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.json()['terminada'])
+        self.assertEqual(respuesta.json()['jugadores'][0]['total'], 300)
+        self.assertEqual(Jugador.objects.get().puntaje_total(), 300)
+
+    def test_lote_de_tiros_exige_el_token_de_la_pista(self):
+        self.client.get(self.url)
+
+        self.assertEqual(self._tirar([10], token='token-pista-2').status_code, 401)
+        self.assertEqual(self._tirar([10], token='').status_code, 401)
+        # Una sesión de usuario no alcanza: la API es solo para los pinsetters
+        url_tiros = reverse('tablero_tiros', args=[self.reserva.pk])
+        self.assertEqual(self.client.post(url_tiros, {'tiros': [10]}, content_type='application/json').status_code, 401)
+        self.assertFalse(Tiro.objects.exists())
+
+        self.assertEqual(self._tirar([10]).status_code, 200)
+
+    def test_jugador_sin_frames_guardados_puede_tirar(self):
+        self.client.get(self.url)
+        partida = Partida.objects.get()
+        # bulk_create no dispara la señal que crea los frames
+        beto, = Jugador.objects.bulk_create([Jugador(partida=partida, nombre='Beto')])
+        self.assertFalse(beto.frames.exists())
+
+        respuesta = self._tirar([10, 7])
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(beto.frames.get(numero=1).tiro1, 7)
+
+    def test_estadisticas_se_suman_una_vez_y_coinciden_con_la_reconstruccion(self):
+        self.client.get(self.url)
+        self._tirar([10] * 9 + [9, 1, 10])
+        finalizar_partida(Partida.objects.get())  # Una segunda llamada no vuelve a sumar
+
+        def valores():
+            return list(EstadisticaCliente.objects.values_list(
+                'partidas_jugadas', 'pinos_totales', 'mejor_partida', 'strikes', 'spares', 'oportunidades_strike'
+            )) + list(EstadisticaJugador.objects.values_list('nombre', 'partidas_jugadas', 'mejor_partida'))
+
+        self.assertEqual(valores(), [(1, 279, 279, 10, 1, 11), ('jugador1', 1, 279)])
+        call_command('reconstruir_estadisticas', stdout=io.StringIO())
+        self.assertEqual(valores(), [(1, 279, 279, 10, 1, 11), ('jugador1', 1, 279)])
+
+    def test_archivar_resume_la_partida_y_el_historial_la_sigue_viendo(self):
+        self.client.get(self.url)
+        self._tirar([10] * 9 + [9, 1, 10])
+        pedido = Pedido.objects.create(reserva=self.reserva, cliente=self.reserva.cliente)
+        DetallePedido.objects.create(pedido=pedido, menu=Menu.objects.create(nombre='Papas', precio=3000), cantidad=2)
+
+        manana = date.today() + timedelta(days=1)
+        with self.captureOnCommitCallbacks() as al_confirmar:
+            call_command('archivar', '--antes-de', manana.isoformat(), stdout=io.StringIO())
+        # Un solo aviso por lote, no uno por reserva, pedido y detalle borrados
+        self.assertEqual(len(al_confirmar), 1)
+
+        for modelo in (Reserva, Partida, Jugador, Frame, Tiro, Pedido, DetallePedido):
+            self.assertFalse(modelo.objects.exists(), modelo.__name__)
+        partida = PartidaArchivada.objects.get()
+        self.assertEqual((partida.id_reserva, partida.jugadores[0]['total']), (self.reserva.pk, 279))
+        self.assertEqual(PedidoArchivado.objects.get().detalles[0]['cantidad'], 2)
+
+        call_command('reconstruir_estadisticas', stdout=io.StringIO())
+        self.assertEqual(EstadisticaCliente.objects.get().mejor_partida, 279)
+        historial = self.client.get(reverse('historial_reservas'), {'formato': 'json'}).json()['resultados']
+        self.assertEqual([(r['id'], r['estado'], r['archivada']) for r in historial],
+                         [(self.reserva.pk, estados.COMPLETADA, True)])
+
+
+class PantallasEspia:
+    """Se conecta al backend del broker y anota cada mensaje publicado."""
+
+    def __init__(self):
+        self.mensajes = []
+
+    def entregar(self, canal, mensaje):
+        self.mensajes.append((canal, mensaje))
+
+
+class ConsumirPinsettersTests(TransactionTestCase):
+    def test_enruta_los_tiros_a_la_partida_activa_de_cada_pista(self):
+        pendiente = estados.obtener(estados.PENDIENTE)
+        jugadores = []
+        for numero in (1, 2):
+            pista = Pista.objects.create(numero=numero)
+            reserva = Reserva.objects.create(fecha=date.today(), hora=time(20, 0), pista=pista, estado=pendiente)
+            partida = Partida.objects.create(reserva=reserva, pista=pista)
+            jugadores.append(Jugador.objects.create(partida=partida, nombre=f'Pista {numero}'))
+
+        eventos = [{'pista': 1, 'pinos': 10}] * 12 + [{'pista': 2, 'pinos': 4}] * 20 + [{'pista': 9, 'pinos': 1}]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as archivo:
+            archivo.write('\n'.join(json.dumps(e) for e in eventos))
+        self.addCleanup(os.remove, archivo.name)
+
+        pantallas = PantallasEspia()
+        broker().backend.conectar(pantallas)
+        self.addCleanup(broker().backend._brokers.remove, pantallas)
+
+        salida = io.StringIO()
+        call_command('consumir_pinsetters', archivo=archivo.name, ventana=10, stdout=salida, stderr=io.StringIO())
+
+        self.assertIn('32 tiros aplicados', salida.getvalue())
+        # Las pantallas de cada partida se enteran, aunque los tiros no pasen por las vistas
+        canales = {canal for canal, _ in pantallas.mensajes}
+        self.assertEqual(canales, {canal_partida(j.partida_id) for j in jugadores})
+        self.assertIn('1 descartados', salida.getvalue())
+        self.assertEqual([j.puntaje_total() for j in jugadores], [300, 80])
+        self.assertEqual(Partida.objects.filter(finalizada=True).count(), 2)
+
+    def test_guarda_lo_valido_alrededor_de_un_tiro_rechazado(self):
+        pista = Pista.objects.create(numero=1)
+        reserva = Reserva.objects.create(
+            fecha=date.today(), hora=time(20, 0), pista=pista, estado=estados.obtener(estados.PENDIENTE)
+        )
+        jugador = Jugador.objects.create(partida=Partida.objects.create(reserva=reserva, pista=pista), nombre='Ana')
+
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as archivo:
+            archivo.write('\n'.join(json.dumps({'pista': 1, 'pinos': p}) for p in (7, 5, 3, 10)))
+        self.addCleanup(os.remove, archivo.name)
+
+        salida, errores = io.StringIO(), io.StringIO()
+        call_command('consumir_pinsetters', archivo=archivo.name, ventana=50, stdout=salida, stderr=errores)
+
+        self.assertIn('3 tiros aplicados', salida.getvalue())
+        self.assertIn('1 rechazados', salida.getvalue())
+        self.assertIn('tiro rechazado', errores.getvalue())
+        self.assertEqual(list(Tiro.objects.order_by('secuencia').values_list('pinos', flat=True)), [7, 3, 10])
+        self.assertEqual(list(jugador.frames.filter(numero__lte=2).values_list('tiro1', 'tiro2')), [(7, 3), (10, 0)])
+
+
+def frames_con(tiros):
+    """Los 10 frames de un jugador después de la secuencia de tiros dada."""
+    frames = [Frame(numero=numero) for numero in range(1, 11)]
+    for pinos in tiros:
+        frame = next(f for f in frames if tiro_pendiente(f))
+        tiro, _ = tiro_pendiente(frame)
+        setattr(frame, f'tiro{tiro}', pinos)
+        if tiro == 1 and frame.numero < 10 and pinos == 10:
+            frame.tiro2 = 0
+    return frames
+
+
+class PuntuacionTests(SimpleTestCase):
+    def _acumulados(self, tiros):
+        resultado, total = calcular_puntajes(frames_con(tiros))
+        return [p['puntaje_acumulado'] for p in resultado], total
+
+    def test_partidas_limite(self):
+        self.assertEqual(self._acumulados([0] * 20), ([0] * 10, 0))
+        self.assertEqual(self._acumulados([10] * 12), (list(range(30, 301, 30)), 300))
+        self.assertEqual(self._acumulados([5] * 21)[1], 150)  # Todo spares de 5 con un 5 extra
+
+    def test_strike_suma_los_dos_tiros_siguientes(self):
+        acumulados, _ = self._acumulados([10, 3, 4] + [0] * 16)
+        self.assertEqual(acumulados[:2], [17, 24])
+        # Dos strikes seguidos: el primero toma el tiro1 del frame que viene después
+        acumulados, _ = self._acumulados([10, 10, 4, 2] + [0] * 14)
+        self.assertEqual(acumulados[:3], [24, 40, 46])
+
+    def test_spare_suma_el_tiro_siguiente(self):
+        acumulados, _ = self._acumulados([7, 3, 4, 2] + [0] * 16)
+        self.assertEqual(acumulados[:2], [14, 20])
+        self.assertEqual(formatear_frame(frames_con([7, 3])[0]), '7 /')
+
+    def test_frame_diez_con_tres_tiros(self):
+        previos = [0] * 18
+        for tiros, puntos, marca in [
+            ([10, 10, 10], 30, 'X X X'),
+            ([10, 3, 7], 20, 'X 3 /'),
+            ([9, 1, 10], 20, '9 / X'),
+            ([3, 6], 9, '3 6'),  # Sin strike ni spare no hay tercer tiro
+        ]:
+            frames = frames_con(previos + tiros)
+            self.assertIsNone(tiro_pendiente(frames[9]))
+            self.assertEqual(calcular_puntajes(frames)[1], puntos)
+            self.assertEqual(formatear_frame(frames[9]), marca)
+        # Con spare queda un tercer tiro de hasta 10 pinos
+        self.assertEqual(tiro_pendiente(frames_con(previos + [4, 6])[9]), (3, 10))
+        self.assertEqual(tiro_pendiente(frames_con(previos + [10, 3])[9]), (3, 7))
+
+    def test_rescore_incremental_coincide_con_el_recalculo_completo(self):
+        azar = random.Random(11)
+        for _ in range(300):
+            jugador = Jugador(id_jugador=1, nombre='Ana')
+            frames = [Frame(jugador=jugador, numero=numero) for numero in range(1, 11)]
+            estado = EstadoPartida(Partida(ultimo_tiro=0), [jugador], {1: frames})
+            # Después de cada tiro, lo ya jugado tiene que dar igual que recalcular todo
+            while turno := estado.siguiente_tiro():
+                estado.aplicar(azar.choice([turno['maximo'], azar.randint(0, turno['maximo'])]))
+                hasta = turno['frame'].numero
+                esperado = [p['puntaje_acumulado'] for p in calcular_puntajes(frames)[0][:hasta]]
+                self.assertEqual([f.puntaje_acumulado for f in frames[:hasta]], esperado)
+
+
+def partida_al_azar(azar):
+    """Frames de un jugador con tiros válidos al azar (puede quedar a medias)."""
+    frames = [Frame(numero=numero) for numero in range(1, 11)]
+    for _ in range(azar.randint(0, 21)):
+        frame = next((f for f in frames if tiro_pendiente(f)), None)
+        if frame is None:
+            break
+        tiro, maximo = tiro_pendiente(frame)
+        pinos = azar.choice([maximo, azar.randint(0, maximo)])
+        setattr(frame, f'tiro{tiro}', pinos)
+        if tiro == 1 and frame.numero < 10 and pinos == 10:
+            frame.tiro2 = 0
+    return frames
+
+
+class PuntuacionLoteTests(TestCase):
+    def test_numpy_coincide_con_el_calculo_por_jugador(self):
+        azar = random.Random(7)
+        jugadas = [partida_al_azar(azar) for _ in range(500)]
+        filas = [
+            (i, f.numero, f.tiro1, f.tiro2, f.tiro3)
+            for i, frames in enumerate(jugadas) for f in frames
+        ]
+        tiros, _ = matriz_tiros(filas, {i: i for i in range(len(jugadas))})
+
+        _, acumulados = puntuar(tiros)
+
+        esperado = [[p['puntaje_acumulado'] for p in calcular_puntajes(frames)[0]] for frames in jugadas]
+        self.assertEqual(acumulados.tolist(), esperado)
+
+    def test_rescore_games_repara_los_acumulados_guardados(self):
+        jugador = Jugador.objects.create(nombre='Ana')
+        Frame.objects.filter(jugador=jugador, numero__lt=10).update(tiro1=10, tiro2=0)
+        Frame.objects.filter(jugador=jugador, numero=10).update(tiro1=10, tiro2=10, tiro3=10)
+
+        call_command('rescore_games', stdout=io.StringIO())
+
+        self.assertEqual(jugador.puntaje_total(), 300)
+
+
+class BrokerTests(SimpleTestCase):
+    async def test_un_tiro_llega_a_los_suscriptores_de_otro_worker(self):
+        backend = BackendLocal()
+        worker1, worker2 = Broker(backend), Broker(backend)
+        pantallas = [worker2.suscribir('partida-1'), worker2.suscribir('partida-1'), worker1.suscribir('partida-1')]
+        esperas = [asyncio.ensure_future(anext(p)) for p in pantallas]
+        await asyncio.sleep(0)
+
+        worker1.publicar('partida-1', 'tiro', {'version': 3})
+        mensajes = await asyncio.gather(*esperas)
+
+        self.assertEqual(len(set(mensajes)), 1)
+        self.assertIn('event: tiro', mensajes[0])
+        for pantalla in pantallas:
+            await pantalla.aclose()
+        self.assertEqual(worker2.suscriptores('partida-1'), 0)
+
+
+class DisponibilidadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = Usuario.objects.create_user('cliente1', password='1234')
+        self.cliente = Cliente.objects.create(user=self.usuario, nombre='Cliente 1', email='c1@bowling.com')
+        self.pendiente = estados.obtener(estados.PENDIENTE)
+        self.client.force_login(self.usuario)
+
+    def _slot(self, hora):
+        respuesta = self.client.get(reverse('nueva_reserva1'))
+        return next(s for s in respuesta.context['horarios_disponibilidad'] if s['hora'] == hora)
+
+    def test_indice_se_corrige_al_reservar_y_cancelar_sin_recalcular(self):
+        self.assertEqual(self._slot('15:00')['cantidad'], 10)  # Crea las pistas por defecto
+        pista = Pista.objects.get(numero=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva = Reserva.objects.create(
+                fecha=date.today(), hora=time(15, 0), cliente=self.cliente, pista=pista, estado=self.pendiente
+            )
+        with CaptureQueriesContext(connection) as consultas:
+            slot = self._slot('15:00')
+        self.assertEqual(slot['cantidad'], 9)
+        self.assertEqual(sum(t['libres'] for t in json.loads(slot['tipos_json'])), 9)
+        self.assertFalse(any('bowl_reserva' in q['sql'] for q in consultas.captured_queries))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reserva.estado = estados.obtener(estados.DISPONIBLE)
+            reserva.save()
+        self.assertEqual(self._slot('15:00')['cantidad'], 10)
+
+    def test_calendario_de_varios_dias_en_una_consulta(self):
+        tipo = TipoPista.objects.create(tipo='BASE', precio=10000)
+        pistas = [Pista.objects.create(numero=n, tipo_pista=tipo) for n in (1, 2)]
+        manana = date.today() + timedelta(days=1)
+        for pista in pistas:
+            Reserva.objects.create(fecha=manana, hora=time(20, 0), pista=pista, estado=self.pendiente)
+        url = reverse('calendario_disponibilidad') + f'?desde={date.today().isoformat()}&dias=3'
+
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self.client.get(url).json()
+        self.assertEqual(sum('bowl_reserva' in q['sql'] for q in consultas.captured_queries), 1)
+        self.assertEqual([dia['libres'][6] for dia in datos['calendario']], [2, 0, 2])
+        self.assertEqual(datos['horarios'][6], '20:00')
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url).json(), datos)
+        self.assertFalse(any('bowl_reserva' in q['sql'] for q in consultas.captured_queries))
+
+    def test_reserva_atomica_rechaza_horario_tomado_y_libera_al_cancelar(self):
+        tipo = TipoPista.objects.create(tipo='BASE', precio=10000)
+        pista = Pista.objects.create(numero=1, tipo_pista=tipo)
+        datos = {'fecha': date.today().isoformat(), 'hora': '21:00', 'pista': pista.pk}
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(reverse('nueva_reserva1'), datos)
+        self.assertEqual(sum('bowl_reserva' in q['sql'] for q in consultas.captured_queries), 1)  # Solo el INSERT
+
+        otro = Usuario.objects.create_user('cliente2', password='1234')
+        Cliente.objects.create(user=otro, nombre='Cliente 2', email='c2@bowling.com')
+        self.client.force_login(otro)
+        respuesta = self.client.post(reverse('nueva_reserva1'), datos)
+        self.assertIn('ya está reservada', str(list(get_messages(respuesta.wsgi_request))[-1]))
+        self.assertEqual(Reserva.objects.count(), 1)
+
+        reserva = Reserva.objects.get()
+        reserva.estado = estados.obtener(estados.DISPONIBLE)
+        reserva.save()
+        self.client.post(reverse('nueva_reserva1'), datos)
+        self.assertEqual(Reserva.objects.filter(activa=True).get().cliente.nombre, 'Cliente 2')
+
+    def test_cualquier_pista_elige_la_que_mejor_encaja(self):
+        base = TipoPista.objects.create(tipo='BASE', precio=10000)
+        vip = TipoPista.objects.create(tipo='VIP', precio=20000)
+        grande = Pista.objects.create(numero=1, tipo_pista=base, capacidad_maxima=8)
+        chica1 = Pista.objects.create(numero=2, tipo_pista=base, capacidad_maxima=4)
+        chica2 = Pista.objects.create(numero=3, tipo_pista=base, capacidad_maxima=4)
+        Pista.objects.create(numero=4, tipo_pista=vip, capacidad_maxima=4)
+        hoy = date.today()
+
+        # La más chica que alcanza; entre iguales, la de menor número
+        self.assertEqual(disponibilidad.mejor_pista(hoy, time(18, 0), base.pk, 3)['pk'], chica1.pk)
+        self.assertEqual(disponibilidad.mejor_pista(hoy, time(18, 0), base.pk, 6)['pk'], grande.pk)
+        self.assertIsNone(disponibilidad.mejor_pista(hoy, time(18, 0), vip.pk, 6))
+        # Si la pista 3 ya está ocupada justo antes, gana ella: el turno queda pegado
+        with self.captureOnCommitCallbacks(execute=True):
+            Reserva.objects.create(fecha=hoy, hora=time(17, 0), pista=chica2, estado=self.pendiente)
+        self.assertEqual(disponibilidad.mejor_pista(hoy, time(18, 0), base.pk, 3)['pk'], chica2.pk)
+
+        datos = {'fecha': hoy.isoformat(), 'hora': '18:00', 'tipo_pista': base.pk, 'personas': 3}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('nueva_reserva1'), datos)
+        reserva = Reserva.objects.get(hora=time(18, 0))
+        self.assertEqual((reserva.pista, reserva.precio_total), (chica2, 10000))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('nueva_reserva1'), datos)
+        self.assertEqual(Reserva.objects.get(hora=time(18, 0), cliente=self.cliente, pista=chica1).precio_total, 10000)
+
+    def test_guardar_con_estado_id_no_consulta_la_tabla_de_estados(self):
+        completada = estados.id_de(estados.COMPLETADA)
+        with CaptureQueriesContext(connection) as consultas:
+            reserva = Reserva.objects.create(fecha=date.today(), hora=time(16, 0), estado_id=completada)
+        self.assertFalse(reserva.activa)
+        self.assertFalse(any('bowl_estado' in q['sql'] for q in consultas.captured_queries))
+
+    def test_admin_muestra_el_choque_de_horario_en_el_formulario(self):
+        admin = Usuario.objects.create_user('admin', password='1234', is_staff=True, is_superuser=True)
+        pista = Pista.objects.create(numero=1)
+        manana = date.today() + timedelta(days=1)
+        Reserva.objects.create(fecha=manana, hora=time(20, 0), pista=pista, estado=self.pendiente)
+
+        self.client.force_login(admin)
+        datos = {'fecha': manana.isoformat(), 'hora': '20:00', 'pista': pista.pk, 'estado': self.pendiente.pk,
+                 'precio_total': '0'}
+        respuesta = self.client.post(reverse('admin:bowl_reserva_add'), datos)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('ya tiene una reserva activa', str(respuesta.context['adminform'].form.non_field_errors()))
+        # Cancelada no ocupa el horario: se guarda
+        datos['estado'] = estados.obtener(estados.DISPONIBLE).pk
+        self.assertEqual(self.client.post(reverse('admin:bowl_reserva_add'), datos).status_code, 302)
+
+    def test_serie_de_liga_informa_los_choques_y_crea_el_resto_de_una(self):
+        self.usuario.rol = 'admin'
+        self.usuario.save()
+        tipo = TipoPista.objects.create(tipo='BASE', precio=10000)
+        pistas = [Pista.objects.create(numero=n, tipo_pista=tipo) for n in (1, 2)]
+        viernes = date.today() + timedelta(days=(4 - date.today().weekday()) % 7)
+        Reserva.objects.create(
+            fecha=viernes + timedelta(weeks=2), hora=time(20, 0), pista=pistas[1], estado=self.pendiente
+        )
+
+        serie = {'pistas': [p.pk for p in pistas], 'dia_semana': 4, 'hora': '20:00',
+                 'desde': date.today().isoformat(), 'semanas': 4, 'cliente': self.cliente.pk}
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(reverse('reserva_serie'), serie, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json(), {
+            'creadas': 7,
+            'choques': [{'pista': 2, 'fecha': (viernes + timedelta(weeks=2)).isoformat()}],
+        })
+        self.assertEqual(sum('bowl_reserva' in q['sql'] for q in consultas.captured_queries), 2)
+        self.assertEqual(Reserva.objects.filter(cliente=self.cliente, hora=time(20, 0)).count(), 7)
+
+        # bulk_create no pasa por save(): una serie ya cerrada no ocupa las pistas
+        cerradas, _ = reservar_serie(pistas, [viernes], time(21, 0), estado=estados.obtener(estados.COMPLETADA))
+        self.assertEqual([reserva.activa for reserva in cerradas], [False, False])
+
+
+class VencimientoTests(TestCase):
+    def test_vence_pendientes_pasadas_y_la_marca_evita_volver_a_barrer(self):
+        pendiente = estados.obtener(estados.PENDIENTE)
+        hoy = date.today()
+        viejas = [Reserva.objects.create(fecha=hoy - timedelta(days=d), hora=time(20, 0), estado=pendiente)
+                  for d in (1, 30)]
+        de_hoy = Reserva.objects.create(fecha=hoy, hora=time(20, 0), estado=pendiente)
+
+        salida = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('vencer_reservas', stdout=salida)
+        self.assertIn('vencidas: 2', salida.getvalue())
+        for reserva in viejas:
+            reserva.refresh_from_db()
+            self.assertEqual((reserva.estado.nombre, reserva.activa), (estados.VENCIDA, False))
+        de_hoy.refresh_from_db()
+        self.assertEqual(de_hoy.estado, pendiente)
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(vencer_pendientes(), 0)
+        self.assertFalse(any('bowl_reserva' in q['sql'] for q in consultas.captured_queries))
+        self.assertEqual(vencer_pendientes(hoy=hoy + timedelta(days=1)), 1)
+
+
+class PaginacionTests(TestCase):
+    def _recorrer(self, url):
+        resultados, cursor = [], None
+        while True:
+            pagina = self.client.get(url, {'formato': 'json', 'tamanio': 2, **({'cursor': cursor} if cursor else {})}).json()
+            resultados += pagina['resultados']
+            cursor = pagina['siguiente']
+            if not cursor:
+                return resultados
+
+    def test_cursor_recorre_todo_sin_repetir_ni_saltear(self):
+        usuario = Usuario.objects.create_user('admin', password='1234', rol='admin')
+        cliente = Cliente.objects.create(user=usuario, nombre='Admin', email='a@bowling.com')
+        pendiente = estados.obtener(estados.PENDIENTE)
+        hoy = date.today()
+        # Dos reservas en el mismo horario: el desempate por pk tiene que mantenerlas en orden
+        for dias, hora in ((0, 20), (0, 20), (1, 18), (1, 22), (2, 14)):
+            Reserva.objects.create(fecha=hoy + timedelta(days=dias), hora=time(hora), cliente=cliente, estado=pendiente)
+        for n in range(4):
+            Usuario.objects.create_user(f'user{n}', password='1234')
+        self.client.force_login(usuario)
+
+        esperadas = list(Reserva.objects.order_by('-fecha', '-hora', '-pk').values_list('pk', flat=True))
+        self.assertEqual([r['id'] for r in self._recorrer(reverse('reserva'))], esperadas)
+        self.assertEqual([u['username'] for u in self._recorrer(reverse('asignar'))],
+                         sorted(Usuario.objects.values_list('username', flat=True)))
+        self.assertEqual(self.client.get(reverse('reserva'), {'cursor': 'no-es-un-cursor'}).status_code, 404)
+
+    def test_serializar_por_defecto_usa_las_columnas_o_campos_json(self):
+        pista = Pista.objects.create(numero=4)
+        reserva = Reserva.objects.create(fecha=date.today(), hora=time(18, 0), pista=pista)
+
+        fila = PaginacionKeysetMixin().serializar(reserva)
+        self.assertEqual((fila['id_reserva'], fila['pista_id'], fila['hora']), (reserva.pk, pista.pk, time(18, 0)))
+
+        mixin = PaginacionKeysetMixin()
+        mixin.campos_json = ['id_reserva', 'pista__numero']
+        self.assertEqual(mixin.serializar(reserva), {'id_reserva': reserva.pk, 'pista__numero': 4})
+
+
+class CocinaTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user('cocinero', password='1234', rol='admin')
+        self.cliente = Cliente.objects.create(user=self.usuario, nombre='Cocinero', email='co@bowling.com')
+        self.reserva = Reserva.objects.create(
+            fecha=date.today(), hora=time(22, 0), cliente=self.cliente, estado=estados.obtener(estados.PENDIENTE)
+        )
+        self.menu = Menu.objects.create(nombre='Papas', precio=3000)
+        self.client.force_login(self.usuario)
+
+    def _pedido(self, estado=estados.EN_PREPARACION):
+        pedido = Pedido.objects.create(reserva=self.reserva, cliente=self.cliente, estado=estados.obtener(estado))
+        DetallePedido.objects.create(pedido=pedido, menu=self.menu, cantidad=2)
+        return pedido
+
+    def test_vistas_de_pedidos_no_consultan_la_tabla_de_estados(self):
+        self._pedido()
+        urls = [reverse('cocina'), reverse('gestion_reserva', args=[self.reserva.pk])]
+        for url in urls:
+            self.client.get(url)  # Carga el registro
+
+        for url in urls:
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertFalse(any('bowl_estado' in q['sql'] for q in consultas.captured_queries), url)
+        self.assertEqual(respuesta.context['estado_pedido_mostrar'], 'En preparación ⏳')
+
+    def test_items_congelan_el_precio_y_el_total_se_corrige_en_la_base(self):
+        url = reverse('gestion_reserva', args=[self.reserva.pk])
+        self.client.get(url)  # Crea el pedido abierto
+        pedido = Pedido.objects.get()
+
+        def agregar(cantidad):
+            with CaptureQueriesContext(connection) as consultas:
+                self.client.post(url, {'accion': 'agregar_comida', 'menu_id': self.menu.pk, 'cantidad': cantidad})
+            return sum('bowl_detallepedido' in q['sql'] for q in consultas.captured_queries)
+
+        self.assertEqual(agregar(2), 2)  # UPDATE que no encuentra la línea + INSERT
+        self.assertEqual(agregar(1), 1)  # Mismo precio: solo el UPDATE relativo
+        self.menu.precio = 3500
+        self.menu.save()
+        agregar(1)
+
+        lineas = list(pedido.detalles.order_by('pk').values_list('precio_unitario', 'cantidad', 'subtotal'))
+        self.assertEqual(lineas, [(3000, 3, 9000), (3500, 1, 3500)])
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.precio_total, 12500)
+
+        detalle = pedido.detalles.get(precio_unitario=3000)
+        for _ in range(2):  # La segunda baja no encuentra el ítem y no descuenta de nuevo
+            self.client.post(url, {'accion': 'eliminar_item', 'detalle_id': detalle.pk})
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.precio_total, 3500)
+
+    def test_feed_publica_solo_el_pedido_que_cambia_con_la_version_del_dia(self):
+        cache.clear()
+        recibidos = []
+
+        class Pantalla:
+            def entregar(self, canal, mensaje):
+                recibidos.append((canal, mensaje))
+
+        pantalla = Pantalla()
+        broker().backend.conectar(pantalla)
+        self.addCleanup(broker().backend._brokers.remove, pantalla)
+
+        def ultimo():
+            canal, mensaje = recibidos[-1]
+            self.assertEqual(canal, canal_cocina(date.today()))
+            evento = mensaje.split('\n')[1].split(': ')[1]
+            return evento, json.loads(mensaje.split('data: ')[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido = self._pedido()
+        evento, datos = ultimo()
+        self.assertEqual((evento, datos['version'], datos['pedido']['estado']), ('pedido', 2, estados.EN_PREPARACION))
+
+        for nuevo, esperado in ((estados.LISTO, 'pedido'), (estados.ENTREGADO, 'quitado')):
+            with self.captureOnCommitCallbacks(execute=True):
+                respuesta = self.client.post(reverse('cocina'), {'pedido_id': pedido.pk, 'nuevo_estado': nuevo},
+                                             HTTP_ACCEPT='application/json')
+            self.assertEqual(respuesta.json()['estado'], nuevo)
+            self.assertEqual(ultimo()[0], esperado)
+
+        estado = self.client.get(reverse('cocina_estado')).json()
+        self.assertEqual((estado['version'], estado['pedidos']), (4, []))
+
+    def test_cola_adelanta_lo_rapido_y_estima_la_salida(self):
+        cache.clear()
+        self.addCleanup(cache.clear)  # La versión del día no queda para los otros tests
+        planificador.invalidar()
+        Reserva.objects.filter(pk=self.reserva.pk).update(hora=time(0, 0))  # El turno ya empezó
+        gaseosa = Menu.objects.create(nombre='Gaseosa', precio=500, minutos_preparacion=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            grande = self._pedido()  # 6 × Papas de 5 minutos
+            DetallePedido.objects.create(pedido=grande, menu=self.menu, cantidad=4)
+            Pedido.objects.filter(pk=grande.pk).update(enviado_a_cocina=timezone.now() - timedelta(minutes=10))
+            chica = Pedido.objects.create(reserva=self.reserva, estado=estados.obtener(estados.EN_PREPARACION))
+            DetallePedido.objects.create(pedido=chica, menu=gaseosa, cantidad=1)
+
+        # Llegó 10 minutos después, pero tarda 1 y no 30: sale primero
+        with self.settings(COCINA_PUESTOS=1):
+            turnos = cocina.plan(date.today())
+        ahora = timezone.now()
+        self.assertEqual([(t.pedido_id, t.minutos) for t in turnos], [(chica.pk, 1), (grande.pk, 30)])
+        self.assertAlmostEqual(turnos[0].listo, ahora + timedelta(minutes=1), delta=timedelta(seconds=30))
+        self.assertAlmostEqual(turnos[1].listo, ahora + timedelta(minutes=31), delta=timedelta(seconds=30))
+
+        # La cola en memoria se corrige con cada cambio, sin volver a armarse
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cocina'), {'pedido_id': chica.pk, 'nuevo_estado': estados.LISTO})
+        with CaptureQueriesContext(connection) as consultas:
+            turnos = cocina.plan(date.today())
+        self.assertEqual(len(consultas), 0)
+        self.assertEqual([(t.pedido_id, t.grupo) for t in turnos],
+                         [(chica.pk, planificador.LISTOS), (grande.pk, planificador.ENVIADOS)])
+
+        # Otro tiempo de preparación rearma la cola
+        self.menu.minutos_preparacion = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            self.menu.save()
+        self.assertEqual(cocina.plan(date.today())[1].minutos, 6)
+        self.assertEqual(self.client.get(reverse('cocina_estado')).json()['cola'][1]['id'], grande.pk)
+
+    async def test_feed_pide_recargar_si_la_pantalla_viene_atrasada(self):
+        # Sin sesión redirige al login, igual que el feed del tablero
+        self.assertEqual((await self.async_client.get(reverse('cocina_eventos'))).status_code, 302)
+        await self.async_client.aforce_login(self.usuario)
+        respuesta = await self.async_client.get(reverse('cocina_eventos'), {'version': 7})
+        contenido = aiter(respuesta.streaming_content)
+        self.assertIn('event: reinicio', (await anext(contenido)).decode())
+        await contenido.aclose()
+
+
+class CatalogoTests(TestCase):
+    def test_menu_se_cachea_por_version_y_el_admin_la_sube(self):
+        cache.clear()
+        admin = Usuario.objects.create_user('admin', password='1234', is_staff=True, is_superuser=True)
+        papas = Menu.objects.create(nombre='Papas', precio=3000)
+        url = reverse('menu_catalogo')
+
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.json()['menu'][0]['precio'], '3000.00')
+        etag = respuesta['ETag']
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.client.get(url)
+        self.assertEqual(len(consultas), 0)
+
+        # Cambio de precio desde el list_editable del changelist
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:bowl_menu_changelist'), {
+                'form-TOTAL_FORMS': '1', 'form-INITIAL_FORMS': '1', 'form-0-id': papas.pk,
+                'form-0-precio': '3500', 'form-0-minutos_preparacion': '5', 'form-0-disponible': 'on',
+                '_save': 'Guardar',
+            })
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['menu'][0]['precio'], '3500.00')
+
+    def test_imagen_subida_genera_derivados_con_hash_y_el_backfill_los_repite(self):
+        cache.clear()
+        png = io.BytesIO()
+        Image.new('RGBA', (1200, 800), (200, 40, 40, 128)).save(png, 'PNG')
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            with self.captureOnCommitCallbacks(execute=True):
+                papas = Menu.objects.create(nombre='Papas', imagen=SimpleUploadedFile('papas.png', png.getvalue()))
+            papas.refresh_from_db()
+            self.assertEqual(sorted(papas.derivados['webp'], key=int), ['320', '640', '960'])
+            self.assertRegex(papas.derivados['jpeg']['640'], r'^menu/derivados/[0-9a-f]{16}-640\.jpeg$')
+            with Image.open(os.path.join(media, papas.derivados['webp']['320'])) as chica:
+                self.assertEqual((chica.format, chica.size), ('WEBP', (320, 213)))
+
+            item = self.client.get(reverse('menu_catalogo')).json()['menu'][0]
+            self.assertIn('320w', item['srcset_webp'])
+            self.assertTrue(item['imagen'].endswith('-640.jpeg'))
+            # La ruta de /media/ solo existe con DEBUG; la vista se prueba directo
+            respuesta = servir_media(RequestFactory().get(item['imagen']), papas.derivados['jpeg']['640'])
+            self.assertIn('immutable', respuesta['Cache-Control'])
+
+            # Mismo contenido, mismos nombres: el backfill no duplica archivos
+            anteriores = papas.derivados
+            Menu.objects.filter(pk=papas.pk).update(derivados={})
+            call_command('generar_miniaturas', stdout=io.StringIO())
+            papas.refresh_from_db()
+            self.assertEqual(papas.derivados, anteriores)
+            self.assertEqual(len(os.listdir(os.path.join(media, 'menu', 'derivados'))), 6)
+
+    def test_imagen_ilegible_queda_marcada_y_un_rollback_no_deja_derivados(self):
+        png = io.BytesIO()
+        Image.new('RGB', (400, 300)).save(png, 'PNG')
+        with tempfile.TemporaryDirectory() as media, self.settings(MEDIA_ROOT=media):
+            with self.assertLogs('bowl.miniaturas', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                roto = Menu.objects.create(nombre='Roto', imagen=SimpleUploadedFile('roto.png', b'no es una imagen'))
+            roto.refresh_from_db()
+            self.assertEqual(roto.derivados, {'origen': roto.imagen.name, 'error': True})
+            # No se reintenta hasta que cambie la imagen, y la tarjeta usa la original
+            self.assertFalse(miniaturas.desactualizados(roto))
+            self.assertEqual(miniaturas.para_template(roto)['imagen'], roto.imagen.url)
+
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    Menu.objects.create(nombre='Papas', imagen=SimpleUploadedFile('papas.png', png.getvalue()))
+                    raise RuntimeError
+            self.assertFalse(os.path.exists(os.path.join(media, 'menu', 'derivados')))
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN es de SQLite")
+class IndicesTests(TestCase):
+    """Las consultas de las vistas principales no recorren tablas enteras con muchos datos."""
+
+    TABLAS = ('bowl_reserva', 'bowl_pedido', 'bowl_frame', 'bowl_mensaje')
+
+    @classmethod
+    def setUpTestData(cls):
+        azar = random.Random(16)
+        pendiente, entregado = estados.obtener(estados.PENDIENTE), estados.obtener(estados.ENTREGADO)
+        usuarios = Usuario.objects.bulk_create(
+            [Usuario(username=f'u{n}', rol='admin' if n == 0 else 'cliente', is_staff=n == 0, is_superuser=n == 0)
+             for n in range(40)]
+        )
+        clientes = Cliente.objects.bulk_create(
+            [Cliente(user=u, nombre=u.username, email=f'{u.username}@bowling.com') for u in usuarios]
+        )
+        pistas = Pista.objects.bulk_create([Pista(numero=n) for n in range(1, 11)])
+        hoy = date.today()
+        reservas = Reserva.objects.bulk_create([
+            Reserva(fecha=hoy + timedelta(days=dia), hora=time(hora), pista=pista,
+                    cliente=azar.choice(clientes), estado=pendiente)
+            for dia in range(-300, 60) for hora in (14, 18, 22) for pista in pistas[:6]
+        ])
+        menu = Menu.objects.create(nombre='Papas', precio=3000)
+        pedidos = Pedido.objects.bulk_create([
+            Pedido(reserva=reserva, cliente=reserva.cliente, estado=azar.choice([pendiente, entregado]))
+            for reserva in azar.sample(reservas, 3000)
+        ])
+        DetallePedido.objects.bulk_create([DetallePedido(pedido=p, menu=menu, subtotal=3000) for p in pedidos])
+        partidas = Partida.objects.bulk_create([Partida(reserva=r, pista=r.pista) for r in reservas[:400]])
+        crear_frames(*Jugador.objects.bulk_create([Jugador(partida=p, nombre='J') for p in partidas]))
+        Mensaje.objects.bulk_create([Mensaje(nombre=f'm{n}', mensaje='hola') for n in range(3000)])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        cls.admin = usuarios[0]
+        cls.reserva = Reserva.objects.filter(cliente=clientes[0], fecha__gte=hoy).first()
+        cls.reserva_con_partida = partidas[0].reserva
+
+    def _recorridos(self, consultas):
+        """Líneas del plan que recorren una tabla caliente entera (SCAN sin índice)."""
+        recorridos = []
+        with connection.cursor() as cursor:
+            for consulta in consultas.captured_queries:
+                sql = consulta['sql']
+                if not sql.startswith('SELECT') or not any(f'"{t}"' in sql for t in self.TABLAS):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                for *_, detalle in cursor.fetchall():
+                    tabla = detalle.split()[1] if detalle.startswith('SCAN ') else None
+                    if tabla in self.TABLAS and 'USING' not in detalle:
+                        recorridos.append(f'{detalle}  <-  {sql}')
+        return recorridos
+
+    def test_vistas_principales_usan_indices(self):
+        cliente = Cliente.objects.get(user=self.reserva.cliente_id)
+        self.client.force_login(cliente.user)
+        urls = [
+            reverse('reserva'),
+            reverse('nueva_reserva1'),
+            reverse('calendario_disponibilidad') + '?dias=30',
+            reverse('gestion_reserva', args=[self.reserva.pk]),
+        ]
+        with CaptureQueriesContext(connection) as consultas:
+            for url in urls:
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+            siguiente = self.client.get(reverse('reserva'), {'formato': 'json', 'tamanio': 5}).json()['siguiente']
+            self.assertEqual(self.client.get(reverse('reserva'), {'cursor': siguiente}).status_code, 200)
+
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as consultas_admin:
+            for url in [reverse('cocina'), reverse('asignar'),
+                        reverse('tablero_estado', args=[self.reserva_con_partida.pk]),
+                        reverse('admin:bowl_mensaje_changelist')]:
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+
+        recorridos = self._recorridos(consultas) + self._recorridos(consultas_admin)
+        self.assertEqual(recorridos, [], '\n'.join(recorridos))
 
-# Create your tests here.
@@ -0,0 +1,61 @@
+# bowl/vencimientos.py
+"""
+Vencimiento de reservas que quedaron pendientes en fechas pasadas.
+
+Una reserva sigue "Pendiente" hasta que se juega la partida; si nadie vino,
+quedaba así para siempre y las consultas de reservas activas arrastraban
+todo el historial. El barrido pasa las pendientes de días anteriores a un
+estado terminal con un UPDATE por estado, sin cargar filas.
+
+La marca de agua (modelo Barrido) recuerda hasta qué fecha ya se barrió:
+la siguiente corrida solo mira los días nuevos, y si ya se barrió hoy no
+toca la tabla de reservas. Se corre con `manage.py vencer_reservas` (una
+vez o en bucle con --cada) o llamando a vencer_pendientes() desde el
+proceso que lo programe.
+"""
+from datetime import date
+
+from django.db import transaction
+
+from . import disponibilidad, estados
+from .models import Barrido, Reserva
+
+BARRIDO = 'vencer_reservas'
+
+# Estado abierto → estado terminal al que pasa cuando su fecha ya pasó
+VENCIMIENTOS = {
+    estados.PENDIENTE: estados.VENCIDA,
+}
+
+
+def vencer_pendientes(hoy=None, completo=False):
+    """
+    Vence las reservas abiertas con fecha anterior a `hoy` y devuelve cuántas cambió.
+    Con `completo` ignora la marca de agua (por ejemplo, después de cargar reservas viejas a mano).
+    """
+    hoy = hoy or date.today()
+    vencidas = 0
+    fechas = set()
+
+    with transaction.atomic():
+        marca, _ = Barrido.objects.select_for_update().get_or_create(nombre=BARRIDO)
+        desde = None if completo else marca.hasta
+        if desde is not None and desde >= hoy:
+            return 0
+
+        for abierto, terminal in VENCIMIENTOS.items():
+            # activa=True deja usar el índice (fecha, activa, hora); una pendiente siempre está activa
+            reservas = Reserva.objects.filter(estado_id=estados.id_de(abierto), activa=True, fecha__lt=hoy)
+            if desde is not None:
+                reservas = reservas.filter(fecha__gte=desde)
+            fechas.update(reservas.values_list('fecha', flat=True).distinct())
+            # El UPDATE no pasa por save(): `activa` se deriva acá con la misma regla
+            estado = estados.obtener(terminal)
+            vencidas += reservas.update(estado=estado, activa=Reserva.activa_con(estado.pk))
+
+        marca.hasta = hoy
+        marca.save(update_fields=['hasta', 'actualizado'])
+        # Sin señales de post_save: el índice de disponibilidad se corrige a mano
+        transaction.on_commit(lambda: disponibilidad.invalidar_fechas(fechas))
+
+    return vencidas
@@ -1,11 +1,18 @@
 ﻿# bowl/views.py
 
 from django.shortcuts import redirect, render, get_object_or_404
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.views import View
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView
 from django.contrib.auth.views import LoginView
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+from django.views.static import serve
 from django.contrib import messages
 from django.utils import timezone
 from django.core.mail import send_mail
@@ -13,20 +20,27 @@ from django.conf import settings
 from datetime import datetime, time, timedelta
 from django.core.serializers import serialize
 from django.db.models import Sum
-from django.db import models    
+from django.db import models, IntegrityError, transaction
 from .models import Menu, Pedido, DetallePedido
+import hmac
 import json
 from datetime import date
 
 from .models import (
-    Reserva, Pista, Cafeteria, Usuario, Cliente, TipoPista, Estado,
-     Partida, Jugador, Frame, PuntajeJugador
+    Reserva, Pista, Cafeteria, Usuario, Cliente, TipoPista,
+     Partida, Jugador, PuntajeJugador, ReservaHistorica
 )
 from .forms import (
     CrearPistaForm, EditarPistaForm,
-    ContactoForm, RegistroUsuarioForm, ReservaForm,
+    ContactoForm, RegistroUsuarioForm, ReservaForm, SerieReservasForm,
      JugadorForm
 )
+from .puntuacion import EstadoPartida, finalizar_partida, formatear_frame, version_partida
+from .eventos import broker, canal_partida
+from . import catalogo, cocina, disponibilidad, estados, miniaturas
+from .paginacion import PaginacionKeysetMixin, paginar, pide_json, respuesta_json, tamanio_pedido
+from .pedidos import agregar_item, quitar_item
+from .reservas import HorarioOcupado, fechas_serie, reservar, reservar_mejor_pista, reservar_serie
 
 EMAIL_HOST_USER = settings.EMAIL_HOST_USER
 
@@ -68,6 +82,37 @@ class InicioView(ThemeMixin, UsuarioContext, TemplateView):
 class CafeView(LoginRequiredMixin, ThemeMixin, UsuarioContext, TemplateView):
     template_name = "bowl/cafe.html"
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['menu_items'] = catalogo.menu()
+        return context
+
+
+def etag_menu(request):
+    """ETag del catálogo: solo lee la versión de la caché."""
+    return catalogo.etag()
+
+
+@method_decorator(condition(etag_func=etag_menu), name='get')
+class MenuCatalogoView(View):
+    """Menú disponible en JSON para los celulares; responde 304 mientras no cambie la versión."""
+
+    def get(self, request):
+        response = JsonResponse({'version': catalogo.version(), 'menu': catalogo.menu()})
+        patch_cache_control(response, public=True, max_age=60)
+        return response
+
+
+def servir_media(request, path):
+    """
+    Archivos subidos, en desarrollo (en producción los sirve el servidor web con los mismos headers).
+    Los derivados del menú llevan el hash del contenido en el nombre: se cachean para siempre.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if path.startswith(f'{miniaturas.CARPETA}/'):
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    return response
+
 
 class LoginnView(ThemeMixin, UsuarioContext, LoginView):
     template_name = "bowl/inicio_sesion1.html"
@@ -82,11 +127,12 @@ def toggle_theme_mode(request):
 # Reservas
 # ---------------------------------------------------------
 
-class ReservaListView(LoginRequiredMixin, ThemeMixin, UsuarioContext, ListView):
+class ReservaListView(LoginRequiredMixin, ThemeMixin, UsuarioContext, PaginacionKeysetMixin, ListView):
     model = Reserva
     template_name = 'bowl/reserva.html'
     context_object_name = 'reservas'
     login_url = reverse_lazy('iniciar_sesion')
+    orden = ('-fecha', '-hora')  # Cubierto por reserva_cliente_estado_idx
 
     def get_queryset(self):
         user = self.request.user
@@ -97,11 +143,51 @@ class ReservaListView(LoginRequiredMixin, ThemeMixin, UsuarioContext, ListView):
         # Solo mostrar reservas que aÃºn estÃ¡n pendientes (es decir, activas)
         return Reserva.objects.filter(
             cliente=cliente,
-            estado__nombre="Pendiente"       # Â¡Solo las pendientes!
-        ).order_by('-fecha', '-hora')
+            estado_id=estados.id_de(estados.PENDIENTE)       # Â¡Solo las pendientes!
+        ).select_related('cliente', 'pista')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        estados.adjuntar(context['reservas'])
+        return context
+
+    def serializar(self, reserva):
+        return {
+            'id': reserva.pk,
+            'fecha': reserva.fecha.isoformat(),
+            'hora': reserva.hora.strftime('%H:%M'),
+            'pista': reserva.pista.numero if reserva.pista else None,
+            'precio_total': str(reserva.precio_total),
+            'estado': estados.nombre_de(reserva.estado_id),
+        }
 
 
 
+class HistorialReservasView(LoginRequiredMixin, ThemeMixin, UsuarioContext, PaginacionKeysetMixin, ListView):
+    """Todas las reservas del cliente, también las ya archivadas (lee la vista ReservaHistorica)."""
+    template_name = 'bowl/historial.html'
+    context_object_name = 'reservas'
+    login_url = reverse_lazy('iniciar_sesion')
+    orden = ('-fecha', '-hora')
+
+    def get_queryset(self):
+        cliente = getattr(self.request.user, "cliente", None)
+        if not cliente:
+            return ReservaHistorica.objects.none()
+        return ReservaHistorica.objects.filter(cliente=cliente)
+
+    def serializar(self, reserva):
+        return {
+            'id': reserva.pk,
+            'fecha': reserva.fecha.isoformat(),
+            'hora': reserva.hora.strftime('%H:%M'),
+            'pista': reserva.pista_numero,
+            'precio_total': str(reserva.precio_total),
+            'estado': reserva.estado,
+            'archivada': reserva.archivada,
+        }
+
+
 class ReservaCreateView(LoginRequiredMixin, ThemeMixin, UsuarioContext, CreateView):
     model = Reserva
     form_class = ReservaForm
@@ -113,9 +199,6 @@ class ReservaCreateView(LoginRequiredMixin, ThemeMixin, UsuarioContext, CreateVi
         context = super().get_context_data(**kwargs)
         today = date.today()
 
-        # === Horarios disponibles: de 14:00 a 23:00 cada hora ===
-        horarios = [f"{hora:02d}:00" for hora in range(14, 24)]
-
         # === Crear tipos y pistas por defecto si no existen ===
         self.crear_datos_por_defecto()
 
@@ -132,51 +215,15 @@ class ReservaCreateView(LoginRequiredMixin, ThemeMixin, UsuarioContext, CreateVi
         else:
             fecha_seleccionada = today
 
-        # === Calcular disponibilidad por horario ===
-        horarios_disponibilidad = []
-        reservas_pendientes = Reserva.objects.filter(
-            fecha=fecha_seleccionada,
-            estado__nombre__iexact="Pendiente"
-        ).values('hora', 'pista_id')
-
-        # Diccionario: hora -> set de pista_ids ocupadas
-        ocupadas_por_hora = {}
-        for res in reservas_pendientes:
-            hora_str = res['hora'].strftime('%H:%M')
-            ocupadas_por_hora.setdefault(hora_str, set()).add(res['pista_id'])
-
-        todas_las_pistas = list(Pista.objects.select_related('tipo_pista').all())
-
-        for hora_str in horarios:
-            hora = datetime.strptime(hora_str, '%H:%M').time()
-            ocupadas_ids = ocupadas_por_hora.get(hora_str, set())
-
-            pistas_disponibles = [p for p in todas_las_pistas if p.pk not in ocupadas_ids]
-
-            pistas_simple = [
-                {
-                    'pk': p.pk,
-                    'numero': p.numero,
-                    'tipo': p.tipo_pista.tipo if p.tipo_pista else 'Sin tipo',
-                    'precio': p.tipo_pista.precio if p.tipo_pista else 0,
-                }
-                for p in pistas_disponibles
-            ]
-
-            horarios_disponibilidad.append({
-                'hora': hora_str,
-                'disponible': len(pistas_disponibles) > 0,
-                'cantidad': len(pistas_disponibles),
-                'pistas': pistas_disponibles,
-                'pistas_json': json.dumps(pistas_simple, ensure_ascii=False, default=str),
-            })
-        print(today.strftime('%Y-%m-%d'))
+        # === Disponibilidad por horario: sale del índice, no se recalcula ===
+        horarios_disponibilidad = disponibilidad.grilla(fecha_seleccionada)
+
         context.update({
-            'horarios': horarios,
+            'horarios': [slot['hora'] for slot in horarios_disponibilidad],
             'horarios_disponibilidad': horarios_disponibilidad,
             'fecha_seleccionada': fecha_seleccionada,
             'today': today,
-            'pistas_totales': todas_las_pistas,
+            'pistas_totales': disponibilidad.pistas(),
             'min_fecha': today.strftime('%Y-%m-%d'),  # Para usar en el input type="date"
         })
 
@@ -226,35 +273,105 @@ class ReservaCreateView(LoginRequiredMixin, ThemeMixin, UsuarioContext, CreateVi
             messages.error(self.request, "No se pueden hacer reservas para fechas pasadas.")
             return redirect('nueva_reserva1')
 
-        # Verificar conflicto de reserva
-        conflicto = Reserva.objects.filter(
-            pista=pista,
-            fecha=fecha,
-            hora=hora,
-            estado__nombre__iexact="Pendiente"
-        ).exists()
-
-        if conflicto:
-            messages.error(self.request, "Esta pista ya está reservada en ese horario.")
-            return redirect('nueva_reserva1')
-
         # Asignar datos adicionales
         form.instance.cliente = cliente
         form.instance.usuario = user
-        form.instance.estado, _ = Estado.objects.get_or_create(nombre="Pendiente")
-        form.instance.precio_total = pista.tipo_pista.precio if pista.tipo_pista else 0
+        form.instance.estado = estados.obtener(estados.PENDIENTE)
+
+        if pista is None:
+            # Cualquier pista del tipo pedido: la elige el servidor con el índice de disponibilidad
+            tipo = form.cleaned_data.get('tipo_pista')
+            try:
+                self.object, elegida = reservar_mejor_pista(
+                    form.instance, tipo.pk if tipo else None, form.cleaned_data.get('personas') or 1
+                )
+            except HorarioOcupado:
+                messages.error(self.request, "No quedan pistas libres de ese tipo en ese horario.")
+                return redirect('nueva_reserva1')
+            numero, tipo_nombre = elegida['numero'], elegida['tipo']
+        else:
+            form.instance.precio_total = pista.tipo_pista.precio if pista.tipo_pista else 0
+            # Sin chequeo previo: el INSERT falla si otro se quedó con el horario
+            try:
+                self.object = reservar(form.instance)
+            except HorarioOcupado:
+                messages.error(self.request, "Esta pista ya está reservada en ese horario.")
+                return redirect('nueva_reserva1')
+            numero, tipo_nombre = pista.numero, pista.tipo_pista.tipo if pista.tipo_pista else 'Sin tipo'
 
         messages.success(
             self.request,
             f"Reserva creada exitosamente para el {fecha} a las {hora.strftime('%H:%M')} "
-            f"en la pista {pista.numero} ({pista.tipo_pista.tipo})."
+            f"en la pista {numero} ({tipo_nombre})."
         )
 
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
     def form_invalid(self, form):
         messages.error(self.request, "Por favor corrige los errores en el formulario.")
         return self.render_to_response(self.get_context_data(form=form))
+
+
+class CalendarioDisponibilidadView(LoginRequiredMixin, View):
+    """
+    Pistas libres por horario para varios días, en un solo pedido.
+    GET ?desde=AAAA-MM-DD&dias=30 (por defecto, hoy y 30 días).
+    """
+
+    def get(self, request):
+        try:
+            desde = datetime.strptime(request.GET.get('desde', ''), '%Y-%m-%d').date()
+        except ValueError:
+            desde = date.today()
+        try:
+            dias = int(request.GET.get('dias', 30))
+        except ValueError:
+            dias = 30
+        dias = min(max(dias, 1), disponibilidad.MAX_DIAS_CALENDARIO)
+
+        return JsonResponse({
+            'desde': desde.isoformat(),
+            'dias': dias,
+            'pistas': len(disponibilidad.pistas()),
+            'horarios': [hora.strftime('%H:%M') for hora in disponibilidad.HORARIOS],
+            'calendario': disponibilidad.calendario(desde, dias),
+        })
+
+
+class ReservaSerieView(LoginRequiredMixin, View):
+    """
+    Serie de reservas para ligas: pistas × día de la semana × hora × N semanas.
+    POST JSON {"pistas": [1, 2], "dia_semana": 4, "hora": "20:00", "desde": "AAAA-MM-DD", "semanas": 12}
+    Crea las que están libres y devuelve exactamente cuáles chocaron.
+    """
+
+    def post(self, request):
+        if getattr(request.user, 'rol', None) != 'admin':
+            return JsonResponse({'error': 'No tienes permiso para crear series.'}, status=403)
+
+        try:
+            form = SerieReservasForm(json.loads(request.body))
+        except ValueError:
+            return JsonResponse({'error': 'JSON inválido.'}, status=400)
+        if not form.is_valid():
+            return JsonResponse({'errores': form.errors}, status=400)
+
+        datos = form.cleaned_data
+        fechas = fechas_serie(datos['desde'], datos['dia_semana'], datos['semanas'])
+        try:
+            creadas, choques = reservar_serie(
+                list(datos['pistas']), fechas, datos['hora'],
+                cliente=datos['cliente'], estado=estados.obtener(estados.PENDIENTE),
+            )
+        except HorarioOcupado as error:
+            return JsonResponse({'error': str(error)}, status=409)
+
+        return JsonResponse({
+            'creadas': len(creadas),
+            'choques': [{'pista': pista.numero, 'fecha': fecha.isoformat()} for pista, fecha in choques],
+        }, status=201 if creadas else 200)
+
+
 # Pistas
 # ---------------------------------------------------------
 
@@ -290,166 +407,24 @@ class EditarPistaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, UpdateView
 class TableroPuntuacionesView(LoginRequiredMixin, TemplateView):
     template_name = "bowl/tabla_puntuaciones.html"
 
-    def _asegurar_frames(self, partida):
-        """Crea frames vacíos para todos los jugadores si no existen."""
-        jugadores = Jugador.objects.filter(partida=partida)
-        for jugador in jugadores:
-            for numero in range(1, 11):
-                Frame.objects.get_or_create(jugador=jugador, numero=numero)
-
-    def _siguiente_tiro(self, partida):
-        """
-        Devuelve el siguiente tiro pendiente.
-        Retorna dict con: jugador, frame, tiro (1/2/3), maximo permitido.
-        """
-        jugadores = Jugador.objects.filter(partida=partida).order_by('id_jugador')
-        for numero in range(1, 11):
-            for jugador in jugadores:
-                frame = Frame.objects.get(jugador=jugador, numero=numero)
-
-                # Tiro 1 siempre pendiente si no está hecho
-                if frame.tiro1 is None:
-                    return {'jugador': jugador, 'frame': frame, 'tiro': 1, 'maximo': 10}
-
-                # Frames 1-9
-                if numero < 10:
-                    if frame.tiro1 < 10 and frame.tiro2 is None:
-                        return {'jugador': jugador, 'frame': frame, 'tiro': 2, 'maximo': 10 - frame.tiro1}
-
-                # Frame 10 - lógica especial
-                else:
-                    if frame.tiro2 is None:
-                        max_tiro2 = 10 if frame.tiro1 == 10 else (10 - frame.tiro1)
-                        return {'jugador': jugador, 'frame': frame, 'tiro': 2, 'maximo': max_tiro2}
-
-                    if (frame.tiro1 == 10 or (frame.tiro1 + frame.tiro2) >= 10) and frame.tiro3 is None:
-                        if frame.tiro1 == 10 and frame.tiro2 == 10:
-                            max_tiro3 = 10
-                        elif frame.tiro1 == 10:
-                            max_tiro3 = 10 - frame.tiro2
-                        else:
-                            max_tiro3 = 10
-                        return {'jugador': jugador, 'frame': frame, 'tiro': 3, 'maximo': max_tiro3}
-
-        return None  # Partida terminada
-
-    def _formatear_frame(self, frame):
-        """Devuelve X, /, números o guiones para mostrar en la tabla."""
-        t1, t2, t3 = frame.tiro1, frame.tiro2, frame.tiro3
-
-        if frame.numero < 10:
-            if t1 is None:
-                return "-"
-            if t1 == 10:
-                return "X"
-            if t2 is None:
-                return f"{t1} -"
-            if t1 + t2 >= 10:
-                return f"{t1} /"
-            return f"{t1} {t2}"
-
-        # Frame 10
-        partes = []
-
-        # Tiro 1
-        if t1 == 10:
-            partes.append("X")
-        elif t1 is None:
-            partes.append("-")
-        else:
-            partes.append(str(t1))
-
-        # Tiro 2
-        if t2 is None:
-            partes.append("-")
-        elif t1 == 10 and t2 == 10:
-            partes.append("X")
-        elif t1 != 10 and t1 + t2 >= 10:
-            partes.append("/")
-        else:
-            partes.append(str(t2))
-
-        # Tiro 3 (solo si existe)
-        if t3 is not None:
-            if t3 == 10:
-                partes.append("X")
-            elif (t1 == 10 or t1 + t2 >= 10) and (t2 + t3 >= 10) and t2 != 10:
-                partes.append("/")
-            else:
-                partes.append(str(t3))
-
-        return " ".join(partes) if partes else "-"
-
-    def _calcular_puntaje_acumulado(self, jugador):
-        """
-        CÁLCULO OFICIAL DE BOWLING.
-        Devuelve lista de 10 frames con puntaje acumulado correcto.
-        """
-        frames = list(Frame.objects.filter(jugador=jugador).order_by('numero'))
-        resultado = []
-        total = 0
-
-        for i, frame in enumerate(frames):
-            t1 = frame.tiro1 or 0
-            t2 = frame.tiro2 or 0
-            t3 = frame.tiro3 or 0 if frame.numero == 10 else 0
-
-            if frame.numero < 10:
-                if t1 == 10:  # Strike
-                    # Próximos 2 tiros
-                    if i + 1 < 10:
-                        next1 = frames[i + 1]
-                        bonus1 = next1.tiro1 or 0
-                        bonus2 = (next1.tiro2 or 0) if next1.tiro1 != 10 or i + 2 >= 10 else (frames[i + 2].tiro1 or 0)
-                    else:  # frame 9 → frame 10
-                        bonus1 = frames[9].tiro2 or 0
-                        bonus2 = frames[9].tiro3 or 0
-                    puntaje_frame = 10 + bonus1 + bonus2
-
-                elif t1 + t2 == 10:  # Spare
-                    bonus = frames[i + 1].tiro1 or 0 if i + 1 < 10 else (frames[9].tiro2 or 0)
-                    puntaje_frame = 10 + bonus
-
-                else:
-                    puntaje_frame = t1 + t2
-
-            else:  # Frame 10 → sin bonus, se suman los 3 tiros tal cual
-                puntaje_frame = t1 + t2 + t3
-
-            total += puntaje_frame
-            resultado.append({
-                'frame_numero': frame.numero,
-                'puntaje_frame': puntaje_frame,
-                'puntaje_acumulado': total,
-                'display': self._formatear_frame(frame),
-                'frame_obj': frame,
-            })
-
-        return resultado, total
-
-    def _armar_tabla(self, partida):
-        turno = self._siguiente_tiro(partida)
-        jugadores = Jugador.objects.filter(partida=partida).order_by('id_jugador')
+    def _armar_tabla(self, estado):
+        turno = estado.siguiente_tiro()
         tabla = []
 
-        for jugador in jugadores:
-            puntajes_frames, total_final = self._calcular_puntaje_acumulado(jugador)
+        for jugador in estado.jugadores:
+            puntajes_frames, total_final = estado.puntajes(jugador)
+            es_turno_actual = bool(turno) and turno['jugador'].id_jugador == jugador.id_jugador
 
             # Marcar cuál es el frame/tiro actual del jugador
             for item in puntajes_frames:
-                es_actual = (
-                    turno and
-                    item['frame_obj'].id == turno['frame'].id and
-                    turno['jugador'].id_jugador == jugador.id_jugador
-                )
-                item['es_actual'] = es_actual
+                item['es_actual'] = es_turno_actual and item['frame_numero'] == turno['frame'].numero
 
             tabla.append({
                 'id': jugador.id_jugador,
                 'nombre': jugador.nombre,
                 'puntajes': puntajes_frames,
                 'total': total_final,
-                'es_turno_actual': turno and turno['jugador'].id_jugador == jugador.id_jugador,
+                'es_turno_actual': es_turno_actual,
             })
 
         frame_actual = turno['frame'].numero if turno else 1
@@ -457,7 +432,7 @@ class TableroPuntuacionesView(LoginRequiredMixin, TemplateView):
         tiro_actual = turno['tiro'] if turno else 1
         maximo_tiro = turno['maximo'] if turno else 10
 
-        return tabla, frame_actual, jugador_actual, tiro_actual, maximo_tiro
+        return tabla, turno, frame_actual, jugador_actual, tiro_actual, maximo_tiro
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -470,16 +445,18 @@ class TableroPuntuacionesView(LoginRequiredMixin, TemplateView):
         )
 
         if creada:
+            # Sus 10 frames los crea la señal post_save de Jugador
             nombre = self.request.user.get_full_name() or self.request.user.username
-            jugador, _ = Jugador.objects.get_or_create(partida=partida, nombre=nombre)
-
-        self._asegurar_frames(partida)
+            Jugador.objects.get_or_create(
+                partida=partida, nombre=nombre, defaults={'cliente': partida.cliente}
+            )
 
         clave_sesion = f'partida_iniciada_{partida.id_partida}'
         partida_iniciada = self.request.session.get(clave_sesion, False)
 
-        jugadores_puntajes, frame_actual, jugador_actual, tiro_actual, maximo_tiro = self._armar_tabla(partida)
-        partida_terminada = partida_iniciada and not self._siguiente_tiro(partida)
+        estado = EstadoPartida.cargar(partida)
+        jugadores_puntajes, turno, frame_actual, jugador_actual, tiro_actual, maximo_tiro = self._armar_tabla(estado)
+        partida_terminada = partida_iniciada and not turno
 
         ganador = None
         if partida_terminada and jugadores_puntajes:
@@ -530,8 +507,6 @@ class TableroPuntuacionesView(LoginRequiredMixin, TemplateView):
             jugador = form.save(commit=False)
             jugador.partida = partida
             jugador.save()
-            for i in range(1, 11):
-                Frame.objects.get_or_create(jugador=jugador, numero=i)
             messages.success(request, f"{jugador.nombre} agregado a la partida")
         return redirect('tablero_puntuaciones', pk=pk)
 
@@ -539,47 +514,147 @@ class TableroPuntuacionesView(LoginRequiredMixin, TemplateView):
         pk = self.kwargs.get('pk')
         reserva = get_object_or_404(Reserva, pk=pk)
         partida = Partida.objects.get(reserva=reserva)
-        turno = self._siguiente_tiro(partida)
-
-        if not turno:
-            messages.info(request, "La partida ya terminó.")
-            return redirect('tablero_puntuaciones', pk=pk)
 
         try:
             pins = int(request.POST.get('puntaje_turno', 0))
         except ValueError:
             pins = 0
 
-        pins = max(0, min(pins, turno['maximo']))
-        frame = turno['frame']
-
-        if turno['tiro'] == 1:
-            frame.tiro1 = pins
-            if frame.numero < 10 and pins == 10:
-                frame.tiro2 = 0  # Strike en 1-9 → segundo tiro no se juega
-        elif turno['tiro'] == 2:
-            frame.tiro2 = pins
-        else:  # tiro 3 (solo frame 10)
-            frame.tiro3 = pins
+        # Lectura con lock, tiro en el log y frames proyectados en una sola transacción
+        try:
+            with transaction.atomic():
+                estado = EstadoPartida.cargar(partida, bloquear=True)
+                turno = estado.siguiente_tiro()
+                if turno:
+                    estado.registrar(max(0, min(pins, turno['maximo'])))
+                    # Un solo cálculo por tiro, sin importar cuántas pantallas estén mirando
+                    delta = estado.delta(turno['jugador'])
+                    transaction.on_commit(
+                        lambda: broker().publicar(canal_partida(partida.id_partida), 'tiro', delta)
+                    )
+        except IntegrityError:
+            messages.error(request, "Se registró otro tiro al mismo tiempo. Volvé a intentar.")
+            return redirect('tablero_puntuaciones', pk=pk)
 
-        frame.save()
+        if not turno:
+            messages.info(request, "La partida ya terminó.")
+            return redirect('tablero_puntuaciones', pk=pk)
 
-        marca = self._formatear_frame(frame)
+        frame = turno['frame']
+        marca = formatear_frame(frame)
         messages.success(request, f"{turno['jugador'].nombre} - Frame {frame.numero}: {marca}")
 
-        # Si no quedan más tiros → partida terminada
-        if not self._siguiente_tiro(partida):
-            try:
-                estado_completada = Estado.objects.get(nombre="Completada")
-                reserva.estado = estado_completada
-                reserva.fecha_completada = date.today()
-                reserva.save()
-            except Estado.DoesNotExist:
-                pass  # opcional: crear el estado si no existe
+        # Si no quedan más tiros → partida terminada (los frames ya están guardados)
+        if not estado.siguiente_tiro():
+            finalizar_partida(partida, reserva)
             messages.success(request, "PARTIDA TERMINADA - ¡Felicitaciones a todos!")
 
         return redirect('tablero_puntuaciones', pk=pk)
-    
+
+
+def _etag_partida(partida_id, version):
+    return f'"partida-{partida_id}-v{version}"'
+
+
+def etag_tablero(request, pk):
+    """ETag de la partida de una reserva: solo lee la versión, no puntúa."""
+    partida_id = Partida.objects.filter(reserva_id=pk).values_list('id_partida', flat=True).first()
+    if partida_id is None:
+        return None
+    return _etag_partida(partida_id, version_partida(partida_id))
+
+
+@method_decorator(condition(etag_func=etag_tablero), name='get')
+class TableroEstadoView(LoginRequiredMixin, View):
+    """Estado del tablero en JSON para las pantallas de pista y recepción."""
+
+    def get(self, request, pk):
+        partida = Partida.objects.filter(reserva_id=pk).first()
+        if partida is None:
+            raise Http404("La reserva todavía no tiene partida.")
+
+        estado = EstadoPartida.cargar(partida)
+        datos = estado.como_dict()
+        datos['reserva'] = pk
+
+        response = JsonResponse(datos)
+        response['ETag'] = _etag_partida(partida.id_partida, estado.version)
+        return response
+
+
+def token_pinsetter(request):
+    """Token del header `Authorization: Bearer <token>`, o '' si no vino."""
+    esquema, _, token = request.headers.get('Authorization', '').partition(' ')
+    return token.strip() if esquema.lower() == 'bearer' else ''
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class TableroLoteView(View):
+    """
+    Carga en lote para los pinsetters automáticos.
+    Recibe {"tiros": [pinos, ...]} en orden y los aplica todos o ninguno.
+
+    El controlador de la pista no tiene sesión ni cookie CSRF: se autentica con el
+    token de su pista (settings.PINSETTER_TOKENS) en `Authorization: Bearer <token>`.
+    Sin token o con el de otra pista responde 401.
+    """
+
+    def post(self, request, pk):
+        reserva = get_object_or_404(Reserva.objects.select_related('pista'), pk=pk)
+        numero = reserva.pista.numero if reserva.pista else None
+        esperado = getattr(settings, 'PINSETTER_TOKENS', {}).get(numero, '')
+        if not esperado or not hmac.compare_digest(token_pinsetter(request), esperado):
+            return JsonResponse({'error': 'Token de pinsetter inválido para esta pista.'}, status=401)
+
+        partida = get_object_or_404(Partida, reserva=reserva)
+
+        try:
+            lote = json.loads(request.body)['tiros']
+            if not isinstance(lote, list):
+                raise TypeError
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'Se espera {"tiros": [pinos, ...]}.'}, status=400)
+
+        try:
+            with transaction.atomic():
+                estado = EstadoPartida.cargar(partida, bloquear=True)
+                rechazado = estado.registrar_lote(lote)
+                if rechazado:
+                    return JsonResponse({'aplicados': 0, 'rechazado': rechazado}, status=400)
+                datos = estado.como_dict()
+                if lote:
+                    transaction.on_commit(
+                        lambda: broker().publicar(canal_partida(partida.id_partida), 'tiro', datos)
+                    )
+        except IntegrityError:
+            return JsonResponse({'error': 'Se registraron otros tiros al mismo tiempo.'}, status=409)
+
+        if lote and datos['terminada']:
+            finalizar_partida(partida, reserva)
+
+        datos['aplicados'] = len(lote)
+        return JsonResponse(datos)
+
+
+@login_required
+async def tablero_eventos(request, pk):
+    """
+    Server-Sent Events con los cambios de la partida de una reserva.
+    La pantalla lee /estado/ una vez y después aplica los deltas de cada tiro.
+    """
+    partida_id = await Partida.objects.filter(reserva_id=pk).values_list('id_partida', flat=True).afirst()
+    if partida_id is None:
+        raise Http404("La reserva todavía no tiene partida.")
+
+    response = StreamingHttpResponse(
+        broker().suscribir(canal_partida(partida_id)),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 class AsignarAdminView(LoginRequiredMixin, ThemeMixin, UsuarioContext, View):
     template_name = "bowl/cositas_admin/asignar_admin.html"
 
@@ -588,8 +663,13 @@ class AsignarAdminView(LoginRequiredMixin, ThemeMixin, UsuarioContext, View):
             messages.error(request, "No tienes permiso para acceder.")
             return redirect('inicio')
 
-        usuarios = Usuario.objects.all().order_by('username')
-        return render(request, self.template_name, {'usuarios': usuarios})
+        # username es único: el índice de la restricción sirve para el cursor
+        usuarios = paginar(Usuario.objects.all(), ('username',), request.GET.get('cursor'), tamanio_pedido(request))
+        if pide_json(request):
+            return respuesta_json(usuarios, lambda usuario: {
+                'id': usuario.pk, 'username': usuario.username, 'email': usuario.email, 'rol': usuario.rol,
+            })
+        return render(request, self.template_name, {'usuarios': usuarios, 'pagina': usuarios})
 
     def post(self, request):
         if getattr(request.user, 'rol', None) != 'admin':
@@ -661,17 +741,6 @@ def registro(request):
 
     return render(request, "bowl/registro.html", {"form": form})
 
-# ---------------------------------------------------------
-# FUNCIÓN PARA CREAR ESTADOS AUTOMÁTICAMENTE
-# ---------------------------------------------------------
-def crear_estados_necesarios():
-    estados_necesarios = [
-        "Pendiente", "Disponible", "Completada",
-        "En preparación", "Listo", "Entregado"
-    ]
-    for nombre in estados_necesarios:
-        Estado.objects.get_or_create(nombre=nombre)
-
 # ---------------------------------------------------------
 # GESTIÓN DE RESERVA (cliente) - Cliente ve pedido hasta "Entregado"
 # ---------------------------------------------------------
@@ -680,11 +749,10 @@ class GestionReservaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, Templat
     login_url = reverse_lazy('iniciar_sesion')
 
     def get_context_data(self, **kwargs):
-        crear_estados_necesarios()
-
         context = super().get_context_data(**kwargs)
         pk = self.kwargs.get('pk')
         reserva = get_object_or_404(Reserva, pk=pk, cliente=self.request.user.cliente)
+        estados.adjuntar([reserva])
 
         hoy = date.today()
         ahora = datetime.now().time()
@@ -694,7 +762,7 @@ class GestionReservaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, Templat
         # Pedido actual: el último no entregado (incluye En preparación y Listo)
         pedido_actual = Pedido.objects.filter(
             reserva=reserva
-        ).exclude(estado__nombre="Entregado").order_by('-fecha').first()
+        ).exclude(estado_id=estados.id_de(estados.ENTREGADO)).order_by('-fecha').first()
 
         # Si no hay pedido activo (todos entregados), crear uno nuevo
         if not pedido_actual:
@@ -704,21 +772,21 @@ class GestionReservaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, Templat
             )
 
         detalles = DetallePedido.objects.filter(pedido=pedido_actual).select_related('menu')
-        total_pedido = sum(d.subtotal or 0 for d in detalles)
-        menu_items = Menu.objects.filter(disponible=True)
+        total_pedido = pedido_actual.precio_total or 0  # Lo mantiene bowl.pedidos al agregar y quitar
+        menu_items = catalogo.menu()
 
         # Bloqueo solo en preparación
-        pedido_bloqueado = pedido_actual.estado and pedido_actual.estado.nombre == "En preparación" or pedido_actual.estado and pedido_actual.estado.nombre == "Listo"
+        estado_pedido = estados.nombre_de(pedido_actual.estado_id)
+        pedido_bloqueado = estado_pedido in (estados.EN_PREPARACION, estados.LISTO)
 
         # Estado para mostrar
         estado_mostrar = "Listo para enviar"
-        if pedido_actual.estado:
-            if pedido_actual.estado.nombre == "En preparación":
-                estado_mostrar = "En preparación ⏳"
-            elif pedido_actual.estado.nombre == "Listo":
-                estado_mostrar = "Listo ✓ (esperando entrega)"
-            elif pedido_actual.estado.nombre == "Entregado":
-                estado_mostrar = "Entregado ✓"
+        if estado_pedido == estados.EN_PREPARACION:
+            estado_mostrar = "En preparación ⏳"
+        elif estado_pedido == estados.LISTO:
+            estado_mostrar = "Listo ✓ (esperando entrega)"
+        elif estado_pedido == estados.ENTREGADO:
+            estado_mostrar = "Entregado ✓"
 
         context.update({
             'reserva': reserva,
@@ -740,12 +808,12 @@ class GestionReservaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, Templat
         # Pedido activo (el último no entregado)
         pedido = Pedido.objects.filter(
             reserva=reserva
-        ).exclude(estado__nombre="Entregado").order_by('-fecha').first()
+        ).exclude(estado_id=estados.id_de(estados.ENTREGADO)).order_by('-fecha').first()
 
         if not pedido:
             pedido = Pedido.objects.create(reserva=reserva, cliente=request.user.cliente)
 
-        pedido_bloqueado = pedido.estado and pedido.estado.nombre == "En preparación"
+        pedido_bloqueado = pedido.estado_id == estados.id_de(estados.EN_PREPARACION)
 
         if accion == "cancelar":
             return self.cancelar_reserva(request, reserva)
@@ -769,13 +837,7 @@ class GestionReservaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, Templat
                     return redirect('gestion_reserva', pk=pk)
 
                 menu = get_object_or_404(Menu, id=menu_id, disponible=True)
-                detalle, _ = DetallePedido.objects.get_or_create(
-                    pedido=pedido, menu=menu, defaults={'cantidad': 0}
-                )
-                detalle.cantidad += cantidad
-                detalle.save()
-                pedido.precio_total = sum(d.subtotal or 0 for d in pedido.detalles.all())
-                pedido.save()
+                agregar_item(pedido.pk, menu, cantidad)
                 messages.success(request, f"Agregado: {cantidad} × {menu.nombre}")
 
         elif accion == "eliminar_item":
@@ -783,14 +845,8 @@ class GestionReservaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, Templat
                 messages.error(request, "El pedido está en preparación. No se puede eliminar.")
             else:
                 detalle_id = request.POST.get('detalle_id')
-                try:
-                    detalle = DetallePedido.objects.get(id=detalle_id, pedido=pedido)
-                    detalle.delete()
-                    pedido.precio_total = sum(d.subtotal or 0 for d in pedido.detalles.all())
-                    pedido.save()
+                if detalle_id and detalle_id.isdigit() and quitar_item(pedido.pk, int(detalle_id)):
                     messages.success(request, "Producto eliminado")
-                except DetallePedido.DoesNotExist:
-                    pass
 
         elif accion == "enviar_pedido":
             if pedido_bloqueado:
@@ -798,16 +854,14 @@ class GestionReservaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, Templat
             elif not pedido.detalles.exists():
                 messages.warning(request, "¡Agregá algo antes de enviar!")
             else:
-                estado_cocina, _ = Estado.objects.get_or_create(nombre="En preparación")
-                pedido.estado = estado_cocina
+                pedido.estado = estados.obtener(estados.EN_PREPARACION)
                 pedido.save()
                 messages.success(request, "¡PEDIDO ENVIADO A COCINA!")
 
         return redirect('gestion_reserva', pk=pk)
 
     def cancelar_reserva(self, request, reserva):
-        estado_disponible, _ = Estado.objects.get_or_create(nombre="Disponible")
-        reserva.estado = estado_disponible
+        reserva.estado = estados.obtener(estados.DISPONIBLE)
         reserva.save()
         messages.success(request, "Reserva cancelada correctamente.")
         return redirect('reserva')
@@ -815,25 +869,34 @@ class GestionReservaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, Templat
 # ---------------------------------------------------------
 # COCINA - Oculta cuando está "Entregado"
 # ---------------------------------------------------------
+def pedidos_en_cola(hoy, version):
+    """Pedidos activos del día en el orden de la cola de trabajo, cada uno con su `turno`."""
+    pedidos = {pedido.pk: pedido for pedido in cocina.pedidos_del_dia(hoy)}
+    ordenados = []
+    for turno in cocina.plan(hoy, pedidos.values(), version):
+        pedido = pedidos.pop(turno.pedido_id, None)
+        if pedido is not None:
+            pedido.turno = cocina.serializar_turno(turno)
+            ordenados.append(pedido)
+    # Lo que la cola todavía no tiene (entró entre la versión y la lista) va al final; llega por el feed
+    return ordenados + list(pedidos.values())
+
+
 class CocinaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, ListView):
+    """Pedidos del día en el orden de la cola de trabajo (bowl/planificador.py), con su hora estimada."""
     template_name = "bowl/cocina.html"
     context_object_name = "pedidos"
 
     def get_queryset(self):
-        crear_estados_necesarios()
         hoy = date.today()
-        return Pedido.objects.filter(
-            reserva__fecha=hoy,
-            detalles__isnull=False
-        ).exclude(estado__nombre="Entregado") \
-         .select_related('reserva__pista', 'reserva__cliente', 'estado') \
-         .prefetch_related('detalles__menu') \
-         .distinct() \
-         .order_by('reserva__hora', 'fecha')
+        # La versión se lee antes que la lista: un cambio que entre en el medio llega igual por el feed
+        self.version = cocina.version(hoy)
+        return estados.adjuntar(pedidos_en_cola(hoy, self.version))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['hoy'] = date.today()
+        context['version'] = self.version
         return context
 
     def post(self, request, *args, **kwargs):
@@ -844,13 +907,56 @@ class CocinaView(LoginRequiredMixin, ThemeMixin, UsuarioContext, ListView):
         pedido_id = request.POST.get('pedido_id')
         nuevo_estado_nombre = request.POST.get('nuevo_estado')
 
+        # La pantalla en vivo manda el cambio por fetch: la tarjeta se actualiza por el feed, sin recargar
+        por_fetch = request.headers.get('Accept') == 'application/json'
         try:
             pedido = Pedido.objects.get(id=pedido_id)
-            nuevo_estado, _ = Estado.objects.get_or_create(nombre=nuevo_estado_nombre)
-            pedido.estado = nuevo_estado
+            pedido.estado = estados.obtener(nuevo_estado_nombre)
             pedido.save()
-            messages.success(request, f"Pedido #{pedido_id} → {nuevo_estado_nombre}")
         except Exception:
+            if por_fetch:
+                return JsonResponse({'error': "Error al actualizar."}, status=400)
             messages.error(request, "Error al actualizar.")
+            return redirect('cocina')
+
+        if por_fetch:
+            return JsonResponse({'id': pedido.pk, 'estado': nuevo_estado_nombre})
+        messages.success(request, f"Pedido #{pedido_id} → {nuevo_estado_nombre}")
+        return redirect('cocina')
+
+
+class CocinaEstadoView(LoginRequiredMixin, View):
+    """Lista completa de la cocina de hoy con su versión; la pantalla la relee si perdió eventos."""
+
+    def get(self, request):
+        hoy = date.today()
+        version = cocina.version(hoy)
+        pedidos = pedidos_en_cola(hoy, version)
+        return JsonResponse({
+            'fecha': hoy.isoformat(),
+            'version': version,
+            'pedidos': [cocina.serializar(pedido) for pedido in pedidos],
+            'cola': [pedido.turno for pedido in pedidos if hasattr(pedido, 'turno')],
+        })
+
 
-        return redirect('cocina')
\ No newline at end of file
+@login_required
+async def cocina_eventos(request):
+    """
+    Server-Sent Events con los pedidos nuevos, cambiados y quitados de la cocina de hoy.
+    Si el cliente se reconecta con una versión vieja (Last-Event-ID), primero recibe `reinicio`.
+    """
+    hoy = date.today()
+    ultima = request.headers.get('Last-Event-ID') or request.GET.get('version')
+
+    async def eventos():
+        actual = await cocina.aversion(hoy)
+        if ultima is not None and ultima != str(actual):
+            yield f"id: {actual}\nevent: reinicio\ndata: {json.dumps({'version': actual})}\n\n"
+        async for mensaje in broker().suscribir(cocina.canal_cocina(hoy)):
+            yield mensaje
+
+    response = StreamingHttpResponse(eventos(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
\ No newline at end of file
@@ -3,6 +3,12 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+El tablero en vivo (bowl.views.tablero_eventos) es una vista async que
+mantiene conexiones abiertas: se sirve con un servidor ASGI, por ejemplo
+``uvicorn config.asgi:application`` (uvicorn está en requirements.txt).
+Con más de un worker hay que definir REDIS_URL para que los tiros lleguen
+a las pantallas conectadas a cualquiera de ellos (ver config/settings.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
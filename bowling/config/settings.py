@@ -8,6 +8,7 @@ Documentación:
 - Todos los settings: https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # -------------------------
@@ -46,6 +47,15 @@ STATIC_URL = '/static/'  # URL pública de los archivos estáticos
 STATICFILES_DIRS = [BASE_DIR / "static"]  # Carpeta donde están los CSS, JS, imágenes
 
 
+# -------------------------
+# Archivos subidos
+# -------------------------
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+# Anchos (px) de las versiones achicadas de las imágenes del menú (ver bowl/miniaturas.py)
+MENU_ANCHOS_IMAGEN = (320, 640, 960)
+
+
 # -------------------------
 # Middleware
 # -------------------------
@@ -134,6 +144,64 @@ LOGIN_REDIRECT_URL = 'inicio'          # Tras login exitoso
 LOGOUT_REDIRECT_URL = 'inicio'         # Tras logout
 
 
+# -------------------------
+# Caché
+# -------------------------
+# El catálogo del menú, el índice de disponibilidad y el feed de la cocina viven en la caché
+# y se invalidan desde las señales del proceso que hizo el cambio. Con más de un proceso
+# (varios workers de uvicorn, el consumidor de pinsetters, un cron) la caché tiene que ser
+# compartida: se configura REDIS_URL (por ejemplo redis://localhost:6379/0).
+# Sin REDIS_URL se usa la memoria del proceso, que solo sirve con un único proceso:
+# un cambio hecho en otro no invalida lo cacheado acá hasta que vence.
+# El registro de estados (bowl/estados.py) no está en la caché: vive en la memoria de cada
+# proceso aun con REDIS_URL, así que renombrar o borrar un Estado pide reiniciar los workers.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'bowling',
+        }
+    }
+
+
+# -------------------------
+# Tablero en vivo (SSE)
+# -------------------------
+# Backend que reparte los tiros entre workers (ver bowl/eventos.py). En memoria solo llegan a
+# las pantallas conectadas al mismo proceso; con REDIS_URL viajan por pub/sub entre procesos.
+TABLERO_BROKER_BACKEND = 'bowl.eventos.BackendRedis' if REDIS_URL else 'bowl.eventos.BackendLocal'
+
+# Token de cada pinsetter, por número de pista. El controlador lo manda en
+# `Authorization: Bearer <token>` al POST /tablero/<reserva>/tiros/ (ver TableroLoteView).
+# Sin token configurado la pista no puede cargar tiros por la API.
+PINSETTER_TOKENS = {
+    # 1: 'token-largo-y-al-azar-de-la-pista-1',
+}
+
+
+# -------------------------
+# Cola de la cocina
+# -------------------------
+# Pedidos que la cocina prepara a la vez y cuánto pesa la duración en la prioridad (ver bowl/planificador.py)
+COCINA_PUESTOS = 2
+COCINA_PESO_DURACION = 1.0
+
+
+# -------------------------
+# Archivo de datos viejos
+# -------------------------
+# Días que reservas, partidas y pedidos cerrados quedan en las tablas calientes (ver bowl/archivo.py)
+ARCHIVO_DIAS = 365
+
+
 # -------------------------
 # Modelo de usuario personalizado
 # -------------------------
@@ -1,11 +1,14 @@
 # config/urls.py
 from django import views
 from django.contrib import admin
-from django.urls import path,include
+from django.conf import settings
+from django.urls import path, re_path, include
 from bowl.views import (
-    InicioView, CafeView, ReservaListView, ListaPistasView, CrearPistaView, EditarPistaView,
-    LoginnView, ContactoView, AsignarAdminView, registro, ReservaCreateView, 
-    TableroPuntuacionesView, GestionReservaView, CocinaView
+    InicioView, CafeView, MenuCatalogoView, ReservaListView, ListaPistasView, CrearPistaView, EditarPistaView,
+    LoginnView, ContactoView, AsignarAdminView, registro, ReservaCreateView, CalendarioDisponibilidadView,
+    ReservaSerieView, HistorialReservasView,
+    TableroPuntuacionesView, TableroEstadoView, TableroLoteView, tablero_eventos,
+    GestionReservaView, CocinaView, CocinaEstadoView, cocina_eventos, servir_media
 )
 from django.contrib.auth.views import LogoutView
 
@@ -16,11 +19,15 @@ urlpatterns = [
     # Inicio y básicos
     path('', InicioView.as_view(), name="inicio"),
     path('cafe/', CafeView.as_view(), name="cafe"),
+    path('menu/', MenuCatalogoView.as_view(), name='menu_catalogo'),
     path('iniciar_sesion/', LoginnView.as_view(), name="iniciar_sesion"),
 
     # Reservas
     path('reserva/', ReservaListView.as_view(), name='reserva'),         # Ver todas las reservas
     path('reserva/nueva/', ReservaCreateView.as_view(), name='nueva_reserva1'),  # Crear reserva
+    path('reserva/calendario/', CalendarioDisponibilidadView.as_view(), name='calendario_disponibilidad'),
+    path('reserva/serie/', ReservaSerieView.as_view(), name='reserva_serie'),
+    path('reserva/historial/', HistorialReservasView.as_view(), name='historial_reservas'),
 
     # Pistas
     path('pistas/', ListaPistasView.as_view(), name="lista_pistas"),
@@ -29,6 +36,9 @@ urlpatterns = [
     
     
     path('tablero/<int:pk>/', TableroPuntuacionesView.as_view(), name='tablero_puntuaciones'),
+    path('tablero/<int:pk>/estado/', TableroEstadoView.as_view(), name='tablero_estado'),
+    path('tablero/<int:pk>/eventos/', tablero_eventos, name='tablero_eventos'),
+    path('tablero/<int:pk>/tiros/', TableroLoteView.as_view(), name='tablero_tiros'),
  
     #LogOut
     path('cerrar_sesion/', LogoutView.as_view(next_page='inicio'), name='cerrar_sesion'),
@@ -42,4 +52,10 @@ urlpatterns = [
 
     path('mi_reserva/<int:pk>/', GestionReservaView.as_view(), name='gestion_reserva'),
     path('cocina/', CocinaView.as_view(), name='cocina'),
-]
\ No newline at end of file
+    path('cocina/estado/', CocinaEstadoView.as_view(), name='cocina_estado'),
+    path('cocina/eventos/', cocina_eventos, name='cocina_eventos'),
+]
+
+# Archivos subidos (imágenes del menú); en producción los sirve el servidor web
+if settings.DEBUG:
+    urlpatterns += [re_path(r'^media/(?P<path>.*)$', servir_media, name='media')]